@@ -0,0 +1,72 @@
+"""
+Async versions of the public page views, served when settings.ASYNC_VIEWS is
+on. It is off by default, including under ASGI: set ASYNC_VIEWS=True to opt in.
+
+Cached pages and content are answered without leaving the event loop; only
+cache misses reach the database (through Django's async ORM) and template
+rendering runs in a worker thread. The sync views in views.py stay in use
+under WSGI, where an async view would cost an event loop per request.
+"""
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render
+
+from .content_helpers import acontent_version
+from .db_routers import use_published_content
+from .utils.cache_utils import cached_page
+from .utils.early_hints import ahero_image, preload_hints
+
+
+arender = sync_to_async(render)
+
+
+@preload_hints
+@cached_page(version=acontent_version)
+@use_published_content
+async def home(request):
+    return await arender(request, 'myApp/home.html', {'content': {'hero_image': await ahero_image('home')}})
+
+@preload_hints
+@cached_page(version=acontent_version)
+async def about(request):
+    return await arender(request, 'myApp/about.html')
+
+@preload_hints
+@cached_page(version=acontent_version)
+async def core_beliefs(request):
+    return await arender(request, 'myApp/core_beliefs.html')
+
+@preload_hints
+@cached_page(version=acontent_version)
+async def what_we_do(request):
+    return await arender(request, 'myApp/what_we_do.html')
+
+@preload_hints
+@cached_page(version=acontent_version)
+async def events(request):
+    return await arender(request, 'myApp/events.html')
+
+@preload_hints
+@cached_page(version=acontent_version)
+async def mission_accomplished(request):
+    return await arender(request, 'myApp/mission_accomplished.html')
+
+@preload_hints
+@cached_page(version=acontent_version)
+async def donate(request):
+    return await arender(request, 'myApp/donate.html')
+
+@preload_hints
+@cached_page(version=acontent_version)
+async def contact(request):
+    return await arender(request, 'myApp/contact.html')
+
+@preload_hints
+@cached_page(version=acontent_version)
+async def faqs(request):
+    return await arender(request, 'myApp/faqs.html')
+
+@preload_hints
+@cached_page(version=acontent_version)
+async def privacy(request):
+    return await arender(request, 'myApp/privacy.html')
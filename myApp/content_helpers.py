@@ -4,6 +4,12 @@ This allows the frontend to use the same structure whether data comes from
 database or JSON files.
 """
 
+from django.core.cache import cache
+
+from .utils.cache_utils import get_or_rebuild
+from .utils.early_hints import hero_image
+from .utils.invalidation import acurrent_content_version, current_content_version, bump_content_version
+from .utils.remote_mirror import local_image_url
 from .models import (
     MediaAsset, SEO, Navigation, Hero, About, Stat, Program,
     FeaturedStory, Retreat, Testimonial, ImpactStory, CallToAction,
@@ -11,290 +17,320 @@ from .models import (
 )
 
 
+CONTENT_CACHE_TIMEOUT = 300
+
+
+# Section shapes: model instance (and its resolved image URL) -> template dict.
+
+def _seo_dict(seo, image=None):
+    return {
+        'title': seo.title,
+        'description': seo.description,
+        'keywords': seo.keywords,
+        'og_title': seo.og_title,
+        'og_description': seo.og_description,
+        # Absolute remote URL kept: social crawlers need one, visitors never load it
+        'og_image': seo.og_image,
+    }
+
+
+def _hero_dict(hero, image):
+    return {
+        'label': hero.label,
+        'headline': hero.headline,
+        'subtext': hero.subtext,
+        'primary_button': {
+            'text': hero.primary_button_text,
+            'url': hero.primary_button_url,
+        },
+        'secondary_button': {
+            'text': hero.secondary_button_text,
+            'url': hero.secondary_button_url,
+        },
+        'background_image': image,
+    }
+
+
+def _about_dict(about, image):
+    return {
+        'label': about.label,
+        'heading': about.heading,
+        'description': about.description,
+        'image': image,
+    }
+
+
+def _stat_dict(stat, image=None):
+    return {
+        'icon': stat.icon,
+        'number': stat.number,
+        'label': stat.label,
+    }
+
+
+def _program_dict(program, image=None):
+    return {
+        'label': program.label,
+        'title': program.title,
+        'description': program.description,
+        'icon': program.icon,
+        'learn_more_url': program.learn_more_url,
+    }
+
+
+def _featured_story_dict(story, image):
+    return {
+        'label': story.label,
+        'quote': story.quote,
+        'quote_author': story.quote_author,
+        'title': story.title,
+        'description': story.description,
+        'image': image,
+        'primary_button': {
+            'text': story.primary_button_text,
+            'url': story.primary_button_url,
+        },
+        'secondary_button': {
+            'text': story.secondary_button_text,
+            'url': story.secondary_button_url,
+        },
+    }
+
+
+def _retreat_dict(retreat, image):
+    return {
+        'label': retreat.label,
+        'title': retreat.title,
+        'date_range': retreat.date_range,
+        'location': retreat.location,
+        'description': retreat.description,
+        'background_image': image,
+        'primary_button': {
+            'text': retreat.primary_button_text,
+            'url': retreat.primary_button_url,
+        },
+        'secondary_button': {
+            'text': retreat.secondary_button_text,
+            'url': retreat.secondary_button_url,
+        },
+    }
+
+
+def _testimonial_dict(testimonial, image):
+    return {
+        'name': testimonial.name,
+        'role': testimonial.role,
+        'quote': testimonial.quote,
+        'avatar': image,
+        'icon': testimonial.icon,
+    }
+
+
+def _impact_story_dict(story, image):
+    return {
+        'title': story.title,
+        'subtitle': story.subtitle,
+        'description': story.description,
+        'image': image,
+        'icon': story.icon,
+        'impact_points': story.impact_points or [],
+        'support_url': story.support_url,
+    }
+
+
+def _cta_dict(cta, image=None):
+    return {
+        'heading': cta.heading,
+        'subtext': cta.subtext,
+        'primary_button': {
+            'text': cta.primary_button_text,
+            'url': cta.primary_button_url,
+        },
+        'secondary_button': {
+            'text': cta.secondary_button_text,
+            'url': cta.secondary_button_url,
+        },
+        'background_color': cta.background_color,
+    }
+
+
+def _contact_dict(contact, image=None):
+    return {
+        'heading': contact.heading,
+        'subtext': contact.subtext,
+        'address': contact.address,
+        'email': contact.email,
+        'phone': contact.phone,
+    }
+
+
+def _past_event_dict(event, image):
+    return {
+        'title': event.title,
+        'date_range': event.date_range,
+        'location': event.location,
+        'description': event.description,
+        'image': image,
+        'button_text': event.button_text,
+        'button_url': event.button_url,
+    }
+
+
+def _upcoming_event_dict(event, image):
+    return {**_past_event_dict(event, image), 'is_featured': event.is_featured}
+
+
+def _navigation_dict(item, image=None):
+    return {
+        'label': item.label,
+        'url': item.url,
+    }
+
+
+def _footer_dict(footer, image=None):
+    return {
+        'about_text': footer.about_text,
+        'copyright_text': footer.copyright_text,
+    }
+
+
+def _contact_info_dict(item, image=None):
+    return {
+        'label': item.label,
+        'value': item.value,
+        'icon': item.icon,
+    }
+
+
+def _social_link_dict(link, image=None):
+    return {
+        'platform': link.platform,
+        'url': link.url,
+        'icon': link.icon,
+    }
+
+
+def _active(model):
+    return model.objects.filter(is_active=True).order_by('sort_order')
+
+
+def _upcoming_events():
+    return Event.objects.filter(is_active=True, is_upcoming=True).order_by('-is_featured', 'sort_order', '-created_at')
+
+
+def _past_events():
+    return Event.objects.filter(is_active=True, is_upcoming=False).order_by('-created_at')
+
+
+def _section(model, shape, image_field=None, **lookup):
+    """One row as a template dict, {} when it does not exist."""
+    try:
+        obj = model.objects.get(**lookup)
+    except model.DoesNotExist:
+        return {}
+    return shape(obj, local_image_url(getattr(obj, image_field)) if image_field else None)
+
+
+def _items(queryset, shape, image_field=None):
+    return [
+        shape(obj, local_image_url(getattr(obj, image_field)) if image_field else None)
+        for obj in queryset
+    ]
+
+
 def get_homepage_content_from_db():
     """
     Convert database models to JSON format for homepage template.
     Returns a dictionary matching the structure expected by templates.
     """
-    content = {}
-    
-    # SEO
-    try:
-        seo = SEO.objects.get(page='home')
-        content['seo'] = {
-            'title': seo.title,
-            'description': seo.description,
-            'keywords': seo.keywords,
-            'og_title': seo.og_title,
-            'og_description': seo.og_description,
-            'og_image': seo.og_image,
-        }
-    except SEO.DoesNotExist:
-        content['seo'] = {}
-    
-    # Navigation
-    nav_items = Navigation.objects.filter(is_active=True).order_by('sort_order')
-    content['navigation'] = [
-        {
-            'label': item.label,
-            'url': item.url,
-        }
-        for item in nav_items
-    ]
-    
-    # Hero
-    try:
-        hero = Hero.objects.get(page='home')
-        content['hero'] = {
-            'label': hero.label,
-            'headline': hero.headline,
-            'subtext': hero.subtext,
-            'primary_button': {
-                'text': hero.primary_button_text,
-                'url': hero.primary_button_url,
-            },
-            'secondary_button': {
-                'text': hero.secondary_button_text,
-                'url': hero.secondary_button_url,
-            },
-            'background_image': hero.background_image_url,
-        }
-    except Hero.DoesNotExist:
-        content['hero'] = {}
-    
-    # About
-    try:
-        about = About.objects.get(page='home')
-        content['about'] = {
-            'label': about.label,
-            'heading': about.heading,
-            'description': about.description,
-            'image': about.image_url,
-        }
-    except About.DoesNotExist:
-        content['about'] = {}
-    
-    # Stats
-    stats = Stat.objects.filter(is_active=True).order_by('sort_order')
-    content['stats'] = [
-        {
-            'icon': stat.icon,
-            'number': stat.number,
-            'label': stat.label,
-        }
-        for stat in stats
-    ]
-    
-    # Programs
-    programs = Program.objects.filter(is_active=True).order_by('sort_order')
-    content['programs'] = [
-        {
-            'label': program.label,
-            'title': program.title,
-            'description': program.description,
-            'icon': program.icon,
-            'learn_more_url': program.learn_more_url,
-        }
-        for program in programs
-    ]
-    
-    # Featured Story
-    try:
-        story = FeaturedStory.objects.get(page='home')
-        content['featured_story'] = {
-            'label': story.label,
-            'quote': story.quote,
-            'quote_author': story.quote_author,
-            'title': story.title,
-            'description': story.description,
-            'image': story.image_url,
-            'primary_button': {
-                'text': story.primary_button_text,
-                'url': story.primary_button_url,
-            },
-            'secondary_button': {
-                'text': story.secondary_button_text,
-                'url': story.secondary_button_url,
-            },
-        }
-    except FeaturedStory.DoesNotExist:
-        content['featured_story'] = {}
-    
-    # Retreat
-    try:
-        retreat = Retreat.objects.get(page='home', is_active=True)
-        content['retreat'] = {
-            'label': retreat.label,
-            'title': retreat.title,
-            'date_range': retreat.date_range,
-            'location': retreat.location,
-            'description': retreat.description,
-            'background_image': retreat.background_image_url,
-            'primary_button': {
-                'text': retreat.primary_button_text,
-                'url': retreat.primary_button_url,
-            },
-            'secondary_button': {
-                'text': retreat.secondary_button_text,
-                'url': retreat.secondary_button_url,
-            },
-        }
-    except Retreat.DoesNotExist:
-        content['retreat'] = {}
-    
-    # Testimonials
-    testimonials = Testimonial.objects.filter(is_active=True).order_by('sort_order')
-    content['testimonials'] = [
-        {
-            'name': testimonial.name,
-            'role': testimonial.role,
-            'quote': testimonial.quote,
-            'avatar': testimonial.avatar_url,
-            'icon': testimonial.icon,
-        }
-        for testimonial in testimonials
-    ]
-    
-    # Impact Stories
-    stories = ImpactStory.objects.filter(is_active=True).order_by('sort_order')
-    content['impact_stories'] = [
-        {
-            'title': story.title,
-            'subtitle': story.subtitle,
-            'description': story.description,
-            'image': story.image_url,
-            'icon': story.icon,
-            'impact_points': story.impact_points or [],
-            'support_url': story.support_url,
-        }
-        for story in stories
-    ]
-    
-    # Call to Action
-    try:
-        cta = CallToAction.objects.get(page='home')
-        content['cta'] = {
-            'heading': cta.heading,
-            'subtext': cta.subtext,
-            'primary_button': {
-                'text': cta.primary_button_text,
-                'url': cta.primary_button_url,
-            },
-            'secondary_button': {
-                'text': cta.secondary_button_text,
-                'url': cta.secondary_button_url,
-            },
-            'background_color': cta.background_color,
-        }
-    except CallToAction.DoesNotExist:
-        content['cta'] = {}
-    
-    # Footer
-    try:
-        footer = Footer.objects.get(page='home')
-        content['footer'] = {
-            'about_text': footer.about_text,
-            'copyright_text': footer.copyright_text,
-        }
-    except Footer.DoesNotExist:
-        content['footer'] = {}
-    
-    # Contact Info
-    contact_items = ContactInfo.objects.filter(is_active=True).order_by('sort_order')
-    content['contact_info'] = [
-        {
-            'label': item.label,
-            'value': item.value,
-            'icon': item.icon,
-        }
-        for item in contact_items
-    ]
-    
-    # Social Links
-    social_links = SocialLink.objects.filter(is_active=True).order_by('sort_order')
-    content['social_links'] = [
-        {
-            'platform': link.platform,
-            'url': link.url,
-            'icon': link.icon,
-        }
-        for link in social_links
-    ]
-    
-    return content
+    return {
+        'seo': _section(SEO, _seo_dict, page='home'),
+        'navigation': _navigation_from_db(),
+        'hero': _section(Hero, _hero_dict, 'background_image_url', page='home'),
+        # Same image the page preloads (utils.early_hints)
+        'hero_image': hero_image('home'),
+        'about': _section(About, _about_dict, 'image_url', page='home'),
+        'stats': _items(_active(Stat), _stat_dict),
+        'programs': _items(_active(Program), _program_dict),
+        'featured_story': _section(FeaturedStory, _featured_story_dict, 'image_url', page='home'),
+        'retreat': _section(Retreat, _retreat_dict, 'background_image_url', page='home', is_active=True),
+        'testimonials': _items(_active(Testimonial), _testimonial_dict, 'avatar_url'),
+        'impact_stories': _items(_active(ImpactStory), _impact_story_dict, 'image_url'),
+        'cta': _section(CallToAction, _cta_dict, page='home'),
+        'footer': _footer_from_db(),
+        'contact_info': _contact_info_from_db(),
+        'social_links': _social_links_from_db(),
+    }
 
 
 def get_contact_page_content_from_db():
     """Get contact page content from database"""
-    content = {}
-    
-    try:
-        contact = Contact.objects.get(page='contact')
-        content['contact'] = {
-            'heading': contact.heading,
-            'subtext': contact.subtext,
-            'address': contact.address,
-            'email': contact.email,
-            'phone': contact.phone,
-        }
-    except Contact.DoesNotExist:
-        content['contact'] = {}
-    
-    # Contact Info
-    contact_items = ContactInfo.objects.filter(is_active=True).order_by('sort_order')
-    content['contact_info'] = [
-        {
-            'label': item.label,
-            'value': item.value,
-            'icon': item.icon,
-        }
-        for item in contact_items
-    ]
-    
-    # Social Links
-    social_links = SocialLink.objects.filter(is_active=True).order_by('sort_order')
-    content['social_links'] = [
-        {
-            'platform': link.platform,
-            'url': link.url,
-            'icon': link.icon,
-        }
-        for link in social_links
-    ]
-    
-    return content
+    return {
+        'contact': _section(Contact, _contact_dict, page='contact'),
+        'contact_info': _contact_info_from_db(),
+        'social_links': _social_links_from_db(),
+    }
 
 
 def get_events_page_content_from_db():
     """Get events page content from database"""
-    upcoming_events = Event.objects.filter(is_active=True, is_upcoming=True).order_by('-is_featured', 'sort_order', '-created_at')
-    past_events = Event.objects.filter(is_active=True, is_upcoming=False).order_by('-created_at')
-    
     return {
-        'upcoming_events': [
-            {
-                'title': event.title,
-                'date_range': event.date_range,
-                'location': event.location,
-                'description': event.description,
-                'image': event.image_url,
-                'is_featured': event.is_featured,
-                'button_text': event.button_text,
-                'button_url': event.button_url,
-            }
-            for event in upcoming_events
-        ],
-        'past_events': [
-            {
-                'title': event.title,
-                'date_range': event.date_range,
-                'location': event.location,
-                'description': event.description,
-                'image': event.image_url,
-                'button_text': event.button_text,
-                'button_url': event.button_url,
-            }
-            for event in past_events
-        ],
+        'upcoming_events': _items(_upcoming_events(), _upcoming_event_dict, 'image_url'),
+        'past_events': _items(_past_events(), _past_event_dict, 'image_url'),
     }
 
+
+def _navigation_from_db():
+    return _items(_active(Navigation), _navigation_dict)
+
+
+def _footer_from_db():
+    return _section(Footer, _footer_dict, page='home')
+
+
+def _contact_info_from_db():
+    return _items(_active(ContactInfo), _contact_info_dict)
+
+
+def _social_links_from_db():
+    return _items(_active(SocialLink), _social_link_dict)
+
+
+# Cached accessors used by the public site. Values live in the two-tier cache,
+# so repeated reads are normally served from process memory.
+# Keys are versioned by the database content version (utils/invalidation.py),
+# so an edit on any replica is picked up everywhere. Expired snapshots are
+# served stale while a single worker rebuilds them.
+
+def content_version():
+    """Current content version, used as the cache key version for content and pages"""
+    return current_content_version()
+
+
+async def acontent_version():
+    """Async content_version()"""
+    return await acurrent_content_version()
+
+
+def _cached(key, builder):
+    return get_or_rebuild(key, builder, timeout=CONTENT_CACHE_TIMEOUT, version=content_version())
+
+
+def get_homepage_content():
+    """Homepage content (cached)"""
+    return _cached('content:homepage', get_homepage_content_from_db)
+
+
+def get_contact_page_content():
+    """Contact page content (cached)"""
+    return _cached('content:contact', get_contact_page_content_from_db)
+
+
+def get_events_page_content():
+    """Events page content (cached)"""
+    return _cached('content:events', get_events_page_content_from_db)
+
+
+def invalidate_content_cache():
+    """Move every process to a new content version (after publishing or editing)"""
+    bump_content_version()
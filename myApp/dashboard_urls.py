@@ -10,6 +10,7 @@ urlpatterns = [
     
     # Dashboard Home
     path('', dashboard_views.dashboard_home, name='index'),
+    path('publish/', dashboard_views.publish_content, name='publish_content'),
     
     # Image Management
     path('gallery/', dashboard_views.gallery, name='gallery'),
@@ -83,5 +84,12 @@ urlpatterns = [
     path('events/edit/', dashboard_views.event_edit, name='event_edit'),
     path('events/edit/<int:event_id>/', dashboard_views.event_edit, name='event_edit'),
     path('events/delete/<int:event_id>/', dashboard_views.event_delete, name='event_delete'),
+    
+    # Performance
+    path('performance/', dashboard_views.performance_overview, name='performance'),
+    
+    # Request Profiles
+    path('profiles/', dashboard_views.profiles_list, name='profiles_list'),
+    path('profiles/<str:profile_id>/', dashboard_views.profile_detail, name='profile_detail'),
+    path('profiles/<str:profile_id>/download/<str:kind>/', dashboard_views.profile_download, name='profile_download'),
 ]
-
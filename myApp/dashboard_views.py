@@ -1,10 +1,13 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponse
+from django.contrib import messages
+from django.http import FileResponse, Http404, JsonResponse, HttpResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.core.paginator import Paginator
+from django.db import transaction
 from django.db.models import Q
 import json
 
@@ -15,6 +18,10 @@ from .models import (
 )
 from .utils.cloudinary_utils import upload_to_cloudinary, delete_from_cloudinary
 from .utils.local_file_utils import process_local_image, delete_local_image
+from .utils.image_variants import build_variants_in_background, delete_variants
+from .utils.request_timing import timed
+from .utils import metrics, performance, request_profiler
+from .utils.content_publish import publish_content_db
 
 
 # Authentication Views
@@ -63,6 +70,18 @@ def dashboard_home(request):
     })
 
 
+@staff_member_required(login_url='dashboard:login')
+@require_http_methods(["POST"])
+def publish_content(request):
+    """Publish current content to the read-only database used by public pages"""
+    try:
+        result = publish_content_db()
+        messages.success(request, f"Published {result['rows']} content rows to the live site.")
+    except Exception as e:
+        messages.error(request, str(e))
+    return redirect('dashboard:index')
+
+
 # Image Upload and Gallery
 @login_required
 @require_http_methods(["POST"])
@@ -76,10 +95,12 @@ def upload_image(request):
         folder = request.POST.get('folder', 'iriseup')
         title = request.POST.get('title', '')
         storage_type = request.POST.get('storage_type', 'local')  # 'local' or 'cloudinary'
+        metrics.inc('upload_bytes_total', image_file.size, storage=storage_type)
         
         if storage_type == 'cloudinary':
             # Upload to Cloudinary
-            upload_result = upload_to_cloudinary(image_file, folder=folder)
+            with timed('image'):
+                upload_result = upload_to_cloudinary(image_file, folder=folder)
             
             # Save to database
             media_asset = MediaAsset.objects.create(
@@ -93,6 +114,8 @@ def upload_image(request):
                 height=upload_result['height'],
                 format=upload_result['format'],
                 file_size=upload_result['file_size'],
+                placeholder=upload_result['placeholder'],
+                dominant_color=upload_result['dominant_color'],
                 storage_type='cloudinary',
             )
             
@@ -105,19 +128,27 @@ def upload_image(request):
             })
         else:
             # Local file storage
-            processed = process_local_image(image_file, folder=folder)
+            with timed('image'):
+                processed = process_local_image(image_file, folder=folder)
             
-            # Save to database
-            media_asset = MediaAsset.objects.create(
-                title=title or image_file.name,
-                image_file=processed['image_file'],
-                folder=folder,
-                width=processed['width'],
-                height=processed['height'],
-                format=processed['format'],
-                file_size=processed['file_size'],
-                storage_type='local',
-            )
+            # Save to database (the ImageField writes the file to default_storage)
+            with metrics.timer('storage_call_duration_seconds', backend='local', operation='save'):
+                media_asset = MediaAsset.objects.create(
+                    title=title or image_file.name,
+                    image_file=processed['image_file'],
+                    folder=folder,
+                    width=processed['width'],
+                    height=processed['height'],
+                    format=processed['format'],
+                    file_size=processed['file_size'],
+                    placeholder=processed['placeholder'],
+                    dominant_color=processed['dominant_color'],
+                    storage_type='local',
+                )
+            
+            # Resized WebP/AVIF copies for srcset, encoded off the request once
+            # the row is committed; pages serve the original until they exist
+            transaction.on_commit(lambda: build_variants_in_background(media_asset))
             
             return JsonResponse({
                 'success': True,
@@ -165,7 +196,9 @@ def delete_image(request, image_id):
         elif media_asset.storage_type == 'local' and media_asset.image_file:
             # Delete local file
             if media_asset.image_file:
-                media_asset.image_file.delete(save=False)
+                with metrics.timer('storage_call_duration_seconds', backend='local', operation='delete'):
+                    media_asset.image_file.delete(save=False)
+            delete_variants(media_asset)
         
         # Delete from database
         media_asset.delete()
@@ -653,3 +686,63 @@ def event_delete(request, event_id):
     event.delete()
     return redirect('dashboard:events_list')
 
+
+# Performance
+@staff_member_required(login_url='dashboard:login')
+def performance_overview(request):
+    """Cache efficiency, slow views, media weight and pending work"""
+    media = performance.media_summary()
+    return render(request, 'dashboard/performance.html', {
+        'cache_sections': performance.cache_hit_ratios(),
+        'slowest_views': performance.slowest_views(),
+        'window_minutes': metrics.WINDOW_MINUTES,
+        'media': media,
+        'pending_jobs': performance.pending_jobs(media),
+    })
+
+
+# Request Profiles
+@staff_member_required(login_url='dashboard:login')
+def profiles_list(request):
+    """Captured request profiles (staff add ?_profile=1 to any URL)"""
+    return render(request, 'dashboard/profiles_list.html', {
+        'profiles': request_profiler.list_profiles(),
+        'query_flag': request_profiler.QUERY_FLAG,
+    })
+
+
+@staff_member_required(login_url='dashboard:login')
+def profile_detail(request, profile_id):
+    """Hot-function table of one profile"""
+    sort = request.GET.get('sort', 'cumtime')
+    if sort not in request_profiler.SORT_KEYS:
+        sort = 'cumtime'
+    try:
+        meta = request_profiler.profile_meta(profile_id)
+        functions = request_profiler.hot_functions(profile_id, sort=sort)
+    except FileNotFoundError:
+        raise Http404('Profile not found')
+    return render(request, 'dashboard/profile_detail.html', {
+        'profile': meta,
+        'functions': functions,
+        'sort': sort,
+        'sort_keys': request_profiler.SORT_KEYS,
+    })
+
+
+@staff_member_required(login_url='dashboard:login')
+def profile_download(request, profile_id, kind):
+    """Raw pstats dump (.prof) or collapsed stacks (.txt) of one profile"""
+    try:
+        if kind == 'prof':
+            return FileResponse(
+                open(request_profiler.profile_file(profile_id), 'rb'),
+                as_attachment=True, filename=f'{profile_id}.prof',
+            )
+        if kind != 'stacks':
+            raise Http404('Unknown download')
+        response = HttpResponse(request_profiler.collapsed_stacks(profile_id), content_type='text/plain')
+        response['Content-Disposition'] = f'attachment; filename="{profile_id}.collapsed.txt"'
+        return response
+    except FileNotFoundError:
+        raise Http404('Profile not found')
@@ -0,0 +1,88 @@
+"""
+Database routing for the published (read-only) content database.
+
+Public views read published content from a separate SQLite file opened with
+``mode=ro&immutable=1`` so they never take locks on, or contend with, the
+read/write ``db.sqlite3`` used by sessions and the dashboard. The dashboard
+keeps reading and writing the default database; only code running inside
+``published_content()`` (or a view wrapped with ``use_published_content``)
+is routed to the published copy.
+"""
+
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+
+CONTENT_DB_ALIAS = 'content'
+
+# Models exported by the publish step (see utils/content_publish.py)
+PUBLISHED_MODELS = (
+    'MediaAsset', 'SEO', 'Navigation', 'Hero', 'About', 'Stat', 'Program',
+    'FeaturedStory', 'Retreat', 'Testimonial', 'ImpactStory', 'CallToAction',
+    'Contact', 'ContactInfo', 'SocialLink', 'Footer', 'Event',
+)
+
+_published_reads = ContextVar('published_reads', default=False)
+
+
+def content_db_available():
+    """True if USE_PUBLISHED_CONTENT is on and the database has been published."""
+    return settings.USE_PUBLISHED_CONTENT and os.path.exists(settings.CONTENT_DB_PATH)
+
+
+@contextmanager
+def published_content():
+    """Route content reads inside the block to the published database."""
+    token = _published_reads.set(True)
+    try:
+        yield
+    finally:
+        _published_reads.reset(token)
+
+
+def use_published_content(view_func):
+    """View decorator: read content from the published database."""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            # sync_to_async copies the context, so ORM calls in threads see it too
+            with published_content():
+                return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        with published_content():
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class PublishedContentRouter:
+    """Send content reads to the published database when asked to."""
+
+    def db_for_read(self, model, **hints):
+        if (
+            _published_reads.get()
+            and model._meta.app_label == 'myApp'
+            and model.__name__ in PUBLISHED_MODELS
+            and content_db_available()
+        ):
+            return CONTENT_DB_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The published database is produced by copying, never by migrating
+        if db == CONTENT_DB_ALIAS:
+            return False
+        return None
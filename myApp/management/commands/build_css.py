@@ -0,0 +1,150 @@
+"""
+Management command to compile the Tailwind CSS used by the templates.
+
+Replaces the in-browser Tailwind CDN compiler: scans the templates for the
+classes actually used, reuses the inline ``tailwind.config`` theme from each
+base template (navy/gold/amber palette etc.), compiles and minifies with the
+Tailwind CLI and writes a content-hashed file into STATIC_ROOT. The
+``{% compiled_css %}`` template tag then links the built file.
+
+Requires the Tailwind v3 CLI (standalone binary or npm package); point
+settings.TAILWIND_CLI at it if it is not on PATH as ``tailwindcss``.
+
+Usage:
+    python manage.py build_css
+    python manage.py build_css --bundle=site
+    python manage.py build_css --list-classes
+"""
+
+import json
+import os
+import re
+import shlex
+import subprocess
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from myApp.utils.asset_manifest import write_asset
+
+
+TEMPLATES_DIR = os.path.join(settings.BASE_DIR, 'myApp', 'templates')
+
+# bundle name -> (template holding the inline tailwind.config, templates to scan)
+BUNDLES = {
+    'site': ('myApp/base.html', ['myApp']),
+    'dashboard': ('dashboard/base.html', ['dashboard']),
+}
+
+CLASS_ATTR_RE = re.compile(r'class\s*=\s*"([^"]*)"|class\s*=\s*\'([^\']*)\'')
+CLASS_LIST_RE = re.compile(r'classList\.(?:add|remove|toggle|contains)\(([^)]*)\)')
+JS_STRING_RE = re.compile(r'[\'"]([^\'"]+)[\'"]')
+TEMPLATE_TAG_RE = re.compile(r'{%.*?%}|{{.*?}}', re.S)
+CONFIG_RE = re.compile(r'tailwind\.config\s*=\s*({.*?})\s*;?\s*</script>', re.S)
+
+INPUT_CSS = '@tailwind base;\n@tailwind components;\n@tailwind utilities;\n'
+
+
+def template_files(subdirs):
+    for subdir in subdirs:
+        for root, _dirs, files in os.walk(os.path.join(TEMPLATES_DIR, subdir)):
+            for filename in sorted(files):
+                if filename.endswith('.html'):
+                    yield os.path.join(root, filename)
+
+
+def extract_classes(source):
+    """Class names used in a template, including ones toggled from inline JS."""
+    classes = set()
+    for match in CLASS_ATTR_RE.finditer(source):
+        value = match.group(1) if match.group(1) is not None else match.group(2)
+        # {% cycle 'text-gold' 'text-teal' %} and friends carry class names in strings
+        for tag in TEMPLATE_TAG_RE.findall(value):
+            classes.update(JS_STRING_RE.findall(tag))
+        classes.update(TEMPLATE_TAG_RE.sub(' ', value).split())
+    for match in CLASS_LIST_RE.finditer(source):
+        classes.update(JS_STRING_RE.findall(match.group(1)))
+    return {c for c in classes if c and ' ' not in c}
+
+
+def extract_config(source):
+    match = CONFIG_RE.search(source)
+    if not match:
+        raise CommandError('No inline tailwind.config found')
+    return match.group(1)
+
+
+class Command(BaseCommand):
+    help = 'Compile, purge and minify Tailwind CSS from the templates into STATIC_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bundle',
+            choices=sorted(BUNDLES),
+            action='append',
+            help='Bundle(s) to build (default: all)'
+        )
+        parser.add_argument(
+            '--list-classes',
+            action='store_true',
+            help='Only print the classes found in the templates'
+        )
+
+    def handle(self, *args, **options):
+        for bundle in options['bundle'] or sorted(BUNDLES):
+            config_template, subdirs = BUNDLES[bundle]
+            files = list(template_files(subdirs))
+            classes = set()
+            for path in files:
+                with open(path, encoding='utf-8') as f:
+                    classes |= extract_classes(f.read())
+
+            if options['list_classes']:
+                self.stdout.write(self.style.SUCCESS(f'{bundle}: {len(classes)} classes'))
+                self.stdout.write('\n'.join(sorted(classes)))
+                continue
+
+            with open(os.path.join(TEMPLATES_DIR, config_template), encoding='utf-8') as f:
+                config = extract_config(f.read())
+
+            self.stdout.write(f'Building {bundle} CSS from {len(files)} templates ({len(classes)} classes)...')
+            css = self._compile(config, files, classes)
+            path = write_asset(f'css/{bundle}', css, 'css')
+            self.stdout.write(self.style.SUCCESS(f'  ✓ {path} ({len(css) / 1024:.1f} KB)'))
+
+    def _compile(self, config, files, classes):
+        cli = shlex.split(getattr(settings, 'TAILWIND_CLI', 'tailwindcss'))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config_path = os.path.join(tmpdir, 'tailwind.config.js')
+            input_path = os.path.join(tmpdir, 'input.css')
+            output_path = os.path.join(tmpdir, 'output.css')
+            with open(config_path, 'w') as f:
+                # Same theme as the CDN config; classes found by our scan are
+                # safelisted so ones assembled in template tags survive purging.
+                f.write(
+                    f'const config = {config};\n'
+                    f'config.content = {_js_list(files)};\n'
+                    f'config.safelist = {_js_list(sorted(classes))};\n'
+                    'module.exports = config;\n'
+                )
+            with open(input_path, 'w') as f:
+                f.write(INPUT_CSS)
+            try:
+                subprocess.run(
+                    cli + ['-c', config_path, '-i', input_path, '-o', output_path, '--minify'],
+                    check=True, capture_output=True, text=True,
+                )
+            except FileNotFoundError:
+                raise CommandError(
+                    f'Tailwind CLI not found ({cli[0]}). Install the standalone binary '
+                    'or set settings.TAILWIND_CLI (e.g. "npx tailwindcss@3").'
+                )
+            except subprocess.CalledProcessError as e:
+                raise CommandError(f'Tailwind build failed: {e.stderr.strip()}')
+            with open(output_path, 'rb') as f:
+                return f.read()
+
+
+def _js_list(values):
+    return json.dumps([str(v) for v in values])
@@ -0,0 +1,57 @@
+"""
+Management command to build the self-hosted, subsetted Inter web fonts.
+
+Subsets the vendored Inter files to Latin plus every character used by the
+public templates and content, and writes content-hashed font files and an
+``@font-face`` stylesheet (``font-display: swap``) into STATIC_ROOT. The base
+template preloads the critical weights and stops loading Google Fonts.
+
+Requires the Inter files in settings.FONT_SOURCE_DIR (or the FONT_SOURCE_DIR
+environment variable); subsetting needs ``fonttools`` and ``brotli``.
+
+Usage:
+    python manage.py build_fonts
+    python manage.py build_fonts --weights 400 700
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from myApp.utils.font_subset import WEIGHT_FILES, build_fonts, text_codepoints, font_subset
+
+
+class Command(BaseCommand):
+    help = 'Build subsetted, self-hosted Inter fonts with an @font-face stylesheet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--weights',
+            type=int,
+            nargs='+',
+            choices=sorted(WEIGHT_FILES),
+            help='Weights to build (default: settings.FONT_WEIGHTS)'
+        )
+
+    def handle(self, *args, **options):
+        weights = options['weights'] or settings.FONT_WEIGHTS
+        codepoints = text_codepoints()
+        self.stdout.write(f'Found {len(codepoints)} distinct characters in templates and content')
+        if font_subset is None:
+            self.stdout.write(self.style.WARNING(
+                '  ⚠ fontTools not installed; using the vendored files without subsetting'
+            ))
+
+        try:
+            result = build_fonts(weights, settings.FONT_PRELOAD_WEIGHTS, codepoints)
+        except Exception as e:
+            raise CommandError(f'Error building fonts: {str(e)}')
+
+        for weight in result['missing']:
+            self.stdout.write(self.style.WARNING(
+                f'  ⚠ No {WEIGHT_FILES[weight]} file in {settings.FONT_SOURCE_DIR}'
+            ))
+        if not result['fonts']:
+            raise CommandError(f'No Inter font files found in {settings.FONT_SOURCE_DIR}')
+        for weight, path in sorted(result['fonts'].items()):
+            self.stdout.write(self.style.SUCCESS(f'  ✓ {weight}: {path}'))
+        self.stdout.write(self.style.SUCCESS(f'✅ {result["path"]}'))
@@ -0,0 +1,52 @@
+"""
+Management command to build the self-hosted Font Awesome icon subset.
+
+Collects the icons used by the templates and by the `icon` fields of
+Stat, Program, Testimonial, ImpactStory, ContactInfo and SocialLink, and
+writes a small content-hashed CSS file with the matching SVGs inlined.
+Dashboard saves add new icons to the build automatically.
+
+Requires the Font Awesome Free 6.x package (svgs/ and metadata/); set
+settings.FONTAWESOME_DIR (or the FONTAWESOME_DIR environment variable).
+
+Usage:
+    python manage.py build_icons
+    python manage.py build_icons --list
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from myApp.utils.icon_subset import icons_from_templates, icons_from_db, build_icon_css
+
+
+class Command(BaseCommand):
+    help = 'Build the Font Awesome icon subset used by templates and content'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Only print the icons in use'
+        )
+
+    def handle(self, *args, **options):
+        template_icons, modifiers = icons_from_templates()
+        db_icons = icons_from_db()
+        icons = template_icons | db_icons
+        self.stdout.write(
+            f'Found {len(icons)} icons ({len(template_icons)} in templates, {len(db_icons)} in content)'
+        )
+
+        if options['list']:
+            for style, name in sorted(icons):
+                self.stdout.write(f'  {style:8} {name}')
+            return
+
+        try:
+            result = build_icon_css(icons, modifiers)
+        except Exception as e:
+            raise CommandError(str(e))
+
+        for style, name in result['missing']:
+            self.stdout.write(self.style.WARNING(f'  ⚠ Not in Font Awesome Free: {style}/{name}'))
+        self.stdout.write(self.style.SUCCESS(f'✅ {result["path"]} ({len(result["icons"])} icons)'))
@@ -0,0 +1,97 @@
+"""
+Management command to build responsive variants for local MediaAssets.
+
+Writes the WebP/AVIF srcset copies used by ``{% media_img %}`` for every
+local asset that does not have them yet. With --register, image files under
+MEDIA_ROOT/uploads that have no MediaAsset (e.g. copied in by hand) get one,
+so templates can read their intrinsic size from the index.
+
+Usage:
+    python manage.py build_image_variants
+    python manage.py build_image_variants --register
+    python manage.py build_image_variants --force
+"""
+
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from myApp.models import MediaAsset
+from myApp.utils.image_variants import build_variants, delete_variants, variant_formats
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.avif', '.gif')
+
+
+class Command(BaseCommand):
+    help = 'Build WebP/AVIF srcset variants for local media assets'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--register',
+            action='store_true',
+            help='Create MediaAssets for files in MEDIA_ROOT/uploads that have none'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rebuild variants that already exist'
+        )
+
+    def handle(self, *args, **options):
+        if options['register']:
+            self._register()
+
+        self.stdout.write(f'Variant formats: {", ".join(variant_formats())}')
+        built = 0
+        for asset in MediaAsset.objects.filter(storage_type='local').exclude(image_file=''):
+            if asset.variants and not options['force']:
+                continue
+            if not os.path.exists(asset.image_file.path):
+                self.stdout.write(self.style.WARNING(f'  ⚠ Missing file: {asset.image_file.name}'))
+                continue
+            try:
+                delete_variants(asset)
+                asset.variants = build_variants(asset)
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f'  ⚠ {asset.image_file.name}: {str(e)}'))
+                continue
+            asset.save(update_fields=['variants', 'updated_at'])
+            built += 1
+            count = sum(len(paths) for paths in asset.variants.values())
+            self.stdout.write(f'  ✓ {asset.image_file.name} ({count} variants)')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Built variants for {built} assets'))
+
+    def _register(self):
+        known = set(MediaAsset.objects.exclude(image_file='').values_list('image_file', flat=True))
+        uploads = os.path.join(settings.MEDIA_ROOT, 'uploads')
+        created = 0
+        for root, _dirs, files in os.walk(uploads):
+            for filename in sorted(files):
+                if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                full_path = os.path.join(root, filename)
+                name = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, '/')
+                if name in known:
+                    continue
+                try:
+                    with Image.open(full_path) as img:
+                        width, height = img.size
+                except Exception as e:
+                    self.stdout.write(self.style.WARNING(f'  ⚠ Not an image: {name} ({str(e)})'))
+                    continue
+                MediaAsset.objects.create(
+                    title=filename,
+                    image_file=name,
+                    storage_type='local',
+                    width=width,
+                    height=height,
+                    format=os.path.splitext(filename)[1][1:].upper(),
+                    file_size=os.path.getsize(full_path),
+                )
+                created += 1
+                self.stdout.write(f'  ✓ Registered {name}')
+        self.stdout.write(self.style.SUCCESS(f'Registered {created} existing uploads'))
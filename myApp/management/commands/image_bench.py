@@ -0,0 +1,357 @@
+"""
+Management command to benchmark the image upload pipeline.
+
+Runs smart_compress_image, smart_compress_to_bytes, placeholder_from_file and
+process_local_image over a generated corpus (JPEG at several megapixel
+counts, PNG with alpha, palette PNG, WebP, AVIF when Pillow can write it,
+animated GIF) and over the files in MEDIA_ROOT/uploads. For every image and
+stage it reports the median time, peak RSS, output bytes against the target
+and the number of encodes (Image.save calls).
+
+Each stage runs in a fresh worker process so peak RSS is per stage. Results
+can be saved as a baseline; a later run compared against it flags every
+metric that got worse by more than --threshold and exits non-zero.
+
+Usage:
+    python manage.py image_bench
+    python manage.py image_bench --no-uploads --repeat=5
+    python manage.py image_bench --target-bytes=500000
+    python manage.py image_bench --save-baseline=image-bench.json
+    python manage.py image_bench --baseline=image-bench.json --threshold=0.2
+"""
+
+import io
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from myApp.utils import local_file_utils
+from myApp.utils.cloudinary_utils import smart_compress_to_bytes
+from myApp.utils.image_placeholders import placeholder_from_file
+from myApp.utils.local_file_utils import TARGET_BYTES, process_local_image, smart_compress_image
+
+
+STAGES = ('compress', 'compress_bytes', 'placeholder', 'process')
+
+# name -> (format, megapixels, mode, frames)
+SYNTHETIC_CORPUS = {
+    'jpeg-2mp.jpg': ('JPEG', 2, 'RGB', 1),
+    'jpeg-12mp.jpg': ('JPEG', 12, 'RGB', 1),
+    'jpeg-24mp.jpg': ('JPEG', 24, 'RGB', 1),
+    'png-alpha-4mp.png': ('PNG', 4, 'RGBA', 1),
+    'png-palette-2mp.png': ('PNG', 2, 'P', 1),
+    'webp-8mp.webp': ('WEBP', 8, 'RGB', 1),
+    'avif-4mp.avif': ('AVIF', 4, 'RGB', 1),
+    'gif-animated.gif': ('GIF', 0.5, 'P', 12),
+}
+
+# Metrics compared against the baseline; higher is worse for all of them
+COMPARED_METRICS = ('time_ms', 'peak_rss_mb', 'output_bytes', 'encodes')
+
+
+def _texture(size, rng):
+    """Photo-like content: smooth colour fields plus fine grain, deterministic per rng."""
+    width, height = size
+    coarse = (max(1, width // 64), max(1, height // 64))
+    img = Image.frombytes('RGB', coarse, rng.randbytes(coarse[0] * coarse[1] * 3))
+    img = img.resize(size, Image.BICUBIC)
+    grain = Image.frombytes('RGB', (256, 256), rng.randbytes(256 * 256 * 3))
+    tiled = Image.new('RGB', size)
+    for x in range(0, width, 256):
+        for y in range(0, height, 256):
+            tiled.paste(grain, (x, y))
+    return Image.blend(img, tiled, 0.2)
+
+
+def write_synthetic_corpus(directory, seed=0):
+    """Write the synthetic corpus; returns (paths, skipped formats)."""
+    Image.init()
+    paths, skipped = [], []
+    for name, (fmt, megapixels, mode, frames) in SYNTHETIC_CORPUS.items():
+        if fmt not in Image.SAVE:
+            skipped.append(name)
+            continue
+        rng = random.Random(f'{seed}:{name}')
+        width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+        size = (width, int(width * 3 / 4))
+        images = [_texture(size, rng) for _ in range(frames)]
+        if mode == 'RGBA':
+            mask = Image.linear_gradient('L').resize(size)
+            images = [img.convert('RGBA') for img in images]
+            for img in images:
+                img.putalpha(mask)
+        elif mode == 'P':
+            images = [img.quantize(256) for img in images]
+
+        path = os.path.join(directory, name)
+        options = {'quality': 95} if fmt in ('JPEG', 'WEBP', 'AVIF') else {}
+        if frames > 1:
+            options.update(save_all=True, append_images=images[1:], duration=80, loop=0)
+        images[0].save(path, fmt, **options)
+        paths.append(path)
+    return paths, skipped
+
+
+def upload_corpus():
+    uploads = os.path.join(settings.MEDIA_ROOT, 'uploads')
+    return sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(uploads)
+        for name in files
+    )
+
+
+@contextmanager
+def count_encodes():
+    """Count Image.save calls made inside the block."""
+    counter = [0]
+    original = Image.Image.save
+
+    def save(self, *args, **kwargs):
+        counter[0] += 1
+        return original(self, *args, **kwargs)
+
+    Image.Image.save = save
+    try:
+        yield counter
+    finally:
+        Image.Image.save = original
+
+
+def _rss_kb(field):
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _reset_peak_rss():
+    # Linux resets VmHWM to the current RSS on "5"; elsewhere the peak is process-wide
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _call_stage(stage, data, name, target_bytes):
+    """Run one stage; returns the output size in bytes."""
+    if stage == 'compress':
+        output, _ = smart_compress_image(io.BytesIO(data), target_bytes=target_bytes)
+        return len(output.getvalue())
+    if stage == 'compress_bytes':
+        output, _ = smart_compress_to_bytes(io.BytesIO(data), target_bytes=target_bytes)
+        return len(output)
+    if stage == 'placeholder':
+        return len(placeholder_from_file(io.BytesIO(data))['placeholder'])
+    # process_local_image compresses against the module's own target
+    local_file_utils.TARGET_BYTES = target_bytes
+    return process_local_image(SimpleUploadedFile(os.path.basename(name), data))['file_size']
+
+
+def run_stage(path, stage, target_bytes, repeat):
+    """Benchmark one stage on one image (runs in a fresh worker process)."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    times = []
+    _reset_peak_rss()
+    rss_before = _rss_kb('VmRSS')
+    try:
+        for i in range(repeat):
+            with count_encodes() as encodes:
+                start = time.perf_counter()
+                output_bytes = _call_stage(stage, data, path, target_bytes)
+                times.append((time.perf_counter() - start) * 1000)
+            if i == 0:
+                first_encodes = encodes[0]
+    except Exception as e:
+        return {'error': str(e)}
+    peak = _rss_kb('VmHWM')
+    return {
+        'time_ms': round(statistics.median(times), 2),
+        'peak_rss_mb': round(peak / 1024, 1),
+        'rss_growth_mb': round(max(0, peak - rss_before) / 1024, 1),
+        'output_bytes': output_bytes,
+        'encodes': first_encodes,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark image compression and processing over a synthetic and the uploaded corpus'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Runs per stage and image; the median time is reported (default: 3)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Parallel worker processes; more is faster but noisier (default: 1)'
+        )
+        parser.add_argument(
+            '--target-bytes',
+            type=int,
+            default=TARGET_BYTES,
+            help=f'Compression target (default: {TARGET_BYTES})'
+        )
+        parser.add_argument(
+            '--no-synthetic',
+            action='store_true',
+            help='Skip the generated corpus'
+        )
+        parser.add_argument(
+            '--no-uploads',
+            action='store_true',
+            help='Skip the files in MEDIA_ROOT/uploads'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed for the generated corpus (default: 0)'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print results as JSON'
+        )
+        parser.add_argument(
+            '--save-baseline',
+            type=str,
+            default=None,
+            help='Write the results to this file'
+        )
+        parser.add_argument(
+            '--baseline',
+            type=str,
+            default=None,
+            help='Compare with a saved baseline and fail on regressions'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Relative increase counted as a regression (default: 0.2)'
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            corpus = {}
+            if not options['no_synthetic']:
+                paths, skipped = write_synthetic_corpus(tmpdir, options['seed'])
+                corpus.update((f'synthetic/{os.path.basename(p)}', p) for p in paths)
+                for name in skipped:
+                    self.stdout.write(self.style.WARNING(f'  ⚠ {name}: format not supported by Pillow here'))
+            if not options['no_uploads']:
+                uploads = os.path.join(settings.MEDIA_ROOT, 'uploads')
+                corpus.update(
+                    (f'uploads/{os.path.relpath(p, uploads)}', p) for p in upload_corpus()
+                )
+            if not corpus:
+                raise CommandError('Empty corpus')
+            results = self._run(corpus, options)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2, sort_keys=True))
+        else:
+            self._print(results)
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+                f.write('\n')
+            self.stdout.write(self.style.SUCCESS(f'✅ Baseline saved to {options["save_baseline"]}'))
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                self._compare(json.load(f), results, options['threshold'])
+
+    def _run(self, corpus, options):
+        images = {}
+        for name, path in corpus.items():
+            try:
+                with Image.open(path) as img:
+                    size = img.size
+            except Exception:
+                self.stdout.write(self.style.WARNING(f'  ⚠ {name}: Pillow cannot open it, skipped'))
+                continue
+            images[name] = {
+                'input_bytes': os.path.getsize(path),
+                'megapixels': round(size[0] * size[1] / 1_000_000, 2),
+                'target_bytes': options['target_bytes'],
+                'stages': {},
+            }
+
+        # A fresh fork per task keeps peak RSS per stage and stages independent
+        with multiprocessing.get_context('fork').Pool(options['workers'], maxtasksperchild=1) as pool:
+            pending = {
+                (name, stage): pool.apply_async(
+                    run_stage, (corpus[name], stage, options['target_bytes'], options['repeat'])
+                )
+                for name in images for stage in STAGES
+            }
+            for (name, stage), result in pending.items():
+                images[name]['stages'][stage] = result.get()
+        return {
+            'config': {'repeat': options['repeat'], 'target_bytes': options['target_bytes'], 'seed': options['seed']},
+            'images': images,
+        }
+
+    def _print(self, results):
+        for name, image in results['images'].items():
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}  {image["megapixels"]} MP, {image["input_bytes"] / 1024:.0f} KB'
+            ))
+            for stage, stats in image['stages'].items():
+                if 'error' in stats:
+                    self.stdout.write(self.style.WARNING(f'  ⚠ {stage:15} {stats["error"]}'))
+                    continue
+                over = ' OVER TARGET' if stats['output_bytes'] > image['target_bytes'] and stage != 'placeholder' else ''
+                self.stdout.write(
+                    f'  {stage:15} {stats["time_ms"]:9.1f}ms  peak={stats["peak_rss_mb"]:7.1f}MB  '
+                    f'(+{stats["rss_growth_mb"]:.1f})  out={stats["output_bytes"] / 1024:8.0f}KB  '
+                    f'encodes={stats["encodes"]}{over}'
+                )
+
+    def _compare(self, baseline, results, threshold):
+        if baseline.get('config') != results['config']:
+            self.stdout.write(self.style.WARNING(
+                f'  ⚠ Baseline was run with {baseline.get("config")}, this run with {results["config"]}'
+            ))
+        regressions = []
+        for name, image in results['images'].items():
+            before = baseline['images'].get(name)
+            if not before:
+                continue
+            for stage, stats in image['stages'].items():
+                old = before['stages'].get(stage, {})
+                for metric in COMPARED_METRICS:
+                    if metric not in stats or not old.get(metric):
+                        continue
+                    change = (stats[metric] - old[metric]) / old[metric]
+                    if change > threshold:
+                        regressions.append(
+                            f'{name} {stage} {metric}: {old[metric]} -> {stats[metric]} ({change:+.0%})'
+                        )
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.WARNING(f'  ⚠ {line}'))
+            raise CommandError(f'{len(regressions)} regression(s) over {threshold:.0%}')
+        self.stdout.write(self.style.SUCCESS(f'✅ No regressions over {threshold:.0%} against the baseline'))
@@ -0,0 +1,488 @@
+"""
+Management command to load-test the site through its WSGI application.
+
+Builds a scratch environment (database, published content, cache and media
+in a temporary directory, seeded with `import_homepage_data` plus gallery
+assets and a staff user), then drives myProject.wsgi.application with N
+concurrent workers over a weighted mix of public pages, dashboard gallery
+pages and image uploads. The live database, cache and media are never
+touched.
+
+Requests go straight into the WSGI callable by default, or over a local
+socket to a threaded WSGI server with --socket. With --asgi they go to
+myProject.asgi.application instead (public pages served by the async views),
+all workers sharing one event loop as they would one ASGI worker process.
+Results are RPS, error rate
+and p50/p95/p99 latency overall, per group and per endpoint. The JSON output
+has sorted keys and no timestamps, so runs on two commits can be diffed
+directly, or compared with --compare.
+
+Usage:
+    python manage.py loadtest
+    python manage.py loadtest --workers=8 --requests=2000 --socket
+    python manage.py loadtest --mix=public:80,gallery:15,upload:5
+    python manage.py loadtest --output=loadtest-before.json
+    python manage.py loadtest --compare=loadtest-before.json
+
+    # Async views under ASGI against the sync views under WSGI
+    python manage.py loadtest --mix=public:100 --workers=64 --output=wsgi.json
+    python manage.py loadtest --mix=public:100 --workers=64 --asgi --compare=wsgi.json
+"""
+
+import asyncio
+import http.client
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, RequestFactory
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.utils.crypto import get_random_string
+
+from myApp.utils.performance import percentile
+from myApp.utils.public_pages import public_pages
+
+
+# Set in the scratch child process; its value is the scratch directory
+SCRATCH_ENV = 'LOADTEST_SCRATCH_DIR'
+DEFAULT_MIX = 'public:80,gallery:15,upload:5'
+GALLERY_PAGE_SIZE = 24
+UPLOAD_SIZE = (1600, 1200)
+
+
+def _stats(samples, elapsed):
+    latencies = [ms for ms, _ in samples]
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'rps': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'mean_ms': round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        'max_ms': round(max(latencies), 2) if latencies else 0.0,
+    }
+
+
+def _parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition(':')
+        if name.strip() not in ('public', 'gallery', 'upload'):
+            raise CommandError(f'Unknown request group in --mix: {name!r}')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Load-test public pages, gallery pages and uploads through the WSGI or ASGI application'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Concurrent workers (default: 4)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=1000,
+            help='Total requests, excluding warm-up (default: 1000)'
+        )
+        parser.add_argument(
+            '--mix',
+            type=str,
+            default=DEFAULT_MIX,
+            help=f'Weighted request groups (default: {DEFAULT_MIX})'
+        )
+        parser.add_argument(
+            '--assets',
+            type=int,
+            default=120,
+            help='Gallery assets to seed (default: 120)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed for the request sequence (default: 0)'
+        )
+        parser.add_argument(
+            '--socket',
+            action='store_true',
+            help='Send requests over a local socket to a threaded WSGI server'
+        )
+        parser.add_argument(
+            '--asgi',
+            action='store_true',
+            help='Drive the ASGI application (async public views) on one event loop'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print results as JSON'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=None,
+            help='Also write the JSON results to this file'
+        )
+        parser.add_argument(
+            '--compare',
+            type=str,
+            default=None,
+            help='Compare with the JSON results of an earlier run'
+        )
+
+    def handle(self, *args, **options):
+        _parse_mix(options['mix'])
+        if options['asgi'] and options['socket']:
+            raise CommandError('--asgi and --socket are mutually exclusive')
+        if os.environ.get(SCRATCH_ENV):
+            return self._run(options)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            env = dict(
+                os.environ,
+                DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'myProject.settings'),
+                DATABASE_PATH=os.path.join(tmpdir, 'db.sqlite3'),
+                CONTENT_DB_PATH=os.path.join(tmpdir, 'content.sqlite3'),
+                CACHE_DIR=os.path.join(tmpdir, 'cache'),
+                MEDIA_ROOT=os.path.join(tmpdir, 'media'),
+                METRICS_DIR=os.path.join(tmpdir, 'metrics'),
+                # One Server-Timing log line per request would drown the report
+                TIMING_LOG_LEVEL='WARNING',
+                # Async views are opt-in; the ASGI run measures them
+                ASYNC_VIEWS='True' if options['asgi'] else 'False',
+                **{SCRATCH_ENV: tmpdir},
+            )
+            manage = [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py')]
+            self.stdout.write('Preparing scratch environment...')
+            for step in (['migrate', '--noinput'], ['import_homepage_data'], ['publish_content']):
+                result = subprocess.run(manage + step, env=env, capture_output=True, text=True)
+                if result.returncode:
+                    raise CommandError(f'`manage.py {step[0]}` failed:\n{result.stderr}')
+
+            forwarded = [
+                f'--workers={options["workers"]}', f'--requests={options["requests"]}',
+                f'--mix={options["mix"]}', f'--assets={options["assets"]}', f'--seed={options["seed"]}',
+            ]
+            forwarded += [f'--{flag}' for flag in ('socket', 'asgi', 'json') if options[flag]]
+            forwarded += [
+                f'--{name}={os.path.abspath(options[name])}'
+                for name in ('output', 'compare') if options[name]
+            ]
+            result = subprocess.run(manage + ['loadtest'] + forwarded, env=env)
+            if result.returncode:
+                raise CommandError('Load test failed')
+
+    def _run(self, options):
+        session_cookie = self._seed(options['assets'])
+        plan = self._plan(options, session_cookie)
+        if options['asgi']:
+            from myProject.asgi import application
+            send = self._asgi_sender(application)
+        else:
+            from myProject.wsgi import application
+            send = self._socket_sender(application) if options['socket'] else self._wsgi_sender(application)
+
+        # Warm-up: every endpoint once (page cache, critical CSS, connections)
+        for group, label, request in (item for entries in plan.values() for item in entries):
+            send(request)
+
+        samples = self._drive(plan, send, options)
+        results = self._report(samples, options)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+                f.write('\n')
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2, sort_keys=True))
+        else:
+            self._print(results)
+        if options['compare']:
+            with open(options['compare']) as f:
+                self._print_comparison(json.load(f), results)
+
+    def _seed(self, count):
+        """Gallery assets and a logged-in staff session; returns the Cookie header."""
+        from django.contrib.auth.models import User
+        from myApp.models import MediaAsset
+
+        MediaAsset.objects.bulk_create(
+            MediaAsset(
+                title=f'Load test image {i}',
+                image_file=f'uploads/loadtest/image-{i}.jpg',
+                folder='loadtest',
+                width=1200,
+                height=800,
+                format='jpeg',
+                file_size=150_000,
+                storage_type='local',
+            )
+            for i in range(count)
+        )
+        user = User.objects.create_superuser('loadtest', 'loadtest@example.com', get_random_string(20))
+        client = Client()
+        client.force_login(user)
+        self.csrf_token = get_random_string(32)
+        return f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}; ' \
+               f'{settings.CSRF_COOKIE_NAME}={self.csrf_token}'
+
+    def _plan(self, options, session_cookie):
+        """Requests per group: (group, label, request dict)."""
+        browser = {'HTTP_ACCEPT': 'text/html,*/*', 'HTTP_ACCEPT_ENCODING': 'gzip, br'}
+        staff = dict(browser, HTTP_COOKIE=session_cookie)
+        pages = max(1, -(-options['assets'] // GALLERY_PAGE_SIZE))
+
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.effect_noise(UPLOAD_SIZE, 64).convert('RGB').save(buffer, 'JPEG', quality=92)
+        upload = encode_multipart(BOUNDARY, {
+            'image': _NamedBytes(buffer.getvalue(), 'loadtest.jpg'),
+            'folder': 'loadtest',
+            'storage_type': 'local',
+        })
+
+        plan = {
+            'public': [
+                ('public', path, {'method': 'GET', 'path': path, 'headers': browser})
+                for path in public_pages()
+            ],
+            'gallery': [
+                ('gallery', label, {'method': 'GET', 'path': path, 'headers': staff})
+                for label, path in [('gallery', '/dashboard/gallery/')]
+                + [(f'gallery?page={n}', f'/dashboard/gallery/?page={n}') for n in range(2, min(pages, 3) + 1)]
+                + [('gallery?search', '/dashboard/gallery/?search=image-1')]
+            ],
+            'upload': [
+                ('upload', 'upload_image', {
+                    'method': 'POST', 'path': '/dashboard/upload-image/', 'body': upload,
+                    'content_type': MULTIPART_CONTENT,
+                    'headers': dict(staff, HTTP_X_CSRFTOKEN=self.csrf_token),
+                }),
+            ],
+        }
+        mix = _parse_mix(options['mix'])
+        return {group: plan[group] for group in mix if mix[group] > 0}
+
+    def _wsgi_sender(self, application):
+        factory = RequestFactory(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+
+        def send(request):
+            environ = factory.generic(
+                request['method'], request['path'], request.get('body', b''),
+                content_type=request.get('content_type', 'application/octet-stream'),
+                **request['headers'],
+            ).environ
+            status = []
+            result = application(environ, lambda s, headers, exc_info=None: status.append(s))
+            try:
+                for _ in result:
+                    pass
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+            return int(status[0].split()[0])
+        return send
+
+    def _socket_sender(self, application):
+        from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+        server.set_app(application)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address[:2]
+
+        def send(request):
+            headers = {
+                name[5:].replace('_', '-').title(): value
+                for name, value in request['headers'].items()
+            }
+            headers['Host'] = settings.ALLOWED_HOSTS[0]
+            if 'body' in request:
+                headers['Content-Type'] = request['content_type']
+            conn = http.client.HTTPConnection(host, port, timeout=60)
+            try:
+                conn.request(request['method'], request['path'], body=request.get('body'), headers=headers)
+                response = conn.getresponse()
+                response.read()
+                return response.status
+            finally:
+                conn.close()
+        return send
+
+    def _asgi_sender(self, application):
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, daemon=True).start()
+
+        async def call(request):
+            headers = [
+                (name[5:].replace('_', '-').lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in request['headers'].items()
+            ]
+            headers.append((b'host', settings.ALLOWED_HOSTS[0].encode('latin-1')))
+            body = request.get('body', b'')
+            if body:
+                headers.append((b'content-type', request['content_type'].encode('latin-1')))
+                headers.append((b'content-length', str(len(body)).encode('latin-1')))
+            path, _, query = request['path'].partition('?')
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': request['method'], 'scheme': 'http', 'root_path': '',
+                'path': path, 'raw_path': path.encode('latin-1'), 'query_string': query.encode('latin-1'),
+                'headers': headers, 'server': ('127.0.0.1', 80), 'client': ('127.0.0.1', 50000),
+            }
+            status = []
+            done = asyncio.Event()
+            messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                # Django listens for a disconnect while the request runs
+                await done.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+                elif message['type'] == 'http.response.body' and not message.get('more_body'):
+                    done.set()
+
+            await application(scope, receive, send)
+            return status[0]
+
+        def send(request):
+            return asyncio.run_coroutine_threadsafe(call(request), loop).result()
+        return send
+
+    def _drive(self, plan, send, options):
+        mix = _parse_mix(options['mix'])
+        groups = list(plan)
+        weights = [mix[group] for group in groups]
+        remaining = [options['requests']]
+        remaining_lock = threading.Lock()
+        samples = []
+        samples_lock = threading.Lock()
+
+        def worker(index):
+            rng = random.Random(options['seed'] * 1000 + index)
+            local = []
+            while True:
+                with remaining_lock:
+                    if remaining[0] <= 0:
+                        break
+                    remaining[0] -= 1
+                group, label, request = rng.choice(plan[rng.choices(groups, weights)[0]])
+                start = time.perf_counter()
+                try:
+                    ok = send(request) < 400
+                except Exception:
+                    ok = False
+                local.append((group, label, (time.perf_counter() - start) * 1000, ok))
+            with samples_lock:
+                samples.extend(local)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['workers'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - start
+        return samples
+
+    def _report(self, samples, options):
+        def select(**match):
+            return [
+                (ms, ok) for group, label, ms, ok in samples
+                if all({'group': group, 'label': label}[k] == v for k, v in match.items())
+            ]
+
+        return {
+            'commit': _git_commit(),
+            'config': {
+                'workers': options['workers'],
+                'requests': options['requests'],
+                'mix': options['mix'],
+                'assets': options['assets'],
+                'seed': options['seed'],
+                'transport': 'asgi' if options['asgi'] else 'socket' if options['socket'] else 'wsgi',
+            },
+            'elapsed_s': round(self.elapsed, 2),
+            'overall': _stats([(ms, ok) for _, _, ms, ok in samples], self.elapsed),
+            'groups': {
+                group: _stats(select(group=group), self.elapsed)
+                for group in sorted({s[0] for s in samples})
+            },
+            'endpoints': {
+                label: _stats(select(label=label), self.elapsed)
+                for label in sorted({s[1] for s in samples})
+            },
+        }
+
+    def _print(self, results):
+        config = results['config']
+        self.stdout.write(self.style.SUCCESS(
+            f'{config["requests"]} requests, {config["workers"]} workers, '
+            f'{config["transport"]} transport, {results["elapsed_s"]}s'
+        ))
+        rows = [('overall', results['overall'])] + list(results['groups'].items()) \
+            + [(f'  {label}', stats) for label, stats in results['endpoints'].items()]
+        for name, stats in rows:
+            self.stdout.write(
+                f'  {name:28} n={stats["requests"]:5}  rps={stats["rps"]:7.1f}  '
+                f'p50={stats["p50_ms"]:7.2f}ms  p95={stats["p95_ms"]:7.2f}ms  '
+                f'p99={stats["p99_ms"]:7.2f}ms  errors={stats["error_rate"]:.2%}'
+            )
+
+    def _print_comparison(self, before, after):
+        self.stdout.write(self.style.SUCCESS(
+            f'Compared with {before.get("commit") or "baseline"} -> {after.get("commit") or "current"}'
+        ))
+        rows = [('overall', before['overall'], after['overall'])] + [
+            (group, before['groups'][group], stats)
+            for group, stats in after['groups'].items() if group in before['groups']
+        ]
+        for name, old, new in rows:
+            rps = (new['rps'] - old['rps']) / old['rps'] if old['rps'] else 0.0
+            p95 = (new['p95_ms'] - old['p95_ms']) / old['p95_ms'] if old['p95_ms'] else 0.0
+            line = f'  {name:28} rps {rps:+7.1%}  p95 {p95:+7.1%}'
+            self.stdout.write(self.style.WARNING(line) if rps < -0.1 or p95 > 0.1 else line)
+
+
+class _NamedBytes(io.BytesIO):
+    """File-like upload body with a name, as encode_multipart expects."""
+
+    def __init__(self, content, name):
+        super().__init__(content)
+        self.name = name
@@ -0,0 +1,49 @@
+"""
+Management command to mirror remote images referenced by content.
+
+Content saved from now on is mirrored automatically, and pages mirror any
+remaining remote image on first request; this fetches everything up front
+(e.g. after a deploy) so no visitor waits on the first fetch.
+
+Usage:
+    python manage.py mirror_remote_images
+    python manage.py mirror_remote_images --standin
+"""
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from myApp.utils.remote_mirror import (
+    REMOTE_IMAGE_FIELDS, mirror_remote_image, remote_image_urls, standin_fetcher,
+)
+
+
+class Command(BaseCommand):
+    help = 'Mirror remote images referenced by content into local media'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--standin',
+            action='store_true',
+            help='Use generated stand-in images instead of fetching (offline)'
+        )
+
+    def handle(self, *args, **options):
+        fetcher = standin_fetcher if options['standin'] else None
+        urls = set()
+        for name in REMOTE_IMAGE_FIELDS:
+            for instance in apps.get_model('myApp', name).objects.all():
+                urls.update(remote_image_urls(instance))
+        self.stdout.write(f'Found {len(urls)} remote images in content')
+
+        mirrored = 0
+        for url in sorted(urls):
+            try:
+                asset = mirror_remote_image(url, fetcher=fetcher)
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f'  ⚠ {str(e)}'))
+                continue
+            mirrored += 1
+            self.stdout.write(f'  ✓ {url} -> {asset.image_file.url}')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Mirrored {mirrored} of {len(urls)} remote images'))
@@ -0,0 +1,34 @@
+"""
+Management command to publish content into the read-only content database.
+
+Public views read from the published copy, so run this after seeding or
+editing content (the dashboard also has a "Publish" action).
+
+Usage:
+    python manage.py publish_content
+    python manage.py publish_content --output=/tmp/content.sqlite3
+"""
+
+from django.core.management.base import BaseCommand
+
+from myApp.utils.content_publish import publish_content_db
+
+
+class Command(BaseCommand):
+    help = 'Export content tables into the read-only published content database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=None,
+            help='Output path (default: settings.CONTENT_DB_PATH)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Publishing content...')
+        result = publish_content_db(options['output'])
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Published {result["rows"]} rows from {result["tables"]} tables '
+            f'to {result["path"]} ({result["file_size"] // 1024} KB)'
+        ))
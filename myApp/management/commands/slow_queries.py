@@ -0,0 +1,96 @@
+"""
+Management command to list the slowest SQL statements recorded by the slow
+query log (myApp/utils/slow_queries.py), merged across processes.
+
+Statements are grouped by fingerprint; each is shown with its total and
+maximum time, the views that ran it, how often it repeated within one
+request, its query plan and where in the app it was issued.
+
+Usage:
+    python manage.py slow_queries
+    python manage.py slow_queries --limit=5 --sort=count
+    python manage.py slow_queries --json
+    python manage.py slow_queries --clear
+"""
+
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from myApp.utils import slow_queries
+
+
+SORT_KEYS = {'total': 'total_ms', 'count': 'count', 'max': 'max_ms'}
+
+
+class Command(BaseCommand):
+    help = 'Show the top slow SQL statements by total time'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=10,
+            help='Number of statements to show (default: 10)'
+        )
+        parser.add_argument(
+            '--sort',
+            choices=sorted(SORT_KEYS),
+            default='total',
+            help='Order by total time, execution count or slowest execution (default: total)'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the entries as JSON'
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Delete every recorded entry'
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            slow_queries.clear()
+            self.stdout.write(self.style.SUCCESS(f'✅ Cleared {settings.SLOW_QUERY_DIR}'))
+            return
+
+        entries = slow_queries.collect()
+        entries.sort(key=lambda entry: entry[SORT_KEYS[options['sort']]], reverse=True)
+        entries = entries[:options['limit']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(entries, indent=2, sort_keys=True))
+            return
+
+        if not entries:
+            self.stdout.write(self.style.WARNING(
+                f'⚠ No statements over {settings.SLOW_QUERY_THRESHOLD_MS:g} ms recorded'
+            ))
+            return
+
+        for rank, entry in enumerate(entries, 1):
+            self.stdout.write(self.style.SUCCESS(
+                f'{rank:>2}. {entry["total_ms"]:.1f} ms total, {entry["count"]}x, '
+                f'avg {entry["total_ms"] / entry["count"]:.1f} ms, max {entry["max_ms"]:.1f} ms '
+                f'[{entry["fingerprint"]} on {entry["database"]}]'
+            ))
+            views = sorted(entry['views'].items(), key=lambda item: -item[1])
+            self.stdout.write('    views: ' + ', '.join(f'{view} ({count})' for view, count in views))
+            if entry.get('flagged_requests'):
+                self.stdout.write(
+                    f'    repeated in {entry["flagged_requests"]} requests, '
+                    f'up to {entry["max_per_request"]}x in one'
+                )
+            self.stdout.write(f'    {entry["sql"]}')
+            if entry['plan']:
+                self.stdout.write('    plan:')
+                for line in entry['plan']:
+                    self.stdout.write(f'      {line}')
+            if entry['stack']:
+                self.stdout.write('    stack:')
+                for frame in entry['stack']:
+                    self.stdout.write(f'      {frame}')
+            self.stdout.write('')
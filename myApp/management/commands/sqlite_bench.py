@@ -0,0 +1,163 @@
+"""
+Management command to benchmark SQLite reader latency under a concurrent writer.
+
+Runs the same workload twice against a scratch database: once with SQLite's
+defaults (rollback journal) and once with the PRAGMAs from settings.SQLITE_PRAGMAS.
+Each run measures reader latency while idle and while a writer is committing,
+so the effect of WAL on public readers during dashboard writes is visible.
+
+Usage:
+    python manage.py sqlite_bench
+    python manage.py sqlite_bench --readers=8 --duration=5 --rows=20000
+    python manage.py sqlite_bench --json
+"""
+
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from myApp.utils.performance import percentile
+
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'busy_timeout': 5000,
+}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark SQLite reader latency with and without a concurrent writer'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--readers',
+            type=int,
+            default=4,
+            help='Number of concurrent reader threads (default: 4)'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=3.0,
+            help='Seconds to run each phase (default: 3)'
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=5000,
+            help='Rows to seed into the scratch table (default: 5000)'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print results as JSON'
+        )
+
+    def handle(self, *args, **options):
+        results = {}
+        for name, pragmas in (('default', DEFAULT_PRAGMAS), ('tuned', settings.SQLITE_PRAGMAS)):
+            with tempfile.TemporaryDirectory() as tmpdir:
+                db_path = os.path.join(tmpdir, 'bench.sqlite3')
+                self._seed(db_path, pragmas, options['rows'])
+                results[name] = {
+                    'pragmas': pragmas,
+                    'idle': self._run_phase(db_path, pragmas, options, with_writer=False),
+                    'writing': self._run_phase(db_path, pragmas, options, with_writer=True),
+                }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        for name, result in results.items():
+            self.stdout.write(self.style.SUCCESS(f'{name} ({result["pragmas"].get("journal_mode")})'))
+            for phase in ('idle', 'writing'):
+                stats = result[phase]
+                self.stdout.write(
+                    f'  {phase:8} reads={stats["reads"]:6}  '
+                    f'p50={stats["p50_ms"]:7.2f}ms  p95={stats["p95_ms"]:7.2f}ms  '
+                    f'p99={stats["p99_ms"]:7.2f}ms  max={stats["max_ms"]:8.2f}ms  '
+                    f'writes={stats["writes"]}'
+                )
+
+    def _connect(self, db_path, pragmas):
+        conn = sqlite3.connect(db_path, timeout=20, check_same_thread=False)
+        for name, value in pragmas.items():
+            conn.execute(f'PRAGMA {name}={value}')
+        return conn
+
+    def _seed(self, db_path, pragmas, rows):
+        conn = self._connect(db_path, pragmas)
+        conn.execute('CREATE TABLE content (id INTEGER PRIMARY KEY, sort_order INTEGER, body TEXT)')
+        conn.executemany(
+            'INSERT INTO content (sort_order, body) VALUES (?, ?)',
+            ((i % 50, 'x' * 200) for i in range(rows))
+        )
+        conn.execute('CREATE INDEX content_sort ON content (sort_order)')
+        conn.commit()
+        conn.close()
+
+    def _run_phase(self, db_path, pragmas, options, with_writer):
+        stop = threading.Event()
+        latencies = []
+        lock = threading.Lock()
+        writes = [0]
+
+        def reader():
+            conn = self._connect(db_path, pragmas)
+            local = []
+            i = 0
+            while not stop.is_set():
+                start = time.perf_counter()
+                conn.execute(
+                    'SELECT id, body FROM content WHERE sort_order = ? ORDER BY id LIMIT 20',
+                    (i % 50,)
+                ).fetchall()
+                local.append((time.perf_counter() - start) * 1000)
+                i += 1
+            conn.close()
+            with lock:
+                latencies.extend(local)
+
+        def writer():
+            # Mimics a dashboard save: a short transaction touching a handful of rows.
+            conn = self._connect(db_path, pragmas)
+            while not stop.is_set():
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute(
+                    'UPDATE content SET body = ? WHERE sort_order = ?',
+                    ('y' * 200, writes[0] % 50)
+                )
+                conn.execute('INSERT INTO content (sort_order, body) VALUES (?, ?)', (writes[0] % 50, 'z'))
+                conn.execute('COMMIT')
+                writes[0] += 1
+                time.sleep(0.005)
+            conn.close()
+
+        threads = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        if with_writer:
+            threads.append(threading.Thread(target=writer))
+        for thread in threads:
+            thread.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        return {
+            'reads': len(latencies),
+            'writes': writes[0],
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'max_ms': round(max(latencies), 3) if latencies else 0.0,
+            'mean_ms': round(statistics.fmean(latencies), 3) if latencies else 0.0,
+        }
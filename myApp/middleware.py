@@ -0,0 +1,258 @@
+"""
+Request instrumentation middleware.
+
+Each middleware here runs natively in both modes: under ASGI it is awaited
+on the event loop instead of being wrapped in sync_to_async, which would
+cost a thread hop per request (see Django's "Asynchronous support" docs).
+"""
+
+import cProfile
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import middleware as auth_middleware
+from django.contrib.messages import middleware as messages_middleware
+from django.contrib.sessions import middleware as sessions_middleware
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .utils import metrics, request_profiler, request_timing, slow_queries
+from .utils.public_pages import is_public_page
+
+
+logger = logging.getLogger('myApp.timing')
+
+
+class ServerTimingMiddleware:
+    """
+    Measure where a request's time goes and report it as a Server-Timing
+    header plus one JSON log line on the ``myApp.timing`` logger.
+
+    Records total and view time, SQL time and query count on every database
+    connection, template render time, cache hits/misses and image processing
+    time. Every request feeds the /metrics latency histogram and query
+    counters; only a SERVER_TIMING_SAMPLE_RATE fraction is reported in the
+    header and log.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 0.01)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Django would otherwise run the sync hook through sync_to_async
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing, token = request_timing.start()
+        request._timing_view_started = None
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            request_timing.finish(token)
+        slow_queries.finish_request(timing)
+        return self.report(request, response, timing, started)
+
+    async def __acall__(self, request):
+        # Queries run in sync_to_async threads see the timing: they copy the context
+        timing, token = request_timing.start()
+        request._timing_view_started = None
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_timing.finish(token)
+        if slow_queries.repeated(timing):
+            await sync_to_async(slow_queries.finish_request)(timing)
+        return self.report(request, response, timing, started)
+
+    def report(self, request, response, timing, started):
+        finished = time.perf_counter()
+
+        match = request.resolver_match
+        view_name = match.view_name if match else '<unresolved>'
+        metrics.observe('http_request_duration_seconds', finished - started,
+                        view=view_name, method=request.method)
+        metrics.inc('db_queries_total', timing.counts['db'], view=view_name)
+        metrics.inc('db_query_seconds_total', timing.durations['db'], view=view_name)
+        metrics.flush()
+        slow_queries.flush()
+
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return response
+
+        view_started = request._timing_view_started
+        view = finished - view_started if view_started is not None else None
+        response['Server-Timing'] = timing.header(finished - started, view)
+
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round((finished - started) * 1000, 2),
+            'view_ms': round(view * 1000, 2) if view is not None else None,
+            **timing.as_dict(),
+        }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.view_started(request)
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self.view_started(request)
+        return None
+
+    def view_started(self, request):
+        if hasattr(request, '_timing_view_started'):
+            request._timing_view_started = time.perf_counter()
+        timing = request_timing.current()
+        if timing is not None and request.resolver_match:
+            timing.view = request.resolver_match.view_name
+
+
+class ProfilerMiddleware:
+    """
+    Run staff requests flagged with ?_profile=1 (or X-Profile: 1) under
+    cProfile and store the result for the dashboard profile viewer.
+
+    Must come after AuthenticationMiddleware.
+
+    Under ASGI cProfile only sees the event loop thread: work done in
+    sync_to_async threads (ORM calls, template rendering) is missing, and
+    other requests' coroutines running meanwhile are included.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not request_profiler.profiling_requested(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        profile_id = request_profiler.save_profile(
+            profiler, request, response, time.perf_counter() - started
+        )
+        response['X-Profile-Id'] = profile_id
+        return response
+
+    async def __acall__(self, request):
+        if not await request_profiler.aprofiling_requested(request):
+            return await self.get_response(request)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+        user = await request.auser()
+        profile_id = await sync_to_async(request_profiler.save_profile)(
+            profiler, request, response, time.perf_counter() - started, username=user.get_username()
+        )
+        response['X-Profile-Id'] = profile_id
+        return response
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware that also runs natively under ASGI.
+
+    WhiteNoise 6 is sync-only, so Django would run it, and with it every
+    request, through sync_to_async. Static files are matched on the event
+    loop and only the file response is built in a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings=settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+def lean_request(request):
+    """
+    True for GET/HEAD requests of a public page, which are served without
+    session, auth and messages work. Profiling requests (staff only) keep
+    the full stack.
+    """
+    lean = getattr(request, '_lean_request', None)
+    if lean is None:
+        lean = request._lean_request = (
+            request.method in ('GET', 'HEAD')
+            and is_public_page(request.path_info)
+            and not request_profiler.profiling_flagged(request)
+        )
+    return lean
+
+
+class SkipOnPublicPages:
+    """
+    Mixin for MiddlewareMixin-based middleware: public page requests go
+    straight to the next layer, without running the hooks (or, under ASGI,
+    hopping to a thread for them).
+
+    Public pages are the same for every visitor and their templates never
+    read the session, user or messages, so they need none of it and set no
+    cookies, which keeps them cacheable by shared caches and CDNs. The auth
+    and messages context processors fall back to AnonymousUser and no
+    messages when the middleware has not run.
+    """
+
+    def __call__(self, request):
+        if lean_request(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SessionMiddleware(SkipOnPublicPages, sessions_middleware.SessionMiddleware):
+    pass
+
+
+class AuthenticationMiddleware(SkipOnPublicPages, auth_middleware.AuthenticationMiddleware):
+    pass
+
+
+class MessageMiddleware(SkipOnPublicPages, messages_middleware.MessageMiddleware):
+    pass
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+def create_content_version(apps, schema_editor):
+    ContentVersion = apps.get_model('myApp', 'ContentVersion')
+    ContentVersion.objects.using(schema_editor.connection.alias).get_or_create(pk=1, defaults={'version': 1})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0002_mediaasset_image_file_mediaasset_storage_type_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_content_version, migrations.RunPython.noop),
+    ]
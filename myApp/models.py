@@ -27,6 +27,11 @@ class MediaAsset(models.Model):
     height = models.IntegerField(null=True, blank=True)
     file_size = models.IntegerField(null=True, blank=True)
     format = models.CharField(max_length=10, blank=True)
+    # Resized copies for srcset: {"webp": {"640": "variants/...-640.webp", ...}, "avif": {...}}
+    variants = models.JSONField(default=dict, blank=True)
+    # Inline LQIP (tiny base64 WebP data URI) and dominant color, painted while the image loads
+    placeholder = models.TextField(blank=True)
+    dominant_color = models.CharField(max_length=7, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -341,3 +346,12 @@ class Event(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class ContentVersion(models.Model):
+    """Monotonic content version shared by every app process (single row)"""
+    version = models.BigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Content version {self.version}"
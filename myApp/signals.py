@@ -0,0 +1,71 @@
+import logging
+
+from django.apps import apps
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+
+from .db_routers import PUBLISHED_MODELS, content_db_available
+from .utils.icon_subset import ICON_MODELS, parse_icon_classes, ensure_icons
+from .utils.invalidation import bump_content_version
+from .utils.remote_mirror import REMOTE_IMAGE_FIELDS, mirror_in_background, remote_image_urls
+from .utils.request_timing import db_execute_wrapper as timing_wrapper
+from .utils.slow_queries import execute_wrapper as slow_query_wrapper
+
+
+logger = logging.getLogger(__name__)
+
+
+def content_changed(sender, **kwargs):
+    """
+    A content edit moves every process to a new content version while public
+    pages still read the live database. Once a published copy exists, edits
+    only reach the site when it is republished, which bumps the version.
+    """
+    if not content_db_available():
+        bump_content_version()
+
+
+def icon_changed(sender, instance, **kwargs):
+    """Add a newly used icon to the self-hosted icon subset"""
+    icons, _modifiers = parse_icon_classes(instance.icon or '')
+    if not icons:
+        return
+    try:
+        ensure_icons(icons)
+    except Exception as e:
+        logger.warning('Icon subset rebuild failed: %s', e)
+
+
+def remote_images_changed(sender, instance, **kwargs):
+    """Mirror remote image URLs locally once the save has committed, off the request"""
+    urls = remote_image_urls(instance)
+    if urls:
+        transaction.on_commit(lambda: mirror_in_background(urls))
+
+
+def install_query_wrappers(sender, connection, **kwargs):
+    """
+    Time every statement on new connections, for the slow query log
+    (utils/slow_queries.py) and the current request (utils/request_timing.py).
+
+    Installed per connection rather than per request: under ASGI a request's
+    queries run on connections belonging to worker threads.
+    """
+    for wrapper in (slow_query_wrapper, timing_wrapper):
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
+
+
+def connect_signals():
+    connection_created.connect(install_query_wrappers, dispatch_uid='install_query_wrappers')
+    for name in PUBLISHED_MODELS:
+        model = apps.get_model('myApp', name)
+        post_save.connect(content_changed, sender=model, dispatch_uid=f'content_changed_save_{name}')
+        post_delete.connect(content_changed, sender=model, dispatch_uid=f'content_changed_delete_{name}')
+    for name in ICON_MODELS:
+        model = apps.get_model('myApp', name)
+        post_save.connect(icon_changed, sender=model, dispatch_uid=f'icon_changed_{name}')
+    for name in REMOTE_IMAGE_FIELDS:
+        model = apps.get_model('myApp', name)
+        post_save.connect(remote_images_changed, sender=model, dispatch_uid=f'remote_images_changed_{name}')
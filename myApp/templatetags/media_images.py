@@ -0,0 +1,74 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from ..utils.media_index import picture_sources, resolve_media, srcset
+from ..utils.remote_mirror import is_remote, mirror_proxy_url
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def media_img(image, alt='', sizes='100vw', loading='lazy', **attrs):
+    """
+    Responsive <img> for a MediaAsset or a media path, using the asset's
+    intrinsic size and its resized variants:
+
+        {% media_img '/media/uploads/2025/12/05/01.webp' alt='Hero' class='w-full' loading='eager' fetchpriority='high' %}
+
+    Emits a <picture> with AVIF/WebP sources when variants exist, and paints
+    the asset's inline placeholder until the image loads. Paths with no
+    MediaAsset render a plain lazy-loaded <img>; remote URLs are served
+    through the local mirror.
+    """
+    entry = resolve_media(image)
+    if entry is None:
+        # Remote images not mirrored yet go through the same-origin mirror proxy
+        src = mirror_proxy_url(image) if is_remote(image) else str(image or '')
+        return format_html('<img{}>', flatatt(dict(
+            {'src': src, 'alt': alt, 'loading': loading, 'decoding': 'async'}, **attrs
+        )))
+
+    placeholder = _placeholder_style(entry)
+    if placeholder:
+        attrs['style'] = '; '.join(filter(None, [placeholder, attrs.get('style')]))
+        # Drop the placeholder once loaded so it never shows behind transparent areas
+        attrs.setdefault('onload', "this.style.background='none'")
+
+    img_attrs = {
+        'src': entry['src'],
+        'alt': alt,
+        'width': entry['width'],
+        'height': entry['height'],
+        'loading': loading,
+        'decoding': 'async',
+    }
+    # Browsers without AVIF/WebP still pick a width from the original's format
+    fallback = entry.get('fallback')
+    if fallback:
+        img_attrs['srcset'] = srcset(fallback)
+        img_attrs['sizes'] = sizes
+    img = format_html('<img{}>', flatatt(dict(img_attrs, **attrs)))
+    if not entry['sources']:
+        return img
+
+    sources = [
+        format_html(
+            '<source type="{}" srcset="{}" sizes="{}">',
+            mime, srcset(candidates), sizes,
+        )
+        for mime, candidates in picture_sources(entry)
+    ]
+    # display:contents keeps the <img> sized by its own container as before
+    return format_html('<picture style="display:contents">{}{}</picture>', mark_safe(''.join(sources)), img)
+
+
+def _placeholder_style(entry):
+    styles = []
+    if entry.get('dominant_color'):
+        styles.append(f"background-color: {entry['dominant_color']}")
+    if entry.get('placeholder'):
+        styles.append(f"background-image: url({entry['placeholder']}); background-size: cover")
+    return '; '.join(styles)
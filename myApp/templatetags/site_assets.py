@@ -0,0 +1,33 @@
+from django import template
+from django.templatetags.static import static
+
+from ..utils.asset_manifest import asset_url
+from ..utils.font_subset import preload_fonts
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def compiled_css(bundle):
+    """
+    URL of the compiled, content-hashed CSS bundle built by `manage.py build_css`,
+    or '' if it has not been built (templates then fall back to the CDN compiler).
+
+        {% compiled_css 'site' as site_css %}
+    """
+    return asset_url(f'css/{bundle}') or ''
+
+
+@register.simple_tag
+def font_preloads():
+    """
+    Self-hosted font files to preload, as dicts with url and type;
+    empty until `manage.py build_fonts` has run.
+
+        {% font_preloads as fonts %}
+    """
+    return [
+        {'url': static(font['path']), 'type': font['type']}
+        for font in preload_fonts()
+    ]
@@ -0,0 +1,23 @@
+"""
+Test runner that keeps public content in the test database.
+
+A content.sqlite3 left behind by `manage.py publish_content` would otherwise
+route public page reads to the 'content' alias, which test cases are not
+allowed to query.
+"""
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class ContentTestRunner(DiscoverRunner):
+    """DiscoverRunner with USE_PUBLISHED_CONTENT off for the whole run."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._use_published_content = settings.USE_PUBLISHED_CONTENT
+        settings.USE_PUBLISHED_CONTENT = False
+
+    def teardown_test_environment(self, **kwargs):
+        settings.USE_PUBLISHED_CONTENT = self._use_published_content
+        super().teardown_test_environment(**kwargs)
@@ -1,3 +1,1348 @@
-from django.test import TestCase
+import base64
+import copy
+import gzip
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+from PIL import Image, ImageDraw
+
+from myApp import db_routers, models as content_models, views
+from myApp.db_routers import PublishedContentRouter, content_db_available
+from myApp.templatetags.media_images import media_img
+from myApp.utils import (
+    asset_manifest, image_variants, media_index, metrics, precompress, remote_mirror, request_profiler, request_timing,
+    slow_queries, tiered_cache,
+)
+from myApp.utils.cache_utils import _lock_cache, cached_page, get_or_rebuild
+from myApp.utils.critical_css import critical_css, inline_critical_css
+from myApp.utils.early_hints import page_links
+from myApp.utils.html_minify import minify_html
+from myApp.utils.image_placeholders import compute_placeholder
+from myApp.utils.image_variants import variant_formats, variant_widths
+from myApp.utils.invalidation import bump_content_version
+from myApp.utils.public_pages import public_pages
+from myApp.utils.local_file_utils import process_local_image
+
+
+# Runs inside each "replica": warms its own cache with the current hero,
+# then polls the cached content until the expected headline shows up.
+REPLICA_SCRIPT = """
+import sys, time, django
+django.setup()
+from django.db import close_old_connections
+from myApp.content_helpers import get_homepage_content
+from myApp.db_routers import published_content
+
+expected, timeout = sys.argv[1], float(sys.argv[2])
+with published_content():
+    print('ready', get_homepage_content()['hero']['headline'], flush=True)
+    sys.stdin.readline()
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        # As at the end of a request, so a republished file gets reopened
+        close_old_connections()
+        if get_homepage_content()['hero']['headline'] == expected:
+            print(f'seen {time.monotonic() - start:.3f}', flush=True)
+            sys.exit(0)
+        time.sleep(0.02)
+sys.exit(1)
+"""
+
+EDIT_SCRIPT = """
+import sys, django
+django.setup()
+from myApp.models import Hero
+hero, _ = Hero.objects.get_or_create(page='home')
+hero.headline = sys.argv[1]
+hero.save()
+"""
+
+
+class ContentVersionBroadcastTests(SimpleTestCase):
+    """Publishing on one process reaches other processes' caches."""
+
+    REPLICAS = 3
+    POLL_INTERVAL = 0.2
+    MAX_DELAY = 3.0
+
+    def _env(self, tmpdir, name):
+        # Shared database, but a private cache directory per replica so the
+        # only shared signal is the content version row.
+        return dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE='myProject.settings',
+            DATABASE_PATH=os.path.join(tmpdir, 'db.sqlite3'),
+            CONTENT_DB_PATH=os.path.join(tmpdir, 'content.sqlite3'),
+            CACHE_DIR=os.path.join(tmpdir, f'cache-{name}'),
+            CONTENT_VERSION_POLL_INTERVAL=str(self.POLL_INTERVAL),
+        )
+
+    def _run(self, tmpdir, name, *args):
+        subprocess.run(
+            [sys.executable, *args], cwd=settings.BASE_DIR,
+            env=self._env(tmpdir, name), check=True, capture_output=True,
+        )
+
+    def test_published_hero_edit_reaches_other_processes(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self._run(tmpdir, 'setup', 'manage.py', 'migrate', '--noinput')
+            self._run(tmpdir, 'setup', '-c', EDIT_SCRIPT, 'Original headline')
+            self._run(tmpdir, 'setup', 'manage.py', 'publish_content')
+
+            replicas = [
+                subprocess.Popen(
+                    [sys.executable, '-c', REPLICA_SCRIPT, 'Edited headline', str(self.MAX_DELAY)],
+                    cwd=settings.BASE_DIR, env=self._env(tmpdir, f'replica-{i}'),
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+                )
+                for i in range(self.REPLICAS)
+            ]
+            try:
+                for replica in replicas:
+                    self.assertEqual(replica.stdout.readline().strip(), 'ready Original headline')
+
+                self._run(tmpdir, 'editor', '-c', EDIT_SCRIPT, 'Edited headline')
+                self._run(tmpdir, 'editor', 'manage.py', 'publish_content')
+                for replica in replicas:
+                    replica.stdin.write('go\n')
+                    replica.stdin.flush()
+
+                for replica in replicas:
+                    output, _ = replica.communicate(timeout=self.MAX_DELAY + 10)
+                    self.assertEqual(replica.returncode, 0, 'replica kept serving the old hero')
+                    delay = float(output.split()[-1])
+                    self.assertLess(delay, self.MAX_DELAY)
+            finally:
+                for replica in replicas:
+                    if replica.poll() is None:
+                        replica.kill()
+                        replica.wait()
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'myApp.utils.tiered_cache.TieredCache',
+        'LOCATION': 'tiered-test',
+        'OPTIONS': {'SHARED_ALIAS': 'shared', 'VERSION_CHECK_INTERVAL': 0},
+    },
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tiered-test-shared'},
+})
+class PublishedContentRoutingTests(TestCase):
+    """Public reads use the published copy only when USE_PUBLISHED_CONTENT is on."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.content_db = os.path.join(directory.name, 'content.sqlite3')
+        self.enterContext(self.settings(CONTENT_DB_PATH=self.content_db))
+
+    def test_a_published_file_is_ignored_under_the_test_runner(self):
+        open(self.content_db, 'w').close()
+        self.assertFalse(content_db_available())
+        with self.settings(USE_PUBLISHED_CONTENT=True):
+            self.assertTrue(content_db_available())
+        self.assertEqual(self.client.get(reverse('about')).status_code, 200)
+
+    def test_only_staff_can_publish(self):
+        user = User.objects.create_user('editor', 'editor@example.com', 'password')
+        self.client.force_login(user)
+        response = self.client.post(reverse('dashboard:publish_content'))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith(reverse('dashboard:login')))
+        self.assertFalse(os.path.exists(self.content_db))
+
+
+class TieredCacheTests(SimpleTestCase):
+    """The local tier is per process: every thread's backend instance shares it."""
+
+    def setUp(self):
+        # A fresh process-wide tier, and a fresh instance for this thread
+        tiered_cache._tiers.pop('tiered-test', None)
+        if hasattr(caches._connections, 'default'):
+            del caches['default']
+        caches['shared'].clear()
+
+    def _in_thread(self, func):
+        result = []
+        thread = threading.Thread(target=lambda: result.append(func()))
+        thread.start()
+        thread.join()
+        return result[0]
+
+    def test_other_threads_hit_the_local_tier(self):
+        caches['default'].set('key', 'value')
+        # Only the local tier still has it
+        caches['shared'].delete('key')
+
+        self.assertIsNot(self._in_thread(lambda: caches['default']), caches['default'])
+        self.assertEqual(self._in_thread(lambda: caches['default'].get('key')), 'value')
+        self.assertEqual(caches['default'].stats()['local_hits'], 1)
+
+    def test_delete_in_one_thread_clears_every_thread(self):
+        caches['default'].set('key', 'value')
+        self._in_thread(lambda: caches['default'].delete('key'))
+        self.assertIsNone(caches['default'].get('key'))
+        self.assertEqual(caches['default'].stats()['local_entries'], 0)
+
+    def _process(self, name):
+        """A backend with its own local tier, standing in for another process."""
+        tiered_cache._tiers.pop(name, None)
+        self.addCleanup(tiered_cache._tiers.pop, name, None)
+        return tiered_cache.TieredCache(name, {'OPTIONS': {'SHARED_ALIAS': 'shared', 'VERSION_CHECK_INTERVAL': 0}})
+
+    def test_delete_drops_only_that_key_in_other_processes(self):
+        first, second = self._process('tiered-first'), self._process('tiered-second')
+        first.set('deleted', 'value')
+        first.set('kept', 'value')
+        self.assertEqual((second.get('deleted'), second.get('kept')), ('value', 'value'))
+
+        first.delete('deleted')
+        # Only the local tier still has it
+        caches['shared'].delete('kept')
+        self.assertIsNone(second.get('deleted'))
+        self.assertEqual(second.get('kept'), 'value')
+        self.assertEqual(second.stats()['invalidations'], 0)
+
+    def test_clear_invalidates_processes_after_a_previous_clear(self):
+        first, second = self._process('tiered-first'), self._process('tiered-second')
+        first.clear()
+        second.get('key')
+        second.set('key', 'value')
+
+        # The shared backend is emptied again: the generation must still move
+        first.clear()
+        self.assertIsNone(second.get('key'))
+
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'swr-test'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'swr-test-shared'},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PAGE_POSTPROCESSORS=[])
+class StaleWhileRevalidateTests(SimpleTestCase):
+    """get_or_rebuild() builds once per miss and serves stale values while rebuilding."""
+
+    def setUp(self):
+        caches['default'].clear()
+        caches['shared'].clear()
+
+    def test_concurrent_misses_build_once(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_or_rebuild('swr:miss', build)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 8)
+        self.assertEqual(len(builds), 1)
+
+    def test_waiters_do_not_wait_out_an_uncacheable_build(self):
+        @cached_page()
+        def view(request):
+            time.sleep(0.2)
+            return HttpResponse('<p>missing</p>', status=404)
+
+        statuses = []
+
+        def get():
+            statuses.append(view(RequestFactory().get('/swr-not-found/')).status_code)
+
+        threads = [threading.Thread(target=get) for _ in range(4)]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(statuses, [404] * 4)
+        # Waiters build as soon as the first build gives up the lock, well
+        # before WAIT_TIMEOUT
+        self.assertLess(time.monotonic() - started, 2)
+
+    def test_stale_value_is_served_while_another_worker_rebuilds(self):
+        caches['default'].set('swr:stale', {'value': 'old', 'fresh_until': time.time() - 1})
+        _lock_cache().add('rebuild-lock:swr:stale:None', 1)
+        self.assertEqual(get_or_rebuild('swr:stale', lambda: self.fail('rebuilt twice')), 'old')
+
+    def test_failed_rebuild_keeps_serving_the_stale_value(self):
+        caches['default'].set('swr:failing', {'value': 'old', 'fresh_until': time.time() - 1})
+
+        def build():
+            raise RuntimeError('database down')
+
+        self.assertEqual(get_or_rebuild('swr:failing', build), 'old')
+
+    def test_cached_page_replays_view_headers(self):
+        calls = []
+
+        @cached_page()
+        def view(request):
+            calls.append(1)
+            response = HttpResponse('<p>page</p>')
+            response['Cache-Control'] = 'public, max-age=60'
+            response['X-Page'] = 'yes'
+            return response
+
+        first = view(RequestFactory().get('/swr-headers/'))
+        second = view(RequestFactory().get('/swr-headers/'))
+        self.assertEqual(len(calls), 1)
+        for name in ('Cache-Control', 'X-Page'):
+            self.assertEqual(second[name], first[name])
+
+    def test_head_does_not_poison_the_get_entry(self):
+        @cached_page()
+        def view(request):
+            # A view may skip the body for HEAD; that must not be cached for GET
+            return HttpResponse('' if request.method == 'HEAD' else '<p>page</p>')
+
+        view(RequestFactory().head('/swr-head/'))
+        self.assertEqual(view(RequestFactory().get('/swr-head/')).content, b'<p>page</p>')
+
+
+class AssetManifestTests(SimpleTestCase):
+    """Concurrent builds keep every entry of the asset manifest."""
+
+    WRITERS = 8
+
+    def test_concurrent_writes_keep_every_entry(self):
+        with tempfile.TemporaryDirectory() as static_root, self.settings(STATIC_ROOT=static_root):
+            start = threading.Barrier(self.WRITERS)
+
+            def build(i):
+                start.wait()
+                asset_manifest.write_asset(f'css/part{i}', f'.p{i}{{}}'.encode(), 'css')
+
+            writers = [threading.Thread(target=build, args=(i,)) for i in range(self.WRITERS)]
+            for writer in writers:
+                writer.start()
+            for writer in writers:
+                writer.join()
+
+            with open(asset_manifest.manifest_path()) as f:
+                manifest = json.load(f)
+            self.assertEqual(sorted(manifest), sorted(f'css/part{i}' for i in range(self.WRITERS)))
+            for entry in manifest.values():
+                self.assertTrue(os.path.exists(os.path.join(static_root, entry['path'])))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class MediaImgTests(TestCase):
+    """{% media_img %} markup, and the per-path MediaAsset lookups behind it."""
+
+    def setUp(self):
+        caches['default'].clear()
+        caches['shared'].clear()
+        media_index._memo['version'] = None
+
+    def _variants(self, name, width):
+        stem = os.path.splitext(os.path.basename(name))[0]
+        return {
+            fmt: {str(w): f'variants/{stem}-{w}.{fmt}' for w in variant_widths(width) if w < width}
+            for fmt in ('avif', 'webp')
+        }
+
+    def _render(self, image, **kwargs):
+        return media_img(image, alt='Hero', sizes='(min-width: 1024px) 50vw, 100vw', **kwargs)
+
+    def test_picture_sources_and_img_fallback_srcset(self):
+        content_models.MediaAsset.objects.create(
+            title='01', image_file='uploads/2025/12/05/01.webp', storage_type='local',
+            width=1600, height=1200, format='webp',
+            variants=self._variants('uploads/2025/12/05/01.webp', 1600),
+        )
+        html = self._render('/media/uploads/2025/12/05/01.webp')
+
+        self.assertLess(html.index('type="image/avif"'), html.index('type="image/webp"'))
+        img = re.search(r'<img[^>]*>', html).group()
+        self.assertIn('width="1600"', img)
+        self.assertIn('height="1200"', img)
+        self.assertIn('sizes="(min-width: 1024px) 50vw, 100vw"', img)
+        self.assertIn(
+            'srcset="/media/variants/01-320.webp 320w, /media/variants/01-640.webp 640w, '
+            '/media/variants/01-960.webp 960w, /media/variants/01-1280.webp 1280w, '
+            '/media/uploads/2025/12/05/01.webp 1600w"',
+            img,
+        )
+
+    def test_img_fallback_keeps_the_original_format(self):
+        content_models.MediaAsset.objects.create(
+            title='Leadership', image_file='uploads/2025/12/05/Leadership.png', storage_type='local',
+            width=1200, height=800, format='png',
+            variants=self._variants('uploads/2025/12/05/Leadership.png', 1200),
+        )
+        content_models.MediaAsset.objects.create(
+            title='Gathering', storage_type='cloudinary', format='jpg', width=1000, height=750,
+            original_url='https://res.cloudinary.com/demo/image/upload/v1/iriseup/gathering.jpg',
+        )
+
+        local = re.search(r'<img[^>]*>', self._render('uploads/2025/12/05/Leadership.png')).group()
+        self.assertIn('srcset="/media/uploads/2025/12/05/Leadership.png 1200w"', local)
+
+        remote = re.search(
+            r'<img[^>]*>', self._render('https://res.cloudinary.com/demo/image/upload/v1/iriseup/gathering.jpg'),
+        ).group()
+        self.assertIn('/upload/f_jpg,q_auto,w_320/v1/iriseup/gathering.jpg 320w', remote)
+        self.assertNotIn('f_webp', remote)
+
+    def test_lookups_are_per_path_and_cached(self):
+        for i in range(20):
+            content_models.MediaAsset.objects.create(
+                title=f'Photo {i}', image_file=f'uploads/2025/12/05/photo-{i}.jpg',
+                storage_type='local', width=800, height=600, format='jpg',
+            )
+
+        with CaptureQueriesContext(connection) as captured:
+            entry = media_index.resolve_media('/media/uploads/2025/12/05/photo-3.jpg')
+        self.assertEqual(entry['src'], '/media/uploads/2025/12/05/photo-3.jpg')
+        media_queries = [q['sql'] for q in captured.captured_queries if 'myApp_mediaasset' in q['sql']]
+        self.assertEqual(len(media_queries), 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(media_index.resolve_media('/media/uploads/2025/12/05/photo-3.jpg'), entry)
+        self.assertIsNone(media_index.resolve_media('/media/uploads/2025/12/05/missing.jpg'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ImageUploadTests(TestCase):
+    """Uploads answer before their variants are encoded; failed builds leave nothing behind."""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=media_root.name))
+
+    def _png(self, size=(1200, 900)):
+        output = BytesIO()
+        Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3)).save(output, format='PNG')
+        return ContentFile(output.getvalue(), name='Gathering.png')
+
+    def _variant_files(self):
+        directory = os.path.join(settings.MEDIA_ROOT, image_variants.VARIANTS_DIR)
+        return [name for _root, _dirs, names in os.walk(directory) for name in names]
+
+    def test_upload_builds_variants_after_the_response(self):
+        self.client.force_login(User.objects.create_superuser('uploader', 'uploader@example.com', 'password'))
+        with mock.patch('myApp.dashboard_views.build_variants_in_background') as background:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('dashboard:upload_image'), {'image': self._png()})
+        self.assertEqual(response.status_code, 200)
+        asset = content_models.MediaAsset.objects.get(pk=response.json()['id'])
+        self.assertEqual(asset.variants, {})
+        background.assert_called_once_with(asset)
+
+        self.assertTrue(image_variants.build_and_store_variants(asset))
+        asset.refresh_from_db()
+        self.assertIn('webp', asset.variants)
+
+    def test_failed_build_keeps_the_original_and_removes_partial_files(self):
+        asset = content_models.MediaAsset.objects.create(
+            title='Gathering', image_file=self._png(), storage_type='local', width=1200, height=900, format='png',
+        )
+        # WebP files are written before the unknown format fails
+        with mock.patch.object(image_variants, 'variant_formats', return_value=['webp', 'bogus']), \
+                self.assertLogs('myApp.utils.image_variants', 'WARNING'):
+            self.assertFalse(image_variants.build_and_store_variants(asset))
+        asset.refresh_from_db()
+        self.assertEqual(asset.variants, {})
+        self.assertEqual(self._variant_files(), [])
+        self.assertTrue(os.path.exists(asset.image_file.path))
+
+
+class MediaNegotiationTests(SimpleTestCase):
+    """views.media answers image requests in the best format the Accept header allows."""
+
+    CHROME_ACCEPT = 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8'
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=media_root.name))
+        # Photo-like noise, so the WebP sibling comes out smaller than the PNG
+        os.makedirs(os.path.join(media_root.name, 'uploads/2025/12/05'))
+        Image.frombytes('RGB', (160, 120), os.urandom(160 * 120 * 3)).save(
+            os.path.join(media_root.name, 'uploads/2025/12/05/Leadership.png')
+        )
+
+    def _get(self, accept):
+        request = RequestFactory().get('/media/uploads/2025/12/05/Leadership.png', HTTP_ACCEPT=accept)
+        return views.media(request, 'uploads/2025/12/05/Leadership.png')
+
+    def test_browser_gets_the_best_supported_format(self):
+        response = self._get(self.CHROME_ACCEPT)
+        best = variant_formats()[0]
+        self.assertEqual(response['Content-Type'], f'image/{best}')
+        self.assertIn('Accept', response['Vary'])
+        with Image.open(BytesIO(b''.join(response.streaming_content))) as served:
+            self.assertEqual((served.format.lower(), served.size), (best, (160, 120)))
+
+    def test_sibling_is_generated_once(self):
+        self._get('image/webp,*/*').close()
+        sibling_path = os.path.join(settings.MEDIA_ROOT, 'negotiated/uploads/2025/12/05/Leadership.png.webp')
+        mtime = os.stat(sibling_path).st_mtime_ns
+        self._get('image/webp,*/*').close()
+        self.assertEqual(os.stat(sibling_path).st_mtime_ns, mtime)
+
+    def test_original_without_modern_formats_in_accept(self):
+        for accept in ('', 'image/png,image/*;q=0.8', 'image/webp;q=0,image/avif;q=0.0,*/*'):
+            with self.subTest(accept=accept):
+                response = self._get(accept)
+                self.assertEqual(response['Content-Type'], 'image/png')
+                self.assertIn('Accept', response['Vary'])
+                response.close()
+
+    def test_media_url_is_negotiated_without_debug(self):
+        self.assertFalse(settings.DEBUG)
+        response = self.client.get('/media/uploads/2025/12/05/Leadership.png', HTTP_ACCEPT='image/webp,*/*')
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('Accept', response['Vary'])
+        response.close()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RemoteMirrorTests(TestCase):
+    """Remote images are mirrored off the request path, from public hosts only."""
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_non_public_addresses_are_refused(self):
+        for address in ('127.0.0.1', '10.0.0.5', '172.16.1.1', '192.168.1.10', '169.254.169.254',
+                        '0.0.0.0', '224.0.0.1', '::1', 'fe80::1', 'fc00::1', '::ffff:127.0.0.1'):
+            with self.subTest(address=address):
+                self.assertFalse(remote_mirror.is_public_address(address))
+        self.assertTrue(remote_mirror.is_public_address('93.184.216.34'))
+        self.assertTrue(remote_mirror.is_public_address('2606:2800:220:1:248:1893:25c8:1946'))
+
+        for url in ('http://127.0.0.1/avatar.png', 'http://localhost:8000/admin/',
+                    'http://169.254.169.254/latest/meta-data/', 'http://[::1]/x.png'):
+            with self.subTest(url=url), self.assertRaisesRegex(Exception, 'non-public'):
+                remote_mirror.urlopen_fetcher(url)
+
+    def test_connections_are_checked_after_resolution(self):
+        # What a rebinding DNS answer or a redirect to an internal host reaches
+        with socket.create_server(('127.0.0.1', 0)) as server:
+            with self.assertRaisesRegex(Exception, 'non-public'):
+                remote_mirror._public_connection(server.getsockname())
+
+    def test_failed_fetches_back_off(self):
+        calls = []
+
+        def unreachable(url):
+            calls.append(url)
+            raise OSError('Connection timed out')
+
+        url = 'https://images.example.org/team/avatar.jpg'
+        for _ in range(3):
+            with self.assertRaises(Exception):
+                remote_mirror.mirror_remote_image(url, fetcher=unreachable)
+        self.assertEqual(calls, [url])
+
+    def test_url_locks_are_dropped_after_each_attempt(self):
+        in_progress = []
+
+        def unreachable(url):
+            in_progress.append(remote_mirror.mirrors_in_progress())
+            raise OSError('Connection refused')
+
+        urls = [f'https://images.example.org/gallery/{n}.jpg' for n in range(20)]
+        for url in urls:
+            with self.assertRaises(Exception):
+                remote_mirror.mirror_remote_image(url, fetcher=unreachable)
+        self.assertEqual(in_progress, [[url] for url in urls])
+        self.assertEqual(remote_mirror._locks, {})
+
+    def test_content_saves_mirror_in_the_background(self):
+        url = 'https://images.example.org/hero/retreat.jpg'
+        with mock.patch('myApp.signals.mirror_in_background') as background:
+            with self.captureOnCommitCallbacks(execute=True):
+                content_models.Retreat.objects.create(page='events', background_image_url=url)
+        background.assert_called_once_with([url])
+
+
+CRITICAL_PAGE = """<!DOCTYPE html>
+<html><head><link rel="stylesheet" href="{href}"></head>
+<body class="bg-cream">
+<nav id="site-nav" class="fixed md:flex"><a class="nav-link" href="/">Home</a></nav>
+<main>
+<section class="hero fade-in"><h1 class="text-5xl">Rise up</h1></section>
+<section class="stats"><p class="counter">120</p></section>
+</main>
+</body></html>"""
+
+CRITICAL_SOURCE_CSS = (
+    'body{margin:0}.bg-cream{background:#fdf8f0}#site-nav{top:0}.fixed{position:fixed}'
+    '.nav-link:hover{color:red}.hero h1{font-weight:700}'
+    '@media (min-width:768px){.md\\:flex{display:flex}.counter{font-size:3rem}}'
+    '.fade-in{animation:fadeIn 1s ease}@keyframes fadeIn{from{opacity:0}to{opacity:1}}'
+    '@keyframes spin{to{transform:rotate(1turn)}}'
+    '.stats{padding:5rem}.counter{color:gold}'
+)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CriticalCssTests(TestCase):
+    """Critical rules are inlined for the navigation and hero; the rest loads async."""
+
+    def setUp(self):
+        caches['default'].clear()
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        self.enterContext(self.settings(STATIC_ROOT=static_root.name))
+
+    def test_keeps_only_rules_for_the_first_viewport(self):
+        css = critical_css(CRITICAL_PAGE.format(href='/static/site.css'), CRITICAL_SOURCE_CSS)
+
+        for kept in ('body{margin:0}', '.bg-cream{', '#site-nav{', '.fixed{', '.nav-link:hover{',
+                     '.hero h1{', '@media (min-width:768px){.md\\:flex{display:flex}}',
+                     '.fade-in{', '@keyframes fadeIn'):
+            self.assertIn(kept, css)
+        # Below the fold: the stats section, and an animation no kept rule uses
+        for dropped in ('.stats', '.counter', '@keyframes spin'):
+            self.assertNotIn(dropped, css)
+
+    def test_inlines_critical_rules_and_loads_the_stylesheet_async(self):
+        asset_manifest.write_asset('css/site', CRITICAL_SOURCE_CSS.encode(), 'css')
+        href = asset_manifest.asset_url('css/site')
+        request = RequestFactory().get('/')
+        request.resolver_match = None
+
+        html = inline_critical_css(request, CRITICAL_PAGE.format(href=href))
+
+        self.assertNotIn(f'<link rel="stylesheet" href="{href}">', html.split('<noscript>')[0])
+        style = re.search(r'<style>(.*?)</style>', html, re.S).group(1)
+        self.assertIn('.hero h1{font-weight:700}', style)
+        self.assertNotIn('.stats', style)
+        self.assertIn(f'<link rel="preload" href="{href}" as="style"', html)
+        self.assertIn(f'<noscript><link rel="stylesheet" href="{href}"></noscript>', html)
+
+    def test_pages_without_the_site_stylesheet_are_left_alone(self):
+        html = CRITICAL_PAGE.format(href='/static/other.css')
+        request = RequestFactory().get('/')
+        request.resolver_match = None
+        self.assertEqual(inline_critical_css(request, html), html)
+
+
+MINIFY_PAGE = """<!DOCTYPE html>
+<html>
+    <head>
+        <!-- Page title -->
+        <title>Events</title>
+        <!--[if IE]><link rel="stylesheet" href="/static/ie.css"><![endif]-->
+        <script>
+            if (a  <  b) {  console.log("  kept  ");  }
+        </script>
+    </head>
+    <body>
+        <p>
+            Feed.   Teach.
+            <strong>Love.</strong>
+        </p>
+        <pre>
+  line one
+      line two</pre>
+        <textarea name="note">  two  spaces  </textarea>
+    </body>
+</html>
+"""
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PAGE_POSTPROCESSORS=['myApp.utils.html_minify.minify_page'])
+class PageCompressionTests(SimpleTestCase):
+    """Pages are minified and precompressed once, on entering the page cache."""
+
+    def setUp(self):
+        caches['default'].clear()
+        caches['shared'].clear()
+
+    def test_minify_preserves_whitespace_sensitive_content(self):
+        html = minify_html(MINIFY_PAGE)
+
+        self.assertNotIn('Page title', html)
+        self.assertIn('<!--[if IE]>', html)
+        self.assertIn('<p> Feed. Teach. <strong>Love.</strong> </p>', html)
+        for block in ('<pre>\n  line one\n      line two</pre>',
+                      '<textarea name="note">  two  spaces  </textarea>',
+                      'if (a  <  b) {  console.log("  kept  ");  }'):
+            self.assertIn(block, html)
+        self.assertEqual(minify_html(html), html)
+
+    def test_cached_page_serves_precompressed_encodings(self):
+        renders = []
+
+        @cached_page()
+        def view(request):
+            renders.append(1)
+            return HttpResponse(MINIFY_PAGE * 5)
+
+        identity = view(RequestFactory().get('/minify/', HTTP_ACCEPT_ENCODING='identity'))
+        gzipped = view(RequestFactory().get('/minify/', HTTP_ACCEPT_ENCODING='gzip, deflate'))
+
+        self.assertEqual(len(renders), 1)
+        self.assertEqual(identity.content.decode(), minify_html(MINIFY_PAGE * 5))
+        self.assertFalse(identity.has_header('Content-Encoding'))
+        self.assertEqual(gzipped['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(gzipped.content), identity.content)
+        for response in (identity, gzipped):
+            self.assertIn('Accept-Encoding', response['Vary'])
+
+        if precompress.brotli is not None:
+            brotli_response = view(RequestFactory().get('/minify/', HTTP_ACCEPT_ENCODING='gzip, br'))
+            self.assertEqual(brotli_response['Content-Encoding'], 'br')
+            self.assertEqual(precompress.brotli.decompress(brotli_response.content), identity.content)
+
+    def test_refused_encodings_are_not_served(self):
+        @cached_page()
+        def view(request):
+            return HttpResponse(MINIFY_PAGE * 5)
+
+        response = view(RequestFactory().get('/minify-q/', HTTP_ACCEPT_ENCODING='gzip;q=0, br;q=0'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, SERVER_TIMING_SAMPLE_RATE=0)
+class PreloadHintsTests(TestCase):
+    """The hero preload matches the image markup the page actually renders."""
+
+    def setUp(self):
+        caches['default'].clear()
+        caches['shared'].clear()
+        media_index._memo['version'] = None
+
+    def _hero_asset(self, formats):
+        widths = [w for w in variant_widths(1600) if w < 1600]
+        return content_models.MediaAsset.objects.create(
+            title='01', image_file='uploads/2025/12/05/01.webp', storage_type='local',
+            width=1600, height=1200, format='webp',
+            variants={fmt: {str(w): f'variants/01-{w}.{fmt}' for w in widths} for fmt in formats},
+        )
+
+    def _image_links(self, page):
+        return [link for link in page_links(page) if 'as=image' in link]
+
+    def test_preload_uses_the_first_picture_source(self):
+        self._hero_asset(['avif', 'webp'])
+        content_models.Hero.objects.create(page='home', background_image_url='/media/uploads/2025/12/05/01.webp')
+
+        [link] = self._image_links('home')
+        html = self.client.get(reverse('home')).content.decode()
+        first_source = re.search(r'<source type="([^"]+)" srcset="([^"]+)"', html)
+        self.assertEqual(first_source.group(1), 'image/avif')
+        self.assertIn('type="image/avif"', link)
+        self.assertIn(f'imagesrcset="{first_source.group(2)}"', link)
+        self.assertIn('imagesizes="(min-width: 1024px) 50vw, 100vw"', link)
+
+    def test_preload_without_variants_matches_the_img_srcset(self):
+        content_models.MediaAsset.objects.create(
+            title='Hero', image_file='uploads/2025/12/05/hero.jpg', storage_type='local',
+            width=1200, height=900, format='jpg',
+        )
+        content_models.Hero.objects.create(page='home', background_image_url='/media/uploads/2025/12/05/hero.jpg')
+
+        [link] = self._image_links('home')
+        self.assertNotIn('type=', link)
+        self.assertIn('imagesrcset="/media/uploads/2025/12/05/hero.jpg 1200w"', link)
+
+    def test_hero_is_read_from_the_published_content(self):
+        self._hero_asset(['avif', 'webp'])
+        content_models.Hero.objects.create(page='home', background_image_url='/media/uploads/2025/12/05/01.webp')
+        reads = []
+        db_for_read = PublishedContentRouter.db_for_read
+
+        def spy(router, model, **hints):
+            reads.append((model.__name__, db_routers._published_reads.get()))
+            return db_for_read(router, model, **hints)
+
+        with mock.patch.object(PublishedContentRouter, 'db_for_read', spy):
+            self.assertEqual(len(self._image_links('home')), 1)
+        content_reads = [read for read in reads if read[0] in ('Hero', 'MediaAsset')]
+        self.assertTrue(content_reads)
+        self.assertEqual([read for read in content_reads if not read[1]], [])
+
+    def test_no_image_preload_for_template_images(self):
+        self._hero_asset(['webp'])
+        # No Hero row: home shows the template's own default image
+        self.assertEqual(self._image_links('home'), [])
+        self.assertIn('/media/uploads/2025/12/05/01.webp', self.client.get(reverse('home')).content.decode())
+        for page in ('events', 'about'):
+            with self.subTest(page=page):
+                self.assertEqual(self._image_links(page), [])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ServerTimingTests(TestCase):
+    """Server-Timing headers and log lines are only produced for sampled requests."""
+
+    def test_unsampled_requests_get_no_header_or_log_line(self):
+        with self.settings(SERVER_TIMING_SAMPLE_RATE=0), self.assertNoLogs('myApp.timing', 'INFO'):
+            response = self.client.get(reverse('faqs'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_sampled_requests_are_reported(self):
+        with self.settings(SERVER_TIMING_SAMPLE_RATE=1.0), self.assertLogs('myApp.timing', 'INFO') as logs:
+            response = self.client.get(reverse('faqs'))
+        self.assertIn('total;dur=', response['Server-Timing'])
+        self.assertEqual(json.loads(logs.records[0].getMessage())['view'], 'faqs')
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=100, SLOW_QUERY_REPEAT_COUNT=20)
+class SlowQueryTests(TestCase):
+    """Slow and repeated statements are recorded per fingerprint, across processes."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.enterContext(self.settings(SLOW_QUERY_DIR=self.directory))
+        self.enterContext(mock.patch.object(slow_queries, '_entries', {}))
+
+    def _request(self, queries):
+        timing, token = request_timing.start()
+        try:
+            for pk in range(queries):
+                content_models.Stat.objects.filter(pk=pk).exists()
+        finally:
+            request_timing.finish(token)
+        slow_queries.finish_request(timing)
+
+    def _stat_entries(self):
+        return [entry for entry in slow_queries.collect() if '"myApp_stat"' in entry['sql']]
+
+    def test_fast_statement_repeated_in_a_request_is_recorded(self):
+        with self.assertLogs('myApp.slow_queries', 'WARNING'):
+            self._request(25)
+        self._request(30)
+
+        [entry] = self._stat_entries()
+        self.assertEqual(entry['count'], 55)
+        self.assertEqual(entry['flagged_requests'], 2)
+        self.assertEqual(entry['max_per_request'], 30)
+        self.assertTrue(any('tests.py' in frame for frame in entry['stack']), entry['stack'])
+
+    def test_statements_under_both_limits_are_not_recorded(self):
+        self._request(5)
+        self.assertEqual(self._stat_entries(), [])
+
+    def test_files_of_a_reused_pid_are_kept_and_exited_processes_folded(self):
+        pid = 999999
+        while slow_queries._alive(pid):
+            pid -= 1
+        entry = {
+            'fingerprint': 'abc', 'sql': 'SELECT ?', 'database': 'default', 'count': 2, 'total_ms': 300.0,
+            'max_ms': 200.0, 'views': {'home': 2}, 'first_seen': 1.0, 'last_seen': 2.0,
+            'plan': [], 'stack': [],
+        }
+        # Two processes that had the same pid, one after the other
+        for started, count in ((1000, 2), (2000, 3)):
+            with open(os.path.join(self.directory, f'{pid}-{started}.json'), 'w') as f:
+                json.dump([dict(entry, count=count)], f)
+
+        [merged] = slow_queries.collect()
+        self.assertEqual(merged['count'], 5)
+        self.assertEqual(sorted(os.listdir(self.directory)), ['.lock', slow_queries.DEAD_FILE])
+        self.assertEqual(slow_queries.collect()[0]['count'], 5)
+
+
+class MetricsTests(SimpleTestCase):
+    """Snapshots of every worker are merged into one Prometheus scrape."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.enterContext(self.settings(METRICS_DIR=self.directory))
+        # This process starts with no values of its own
+        self.enterContext(mock.patch.object(metrics, '_values', {}))
+        self.enterContext(mock.patch.object(metrics, '_recent', {}))
+
+    def _write_snapshot(self, pid, values):
+        metrics._write(os.path.join(self.directory, f'{pid}.json'), {'values': values, 'recent': []})
+
+    def _exited_pid(self):
+        pid = 999999
+        while metrics._alive(pid):
+            pid -= 1
+        return pid
+
+    def _histogram(self, *observations):
+        value = [0] * (len(metrics.BUCKETS) + 2)
+        for observation in observations:
+            value[metrics._bucket(observation)] += 1
+            value[-2] += observation
+            value[-1] += 1
+        return value
+
+    def test_snapshots_of_live_and_exited_workers_are_summed(self):
+        labels = {'view': 'home'}
+        self._write_snapshot(os.getppid(), [['db_queries_total', labels, 5],
+                                            ['http_request_duration_seconds', labels, self._histogram(0.02)]])
+        dead = self._exited_pid()
+        self._write_snapshot(dead, [['db_queries_total', labels, 7],
+                                    ['http_request_duration_seconds', labels, self._histogram(0.3, 0.004)]])
+        metrics.inc('db_queries_total', 3, view='home')
+
+        key = ('db_queries_total', (('view', 'home'),))
+        totals = metrics.collect()
+        self.assertEqual(totals[key], 15)
+        self.assertEqual(totals[('http_request_duration_seconds', key[1])], self._histogram(0.02, 0.3, 0.004))
+
+        # The exited worker is folded into dead.json, and still counted
+        self.assertFalse(os.path.exists(os.path.join(self.directory, f'{dead}.json')))
+        self.assertTrue(os.path.exists(os.path.join(self.directory, metrics.DEAD_FILE)))
+        self.assertEqual(metrics.collect()[key], 15)
+
+    def test_render_is_prometheus_text_format(self):
+        metrics.inc('cache_events_total', 2, section='home', event='hit')
+        metrics.observe('http_request_duration_seconds', 0.02, view='faqs', method='GET')
+        metrics.observe('http_request_duration_seconds', 20.0, view='faqs', method='GET')
+
+        lines = metrics.render().splitlines()
+        self.assertIn('# TYPE cache_events_total counter', lines)
+        self.assertIn('cache_events_total{event="hit",section="home"} 2', lines)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', lines)
+        series = '{method="GET",view="faqs"'
+        self.assertIn(f'http_request_duration_seconds_bucket{series},le="0.01"}} 0', lines)
+        self.assertIn(f'http_request_duration_seconds_bucket{series},le="0.025"}} 1', lines)
+        self.assertIn(f'http_request_duration_seconds_bucket{series},le="10.0"}} 1', lines)
+        self.assertIn(f'http_request_duration_seconds_bucket{series},le="+Inf"}} 2', lines)
+        self.assertIn(f'http_request_duration_seconds_sum{series}}} 20.02', lines)
+        self.assertIn(f'http_request_duration_seconds_count{series}}} 2', lines)
+
+    def test_label_values_are_escaped(self):
+        metrics.inc('cache_events_total', section='a"b\\c', event='miss')
+        self.assertIn('cache_events_total{event="miss",section="a\\"b\\\\c"} 1', metrics.render())
+
+    def test_scrape_is_staff_only_unless_localhost_is_allowed(self):
+        # The test client connects from 127.0.0.1
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        with self.settings(METRICS_ALLOW_LOCALHOST=True):
+            response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, SERVER_TIMING_SAMPLE_RATE=0)
+class PublicPageCookieTests(TestCase):
+    """Public pages skip session and auth, so shared caches can store them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser('cookies', 'cookies@example.com', 'password')
+
+    def setUp(self):
+        profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(profile_dir.cleanup)
+        self.enterContext(self.settings(REQUEST_PROFILE_DIR=profile_dir.name))
+
+    def assertVaries(self, response, header):
+        vary = [value.strip().lower() for value in response.get('Vary', '').split(',')]
+        self.assertIn(header.lower(), vary, response.get('Vary'))
+
+    def assertPublic(self, response, path):
+        self.assertEqual(response.status_code, 200, path)
+        self.assertEqual(response.cookies, {}, path)
+        self.assertFalse(response.has_header('Set-Cookie'), path)
+        self.assertNotIn('cookie', response.get('Vary', '').lower(), path)
+        self.assertFalse(response.has_header('X-Profile-Id'), path)
+
+    def test_public_pages_set_no_cookie_and_do_not_vary_on_it(self):
+        paths = list(public_pages())
+        self.assertIn('/', paths)
+        for path in paths:
+            self.assertPublic(self.client.get(path), path)
+
+        # Nor for a signed-in visitor, whose session cookie is ignored
+        self.client.force_login(self.staff)
+        for path in paths:
+            self.assertPublic(self.client.get(path), path)
+
+    def test_dashboard_pages_keep_session_and_csrf_cookies(self):
+        response = self.client.get(reverse('dashboard:login'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+        self.assertVaries(response, 'Cookie')
+
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('dashboard:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertVaries(response, 'Cookie')
+
+        response = self.client.post(reverse('dashboard:logout'))
+        self.assertEqual(response.cookies[settings.SESSION_COOKIE_NAME].value, '')
+
+    def test_flagged_profiling_requests_take_the_full_auth_path(self):
+        path = reverse('about')
+        flag = {request_profiler.QUERY_FLAG: '1'}
+
+        # Anonymous: the flag loads the (anonymous) user, but nothing is profiled
+        response = self.client.get(path, flag)
+        self.assertEqual(response.status_code, 200)
+        self.assertVaries(response, 'Cookie')
+        self.assertFalse(response.has_header('X-Profile-Id'))
+
+        self.client.force_login(self.staff)
+        response = self.client.get(path, flag)
+        self.assertVaries(response, 'Cookie')
+        self.assertEqual(request_profiler.list_profiles()[0]['id'], response['X-Profile-Id'])
+        response = self.client.get(path, HTTP_X_PROFILE='1')
+        self.assertTrue(response.has_header('X-Profile-Id'))
+
+
+class PlaceholderTests(SimpleTestCase):
+    """Placeholders and dominant colors of uploaded images."""
+
+    def _png(self, img):
+        output = BytesIO()
+        img.save(output, format='PNG')
+        return output.getvalue()
+
+    def test_transparent_areas_are_white_and_ignored_for_the_color(self):
+        # A red logo on a transparent background, as uploaded for Heart.png
+        logo = Image.new('RGBA', (200, 200), (0, 0, 0, 0))
+        ImageDraw.Draw(logo).ellipse((60, 60, 140, 140), fill=(200, 30, 40, 255))
+
+        result = compute_placeholder(logo)
+        self.assertEqual(result['dominant_color'][:3], '#c8')
+        with Image.open(BytesIO(base64.b64decode(result['placeholder'].split(',', 1)[1]))) as placeholder:
+            corner = placeholder.convert('RGB').getpixel((0, 0))
+        self.assertTrue(all(channel > 240 for channel in corner), corner)
+
+    def test_undecodable_image_is_stored_without_placeholder(self):
+        data = self._png(Image.new('RGB', (400, 300), (20, 60, 120)))
+        # Header and size intact, pixel data cut short
+        truncated = ContentFile(data[:len(data) // 2], name='Gathering.png')
+
+        with self.assertLogs('myApp.utils.local_file_utils', 'WARNING'):
+            result = process_local_image(truncated)
+        self.assertEqual((result['width'], result['height']), (400, 300))
+        self.assertEqual(result['placeholder'], '')
+        self.assertEqual(result['dominant_color'], '')
+
+
+# Maximum queries per view (cold caches, staff session), keyed by URL name
+# plus the URL arguments it takes. A new view needs an entry here.
+QUERY_BUDGETS = {
+    'home': 35,
+    'about': 5,
+    'core_beliefs': 2,
+    'what_we_do': 14,
+    'events': 15,
+    'mission_accomplished': 15,
+    'donate': 10,
+    'contact': 2,
+    'faqs': 2,
+    'privacy': 2,
+    'metrics': 2,
+    'dashboard:login': 2,
+    'dashboard:logout': 4,
+    'dashboard:index': 7,
+    'dashboard:publish_content': 2,
+    'dashboard:gallery': 4,
+    'dashboard:performance': 4,
+    'dashboard:upload_image': 2,
+    'dashboard:delete_image(image_id)': 4,
+    'dashboard:seo_edit(page)': 3,
+    'dashboard:navigation_delete(nav_id)': 4,
+    'dashboard:hero_edit(page)': 3,
+    'dashboard:about_edit(page)': 3,
+    'dashboard:stats_list': 3,
+    'dashboard:stat_edit': 2,
+    'dashboard:stat_edit(stat_id)': 3,
+    'dashboard:stat_delete(stat_id)': 4,
+    'dashboard:programs_list': 3,
+    'dashboard:program_edit': 2,
+    'dashboard:program_edit(program_id)': 3,
+    'dashboard:program_delete(program_id)': 4,
+    'dashboard:testimonials_list': 3,
+    'dashboard:testimonial_edit': 2,
+    'dashboard:testimonial_edit(testimonial_id)': 3,
+    'dashboard:testimonial_delete(testimonial_id)': 4,
+    'dashboard:impact_story_delete(story_id)': 4,
+    'dashboard:contact_info_delete(item_id)': 4,
+    'dashboard:social_link_delete(link_id)': 4,
+    'dashboard:event_delete(event_id)': 4,
+    'dashboard:profiles_list': 2,
+    'dashboard:profile_detail(profile_id)': 2,
+    'dashboard:profile_download(kind,profile_id)': 2,
+}
+
+# Views not walked, with the reason
+UNBUDGETED_VIEWS = {
+    'mirror_image': 'fetches and stores a remote image on first request',
+}
+
+# Dashboard views not walked and left out of QUERY_BUDGETS: their templates
+# (dashboard/<name>.html) have never existed in this tree, so a GET raises
+# TemplateDoesNotExist. Give a view a budget when its template is added.
+MISSING_TEMPLATE_VIEWS = (
+    'dashboard:navigation_edit',
+    'dashboard:featured_story_edit(page)',
+    'dashboard:retreat_edit(page)',
+    'dashboard:impact_stories_list',
+    'dashboard:impact_story_edit',
+    'dashboard:impact_story_edit(story_id)',
+    'dashboard:cta_edit(page)',
+    'dashboard:contact_edit(page)',
+    'dashboard:contact_info_list',
+    'dashboard:contact_info_edit',
+    'dashboard:contact_info_edit(item_id)',
+    'dashboard:social_links_list',
+    'dashboard:social_link_edit',
+    'dashboard:social_link_edit(link_id)',
+    'dashboard:footer_edit(page)',
+    'dashboard:events_list',
+    'dashboard:event_edit',
+    'dashboard:event_edit(event_id)',
+)
+
+# POST-only views, measured with a POST (a GET is refused with 405)
+POSTED_VIEWS = (
+    'dashboard:delete_image(image_id)',
+    'dashboard:navigation_delete(nav_id)',
+    'dashboard:stat_delete(stat_id)',
+    'dashboard:program_delete(program_id)',
+    'dashboard:testimonial_delete(testimonial_id)',
+    'dashboard:impact_story_delete(story_id)',
+    'dashboard:contact_info_delete(item_id)',
+    'dashboard:social_link_delete(link_id)',
+    'dashboard:event_delete(event_id)',
+)
+
+# Expected status of the request by a staff user, where it is not 200.
+# publish_content and upload_image are measured by their 405: a POST would
+# write the published content database or need an upload.
+EXPECTED_STATUS = {
+    'dashboard:login': 302,
+    'dashboard:logout': 302,
+    'dashboard:publish_content': 405,
+    'dashboard:upload_image': 405,
+    'dashboard:navigation_delete(nav_id)': 302,
+    'dashboard:stat_delete(stat_id)': 302,
+    'dashboard:program_delete(program_id)': 302,
+    'dashboard:testimonial_delete(testimonial_id)': 302,
+    'dashboard:impact_story_delete(story_id)': 302,
+    'dashboard:contact_info_delete(item_id)': 302,
+    'dashboard:social_link_delete(link_id)': 302,
+    'dashboard:event_delete(event_id)': 302,
+}
+
+# Models whose row count grows with the site; the others hold one row per page
+SCALED_MODELS = (
+    'MediaAsset', 'Navigation', 'Stat', 'Program', 'Testimonial', 'ImpactStory',
+    'ContactInfo', 'SocialLink', 'Event',
+)
+
+# Images the public templates reference: (file name, width, height)
+SITE_IMAGES = (
+    ('01.webp', 1600, 1200),
+    ('02.webp', 1600, 1200),
+    ('Heart.png', 1200, 1200),
+    ('Gathering.png', 1200, 800),
+    ('FeedTeachLove.png', 1200, 900),
+    ('Leadership.png', 1200, 800),
+    ('Yes_To_Life_Logo_square.webp', 800, 800),
+)
+
+SITE_EVENTS = (
+    {'title': 'A Heart of Remembrance', 'date_range': 'May 23–26, 2025',
+     'location': 'Mepkin Abbey Retreat Center · Moncks Corner, SC',
+     'description': 'A retreat of reflection, remembrance and healing.',
+     'image_url': '/media/uploads/2025/12/05/Heart.png', 'is_featured': True},
+    {'title': 'Yes to Life', 'date_range': 'September 2025', 'location': 'Cebu, Philippines',
+     'description': 'A youth camp celebrating life, purpose and belonging.',
+     'image_url': '/media/uploads/2025/12/05/Yes_To_Life_Logo_square.webp'},
+    {'title': 'Community Gathering', 'date_range': 'Every first Saturday', 'location': 'Charleston, SC',
+     'description': 'Neighbours, volunteers and families sharing a meal.',
+     'image_url': '/media/uploads/2025/12/05/Gathering.png'},
+    {'title': 'Leadership Summit', 'date_range': 'November 2025', 'location': 'Online',
+     'description': 'Mentors and young leaders planning the year ahead.',
+     'image_url': '/media/uploads/2025/12/05/Leadership.png', 'is_upcoming': False},
+)
+
+# URL argument -> model whose first row is used, or a literal value
+URL_ARGUMENTS = {
+    'page': 'home',
+    'image_id': 'MediaAsset',
+    'nav_id': 'Navigation',
+    'stat_id': 'Stat',
+    'program_id': 'Program',
+    'testimonial_id': 'Testimonial',
+    'story_id': 'ImpactStory',
+    'item_id': 'ContactInfo',
+    'link_id': 'SocialLink',
+    'event_id': 'Event',
+    'kind': 'stacks',
+}
+
+SQL_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def _site_image(name, width, height):
+    stem, extension = os.path.splitext(name)
+    widths = [w for w in variant_widths(width) if w < width]
+    return content_models.MediaAsset(
+        title=stem.replace('_', ' '), image_file=f'uploads/2025/12/05/{name}', storage_type='local',
+        width=width, height=height, format=extension[1:], file_size=width * height // 4,
+        variants={fmt: {str(w): f'variants/{stem}-{w}.{fmt}' for w in widths} for fmt in ('avif', 'webp')},
+        dominant_color='#1f2a44',
+    )
+
+
+def _grow(model, count):
+    """Add copies of the seeded rows (in order, renumbered) until the table has count rows."""
+    existing = model.objects.count()
+    originals = list(model.objects.order_by('pk')[:max(existing, 1)])
+    copies = []
+    for i in range(existing, count):
+        row = copy.copy(originals[i % len(originals)])
+        row.pk = None
+        if hasattr(row, 'sort_order'):
+            row.sort_order = i
+        if model is content_models.MediaAsset:
+            stem, extension = os.path.splitext(row.image_file.name)
+            row.image_file = f'{stem}-{i}{extension}'
+        copies.append(row)
+    model.objects.bulk_create(copies)
+
+
+def _fingerprint(sql):
+    return SQL_LITERAL_RE.sub('?', sql)
+
+
+@override_settings(
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'query-budget'},
+        'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'query-budget-shared'},
+    },
+    # Poll the content version on every call so the count does not depend on timing
+    CONTENT_VERSION_POLL_INTERVAL=0,
+    SERVER_TIMING_SAMPLE_RATE=0,
+    METRICS_DIR=os.path.join(tempfile.gettempdir(), 'query-budget-metrics'),
+    # The slow query log's EXPLAIN would add a query
+    SLOW_QUERY_THRESHOLD_MS=0,
+)
+class QueryBudgetTests(TestCase):
+    """Every named view runs a constant number of queries, within its budget."""
+
+    SMALL = 10
+    LARGE = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('budget', 'budget@example.com', 'password')
+        # The site's own seed content, plus its images and events
+        call_command('import_homepage_data', stdout=StringIO())
+        content_models.MediaAsset.objects.bulk_create(_site_image(*image) for image in SITE_IMAGES)
+        content_models.Event.objects.bulk_create(
+            content_models.Event(sort_order=i, button_text='Learn more', button_url='/contact/', **event)
+            for i, event in enumerate(SITE_EVENTS)
+        )
+
+    def setUp(self):
+        profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(profile_dir.cleanup)
+        # delete_image removes the files it points at
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(self.settings(REQUEST_PROFILE_DIR=profile_dir.name, MEDIA_ROOT=media_root.name))
+        # A real profile for the profile views to show
+        self.client.force_login(self.user)
+        self.client.get(reverse('about'), {request_profiler.QUERY_FLAG: '1'})
+        self.profile_id = request_profiler.list_profiles()[0]['id']
+
+    def _seed(self, count):
+        for name in SCALED_MODELS:
+            _grow(getattr(content_models, name), count)
+
+    def _named_urls(self):
+        """(label, url) for every named route in the root and dashboard URLconfs."""
+        patterns = [(p, '') for p in get_resolver().url_patterns if not isinstance(p, URLResolver)]
+        for p in get_resolver().url_patterns:
+            if isinstance(p, URLResolver) and p.namespace == 'dashboard':
+                patterns += [(child, 'dashboard:') for child in p.url_patterns]
+
+        for pattern, namespace in patterns:
+            if not pattern.name or pattern.name in UNBUDGETED_VIEWS:
+                continue
+            arguments = sorted(pattern.pattern.converters)
+            kwargs = {}
+            for argument in arguments:
+                value = self.profile_id if argument == 'profile_id' else URL_ARGUMENTS[argument]
+                if hasattr(content_models, value):
+                    value = getattr(content_models, value).objects.order_by('pk').first().pk
+                kwargs[argument] = value
+            label = namespace + pattern.name + (f'({",".join(arguments)})' if arguments else '')
+            yield label, reverse(namespace + pattern.name, kwargs=kwargs)
+
+    def _measure(self):
+        """Queries per view, each view measured with cold caches."""
+        queries = {}
+        for label, url in self._named_urls():
+            if label in MISSING_TEMPLATE_VIEWS:
+                continue
+            with self.captureOnCommitCallbacks(execute=True):
+                bump_content_version()
+            self.client.force_login(self.user)
+            method = self.client.post if label in POSTED_VIEWS else self.client.get
+            with CaptureQueriesContext(connection) as captured:
+                response = method(url)
+            self.assertEqual(response.status_code, EXPECTED_STATUS.get(label, 200), f'{label}: {url}')
+            queries[label] = [q['sql'] for q in captured.captured_queries]
+        return queries
+
+    def test_query_counts_are_constant_and_within_budget(self):
+        self._seed(self.SMALL)
+        small = self._measure()
+        self._seed(self.LARGE)
+        large = self._measure()
+
+        problems = []
+        for label, sql in large.items():
+            if len(sql) != len(small[label]):
+                grown = Counter(map(_fingerprint, sql)) - Counter(map(_fingerprint, small[label]))
+                problems.append(
+                    f'{label}: {len(small[label])} queries with {self.SMALL} rows, '
+                    f'{len(sql)} with {self.LARGE}; repeated queries:\n'
+                    + '\n'.join(f'    +{n} x {q}' for q, n in grown.most_common(5))
+                )
+            budget = QUERY_BUDGETS.get(label)
+            if budget is None:
+                problems.append(f'{label}: no budget declared ({len(sql)} queries)')
+            elif len(sql) > budget:
+                counted = Counter(map(_fingerprint, sql))
+                problems.append(
+                    f'{label}: {len(sql)} queries, budget {budget}:\n'
+                    + '\n'.join(f'    {n} x {q}' for q, n in counted.most_common())
+                )
+        if problems:
+            self.fail('Query budget exceeded:\n' + '\n'.join(problems))
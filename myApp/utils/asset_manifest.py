@@ -0,0 +1,144 @@
+"""
+Content-hashed build assets (compiled CSS, icon and font bundles).
+
+Build commands write files named ``<name>.<hash>.<ext>`` into STATIC_ROOT
+and record them in ``asset-manifest.json`` so templates can reference the
+current build. Hashed names never change content, so they are served with
+immutable, far-future cache headers.
+"""
+
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.templatetags.static import static
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, concurrent builds may race
+    fcntl = None
+
+
+MANIFEST_NAME = 'asset-manifest.json'
+HASH_LENGTH = 12
+
+_manifest_cache = {'mtime': None, 'data': {}}
+
+
+def manifest_path():
+    return os.path.join(settings.STATIC_ROOT, MANIFEST_NAME)
+
+
+def content_hash(content):
+    return hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+
+
+def load_manifest():
+    """Manifest contents, re-read only when the file changes."""
+    path = manifest_path()
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    if mtime != _manifest_cache['mtime']:
+        with open(path) as f:
+            _manifest_cache['data'] = json.load(f)
+        _manifest_cache['mtime'] = mtime
+    return _manifest_cache['data']
+
+
+def write_asset(name, content, extension, meta=None):
+    """
+    Write a content-hashed asset into STATIC_ROOT and record it in the manifest.
+
+    Args:
+        name: Logical asset name, e.g. 'css/site'
+        content: bytes
+        extension: File extension without the dot, e.g. 'css'
+        meta: Optional dict stored alongside the path (e.g. preload hints)
+
+    Returns:
+        Path of the written file relative to STATIC_ROOT
+    """
+    relative_path = f'{name}.{content_hash(content)}.{extension}'
+    full_path = os.path.join(settings.STATIC_ROOT, relative_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    if not os.path.exists(full_path):
+        tmp_path = f'{full_path}.tmp-{os.getpid()}'
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, full_path)
+
+    # Concurrent builds (e.g. several workers starting at once) each update
+    # their own entry: re-read the file under the lock rather than trusting
+    # the mtime-cached copy, which another writer may have just replaced.
+    with _manifest_lock():
+        manifest = _read_manifest()
+        previous = manifest.get(name, {}).get('path')
+        manifest[name] = dict(meta or {}, path=relative_path)
+        _write_manifest(manifest)
+
+        # Keep the previous build around for pages already in caches; drop older ones
+        _prune(name, extension, keep={relative_path, previous})
+    return relative_path
+
+
+def asset_path(name):
+    """Path relative to STATIC_ROOT for a built asset, or None if not built."""
+    entry = load_manifest().get(name)
+    return entry['path'] if entry else None
+
+
+def asset_url(name):
+    """Static URL for a built asset, or None if it has not been built."""
+    path = asset_path(name)
+    return static(path) if path else None
+
+
+def asset_meta(name):
+    return load_manifest().get(name, {})
+
+
+@contextmanager
+def _manifest_lock():
+    """Serialize manifest updates across processes."""
+    path = manifest_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(f'{path}.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def _read_manifest():
+    try:
+        with open(manifest_path()) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_manifest(manifest):
+    path = manifest_path()
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _prune(name, extension, keep):
+    directory = os.path.join(settings.STATIC_ROOT, os.path.dirname(name))
+    prefix = os.path.basename(name) + '.'
+    for filename in os.listdir(directory):
+        relative = os.path.join(os.path.dirname(name), filename)
+        if (
+            filename.startswith(prefix)
+            and filename.endswith(f'.{extension}')
+            and len(filename) == len(prefix) + HASH_LENGTH + len(extension) + 1
+            and relative not in keep
+        ):
+            os.remove(os.path.join(directory, filename))
@@ -0,0 +1,398 @@
+"""
+Stale-while-revalidate caching with single-flight rebuilds.
+
+Entries are stored as envelopes carrying a "fresh until" timestamp. Until
+then they are served as-is. Between going stale and the hard TTL ceiling
+(timeout + stale_timeout) exactly one worker rebuilds while everyone else
+keeps serving the stale value. After the ceiling the entry is gone; one
+worker rebuilds and concurrent requests wait for its result instead of
+stampeding SQLite and the template engine. If the lock is released without
+a value being stored (the builder raised, e.g. for an uncacheable error
+page), the waiters stop waiting and build their own.
+
+The rebuild lock is taken per key, both in-process (threading.Lock) and
+across processes (cache.add on the shared tier).
+
+aget_or_rebuild() and the async branch of cached_page() follow the same
+protocol for async views: cache operations are awaited, builders may be
+coroutine functions, and sync builders run through sync_to_async.
+"""
+
+import asyncio
+import threading
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+from . import metrics, request_timing
+from .precompress import apply_encoding, encode_content
+
+
+DEFAULT_TIMEOUT = 300
+DEFAULT_STALE_TIMEOUT = 3600
+LOCK_TIMEOUT = 30  # seconds before an abandoned rebuild lock expires
+WAIT_TIMEOUT = 5  # seconds a request waits for another worker's rebuild
+POLL_INTERVAL = 0.05
+
+_metrics = {
+    'fresh_hits': 0,
+    'stale_serves': 0,
+    'misses': 0,
+    'rebuilds': 0,
+    'rebuild_errors': 0,
+    'lock_waits': 0,
+    'wait_timeouts': 0,
+}
+_metrics_lock = threading.Lock()
+_key_locks = {}
+_key_locks_lock = threading.Lock()
+
+
+def _count(name, key):
+    with _metrics_lock:
+        _metrics[name] += 1
+    # Section is the key's prefix: page, content, media, critical-css, ...
+    metrics.inc('cache_events_total', event=name, section=key.split(':', 1)[0])
+
+
+def get_metrics():
+    """Snapshot of the stale-while-revalidate counters for this process."""
+    with _metrics_lock:
+        return dict(_metrics)
+
+
+def rebuilds_in_progress():
+    """Keys this process is rebuilding right now."""
+    with _key_locks_lock:
+        lock_keys = [lock_key for lock_key, lock in _key_locks.items() if lock.locked()]
+    # 'rebuild-lock:<key>:<version>'
+    return sorted(lock_key.split(':', 1)[1].rsplit(':', 1)[0] for lock_key in lock_keys)
+
+
+def _lock_cache():
+    # Locks must not go through the local tier of TieredCache: deleting them
+    # would invalidate every process's local tier.
+    return getattr(cache, 'shared', cache)
+
+
+def _local_lock(key):
+    with _key_locks_lock:
+        lock = _key_locks.get(key)
+        if lock is None:
+            lock = _key_locks[key] = threading.Lock()
+        return lock
+
+
+def _acquire(lock_key, lock_timeout):
+    local = _local_lock(lock_key)
+    if not local.acquire(blocking=False):
+        return False
+    if not _lock_cache().add(lock_key, 1, lock_timeout):
+        local.release()
+        return False
+    return True
+
+
+def _release(lock_key):
+    _lock_cache().delete(lock_key)
+    _local_lock(lock_key).release()
+
+
+def _rebuild(key, builder, timeout, stale_timeout, version):
+    _count('rebuilds', key)
+    value = builder()
+    envelope = {'value': value, 'fresh_until': time.time() + timeout}
+    cache.set(key, envelope, timeout + stale_timeout, version=version)
+    return value
+
+
+def get_or_rebuild(key, builder, timeout=DEFAULT_TIMEOUT, stale_timeout=DEFAULT_STALE_TIMEOUT,
+                   version=None, lock_timeout=LOCK_TIMEOUT, wait_timeout=WAIT_TIMEOUT):
+    """
+    Return the cached value for key, rebuilding it with builder() when needed.
+
+    Args:
+        key: Cache key
+        builder: Zero-argument callable producing the value
+        timeout: Seconds the value is served as fresh
+        stale_timeout: Extra seconds a stale value may be served during a rebuild
+        version: Optional cache key version
+        lock_timeout: Seconds before an abandoned rebuild lock expires
+        wait_timeout: Seconds to wait for another worker's rebuild on a miss
+
+    Returns:
+        The cached or freshly built value
+    """
+    lock_key = f'rebuild-lock:{key}:{version}'
+    entry = cache.get(key, version=version)
+
+    if entry is not None:
+        if time.time() < entry['fresh_until']:
+            _count('fresh_hits', key)
+            request_timing.count('cache_hit')
+            return entry['value']
+
+        # Stale: one worker refreshes, everyone else serves the stale copy
+        if _acquire(lock_key, lock_timeout):
+            try:
+                return _rebuild(key, builder, timeout, stale_timeout, version)
+            except Exception:
+                _count('rebuild_errors', key)
+                _count('stale_serves', key)
+                return entry['value']
+            finally:
+                _release(lock_key)
+        _count('stale_serves', key)
+        request_timing.count('cache_hit')
+        return entry['value']
+
+    # Miss: one worker builds, the rest wait for its result
+    _count('misses', key)
+    request_timing.count('cache_miss')
+    if _acquire(lock_key, lock_timeout):
+        try:
+            return _rebuild(key, builder, timeout, stale_timeout, version)
+        finally:
+            _release(lock_key)
+
+    _count('lock_waits', key)
+    deadline = time.monotonic() + wait_timeout
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key, version=version)
+        if entry is not None:
+            return entry['value']
+        if not _lock_cache().has_key(lock_key):
+            # Released without storing a value: the builder raised (e.g. the
+            # page was an uncacheable error response), so build our own
+            entry = cache.get(key, version=version)
+            if entry is not None:
+                return entry['value']
+            break
+    else:
+        # The builder is taking too long (or died); don't hold the request hostage
+        _count('wait_timeouts', key)
+    return _rebuild(key, builder, timeout, stale_timeout, version)
+
+
+async def _aacquire(lock_key, lock_timeout):
+    local = _local_lock(lock_key)
+    if not local.acquire(blocking=False):
+        return False
+    if not await _lock_cache().aadd(lock_key, 1, lock_timeout):
+        local.release()
+        return False
+    return True
+
+
+async def _arelease(lock_key):
+    await _lock_cache().adelete(lock_key)
+    _local_lock(lock_key).release()
+
+
+async def _arebuild(key, builder, timeout, stale_timeout, version):
+    _count('rebuilds', key)
+    if iscoroutinefunction(builder):
+        value = await builder()
+    else:
+        value = await sync_to_async(builder)()
+    envelope = {'value': value, 'fresh_until': time.time() + timeout}
+    await cache.aset(key, envelope, timeout + stale_timeout, version=version)
+    return value
+
+
+async def aget_or_rebuild(key, builder, timeout=DEFAULT_TIMEOUT, stale_timeout=DEFAULT_STALE_TIMEOUT,
+                          version=None, lock_timeout=LOCK_TIMEOUT, wait_timeout=WAIT_TIMEOUT):
+    """
+    get_or_rebuild() for async code. builder may be a coroutine function or
+    a plain callable (run in a thread, so it may use the ORM).
+    """
+    lock_key = f'rebuild-lock:{key}:{version}'
+    entry = await cache.aget(key, version=version)
+
+    if entry is not None:
+        if time.time() < entry['fresh_until']:
+            _count('fresh_hits', key)
+            request_timing.count('cache_hit')
+            return entry['value']
+
+        if await _aacquire(lock_key, lock_timeout):
+            try:
+                return await _arebuild(key, builder, timeout, stale_timeout, version)
+            except Exception:
+                _count('rebuild_errors', key)
+                _count('stale_serves', key)
+                return entry['value']
+            finally:
+                await _arelease(lock_key)
+        _count('stale_serves', key)
+        request_timing.count('cache_hit')
+        return entry['value']
+
+    _count('misses', key)
+    request_timing.count('cache_miss')
+    if await _aacquire(lock_key, lock_timeout):
+        try:
+            return await _arebuild(key, builder, timeout, stale_timeout, version)
+        finally:
+            await _arelease(lock_key)
+
+    _count('lock_waits', key)
+    deadline = time.monotonic() + wait_timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(POLL_INTERVAL)
+        entry = await cache.aget(key, version=version)
+        if entry is not None:
+            return entry['value']
+        if not await _lock_cache().ahas_key(lock_key):
+            entry = await cache.aget(key, version=version)
+            if entry is not None:
+                return entry['value']
+            break
+    else:
+        _count('wait_timeouts', key)
+    return await _arebuild(key, builder, timeout, stale_timeout, version)
+
+
+def cached_page(timeout=DEFAULT_TIMEOUT, stale_timeout=DEFAULT_STALE_TIMEOUT, version=None):
+    """
+    Cache a public view's rendered response with stale-while-revalidate.
+
+    Only GET/HEAD requests without a query string are cached, and only 200
+    responses without cookies are stored, post-processed and precompressed,
+    together with the headers the view set. GET and HEAD share an entry:
+    HEAD runs the view in full (the server drops the body), and a HEAD
+    response without a body is never stored. version is an
+    optional callable returning the cache key version (e.g. the current
+    content version). Async views get an async wrapper, whose version may
+    also be a coroutine function.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            return _async_cached_page(view_func, timeout, stale_timeout, version)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not _cacheable(request):
+                return view_func(request, *args, **kwargs)
+
+            uncacheable = []
+
+            def build():
+                response = view_func(request, *args, **kwargs)
+                if not _storable(request, response):
+                    uncacheable.append(response)
+                    raise _UncacheableResponse
+                return _page_entry(request, response)
+
+            try:
+                page = get_or_rebuild(
+                    f'page:{request.path}', build, timeout=timeout,
+                    stale_timeout=stale_timeout,
+                    version=version() if callable(version) else version,
+                )
+            except _UncacheableResponse:
+                return uncacheable[0]
+            return _page_response(request, page)
+        return wrapper
+    return decorator
+
+
+def _async_cached_page(view_func, timeout, stale_timeout, version):
+    """cached_page() for an async view; version may be a coroutine function."""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if not _cacheable(request):
+            return await view_func(request, *args, **kwargs)
+
+        uncacheable = []
+
+        async def build():
+            response = await view_func(request, *args, **kwargs)
+            if not _storable(request, response):
+                uncacheable.append(response)
+                raise _UncacheableResponse
+            # Post-processing and compression are CPU work; keep them off the event loop
+            return await sync_to_async(_page_entry)(request, response)
+
+        if iscoroutinefunction(version):
+            key_version = await version()
+        else:
+            key_version = version() if callable(version) else version
+        try:
+            page = await aget_or_rebuild(
+                f'page:{request.path}', build, timeout=timeout,
+                stale_timeout=stale_timeout, version=key_version,
+            )
+        except _UncacheableResponse:
+            return uncacheable[0]
+        return _page_response(request, page)
+    return wrapper
+
+
+def _cacheable(request):
+    return request.method in ('GET', 'HEAD') and not request.META.get('QUERY_STRING')
+
+
+# Recomputed for every response served from the cache
+PER_RESPONSE_HEADERS = ('content-type', 'content-length', 'content-encoding')
+
+
+def _storable(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not (request.method == 'HEAD' and not response.content)
+    )
+
+
+def _page_entry(request, response):
+    content = postprocess_page(request, response.content, response['Content-Type'])
+    return {
+        'content': content,
+        'content_type': response['Content-Type'],
+        'headers': [
+            (name, value) for name, value in response.items()
+            if name.lower() not in PER_RESPONSE_HEADERS
+        ],
+        'encodings': encode_content(content),
+    }
+
+
+def _page_response(request, page):
+    response = HttpResponse(page['content'], content_type=page['content_type'])
+    for name, value in page.get('headers', ()):
+        response[name] = value
+    return apply_encoding(request, response, page.get('encodings', {}))
+
+
+class _UncacheableResponse(Exception):
+    pass
+
+
+def page_postprocessors():
+    return [import_string(path) for path in getattr(settings, 'PAGE_POSTPROCESSORS', [])]
+
+
+def postprocess_page(request, content, content_type):
+    """
+    Run settings.PAGE_POSTPROCESSORS over an HTML page entering the page cache.
+
+    Each processor takes (request, html) and returns the new html; they run
+    once per page and content version rather than on every request.
+    """
+    if not content_type.startswith('text/html'):
+        return content
+    processors = page_postprocessors()
+    if not processors:
+        return content
+    html = content.decode('utf-8')
+    for processor in processors:
+        html = processor(request, html)
+    return html.encode('utf-8')
@@ -6,6 +6,9 @@ from PIL import Image
 import os
 from django.conf import settings
 
+from . import metrics
+from .image_placeholders import placeholder_from_file
+
 # Maximum file size (10MB)
 MAX_BYTES = 10 * 1024 * 1024
 TARGET_BYTES = int(MAX_BYTES * 0.93)  # 9.3MB target after compression
@@ -34,6 +37,7 @@ def smart_compress_to_bytes(image_file, target_bytes=TARGET_BYTES, max_quality=8
         # If image is already small enough, return as-is
         output = BytesIO()
         img.save(output, format=original_format, quality=max_quality, optimize=True)
+        metrics.inc('image_compression_passes_total', function='smart_compress_to_bytes')
         if len(output.getvalue()) <= target_bytes:
             output.seek(0)
             return output.getvalue(), original_format
@@ -50,6 +54,7 @@ def smart_compress_to_bytes(image_file, target_bytes=TARGET_BYTES, max_quality=8
             
             try:
                 img.save(output, format=original_format, quality=mid_quality, optimize=True)
+                metrics.inc('image_compression_passes_total', function='smart_compress_to_bytes')
                 size = len(output.getvalue())
                 
                 if size <= target_bytes:
@@ -67,6 +72,7 @@ def smart_compress_to_bytes(image_file, target_bytes=TARGET_BYTES, max_quality=8
         # If we couldn't compress enough, return minimum quality
         output = BytesIO()
         img.save(output, format=original_format, quality=min_quality, optimize=True)
+        metrics.inc('image_compression_passes_total', function='smart_compress_to_bytes')
         return output.getvalue(), original_format
         
     except Exception as e:
@@ -84,7 +90,8 @@ def upload_to_cloudinary(image_file, folder='iriseup', public_id=None, transform
         transformation: Optional transformation string
     
     Returns:
-        dict with original_url, web_url, thumbnail_url, public_id, width, height, format, file_size
+        dict with original_url, web_url, thumbnail_url, public_id, width, height, format, file_size,
+        placeholder, dominant_color
     """
     try:
         # Check file size
@@ -102,6 +109,14 @@ def upload_to_cloudinary(image_file, folder='iriseup', public_id=None, transform
             image_file = BytesIO(compressed_data)
             image_file.name = f"image.{format_type.lower()}"
         
+        # Inline placeholder and dominant color, computed before the bytes leave
+        try:
+            placeholder = placeholder_from_file(image_file)
+        except Exception:
+            # Formats Pillow cannot read (HEIC, ...) still upload; Cloudinary converts them
+            placeholder = {'placeholder': '', 'dominant_color': ''}
+            image_file.seek(0)
+        
         # Upload to Cloudinary
         upload_options = {
             'folder': folder,
@@ -118,10 +133,11 @@ def upload_to_cloudinary(image_file, folder='iriseup', public_id=None, transform
             upload_options['transformation'] = transformation
         
         # Perform upload
-        result = cloudinary.uploader.upload(
-            image_file,
-            **upload_options
-        )
+        with metrics.timer('storage_call_duration_seconds', backend='cloudinary', operation='upload'):
+            result = cloudinary.uploader.upload(
+                image_file,
+                **upload_options
+            )
         
         # Extract data
         public_id = result.get('public_id')
@@ -147,6 +163,8 @@ def upload_to_cloudinary(image_file, folder='iriseup', public_id=None, transform
             'height': height,
             'format': format_type,
             'file_size': bytes_size,
+            'placeholder': placeholder['placeholder'],
+            'dominant_color': placeholder['dominant_color'],
         }
         
     except cloudinary.exceptions.Error as e:
@@ -166,7 +184,8 @@ def delete_from_cloudinary(public_id):
         dict with deletion result
     """
     try:
-        result = cloudinary.uploader.destroy(public_id)
+        with metrics.timer('storage_call_duration_seconds', backend='cloudinary', operation='delete'):
+            result = cloudinary.uploader.destroy(public_id)
         return result
     except Exception as e:
         raise Exception(f"Error deleting from Cloudinary: {str(e)}")
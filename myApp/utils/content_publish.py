@@ -0,0 +1,80 @@
+import os
+import sqlite3
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+
+from ..content_helpers import invalidate_content_cache
+from ..db_routers import PUBLISHED_MODELS
+
+
+def publish_content_db(destination=None):
+    """
+    Export the content tables into a compact, standalone SQLite file.
+
+    The export is written to a temporary file next to the destination and
+    then moved into place with os.replace(), so readers either see the old
+    file or the new one, never a partially written database. Connections
+    already open on the old file keep reading their (unlinked) copy until
+    they close, which is safe because the file is opened immutable.
+
+    Args:
+        destination: Output path (defaults to settings.CONTENT_DB_PATH)
+
+    Returns:
+        dict with path, tables, rows and file_size
+    """
+    destination = str(destination or settings.CONTENT_DB_PATH)
+    source = str(connections['default'].settings_dict['NAME'])
+    tmp_path = f'{destination}.tmp-{os.getpid()}'
+
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    tables = [
+        apps.get_model('myApp', name)._meta.db_table
+        for name in PUBLISHED_MODELS
+    ]
+    total_rows = 0
+
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            # Immutable readers must not see a WAL file, so keep the
+            # published copy in rollback-journal mode.
+            conn.execute('PRAGMA journal_mode=DELETE')
+            conn.execute('ATTACH DATABASE ? AS src', (f'file:{source}?mode=ro',))
+            with conn:
+                for table in tables:
+                    schema = conn.execute(
+                        "SELECT type, sql FROM src.sqlite_master "
+                        "WHERE tbl_name = ? AND sql IS NOT NULL "
+                        "ORDER BY type = 'index'",
+                        (table,)
+                    ).fetchall()
+                    if not schema:
+                        continue
+                    for _type, sql in schema:
+                        conn.execute(sql)
+                    conn.execute(f'INSERT INTO main."{table}" SELECT * FROM src."{table}"')
+                    total_rows += conn.execute(f'SELECT COUNT(*) FROM main."{table}"').fetchone()[0]
+            conn.execute('DETACH DATABASE src')
+            conn.execute('ANALYZE')
+            conn.execute('VACUUM')
+        finally:
+            conn.close()
+
+        os.replace(tmp_path, destination)
+        invalidate_content_cache()
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise Exception(f"Error publishing content database: {str(e)}")
+
+    return {
+        'path': destination,
+        'tables': len(tables),
+        'rows': total_rows,
+        'file_size': os.path.getsize(destination),
+    }
@@ -0,0 +1,187 @@
+"""
+Critical CSS for public pages.
+
+The compiled site stylesheet blocks first paint. When a page enters the page
+cache, the rules its initial viewport needs — everything up to the end of the
+first <section> inside <main> (navigation and hero) — are inlined into <head>
+and the full stylesheet is loaded asynchronously.
+
+Rules are matched against the class names, tags and ids present in that
+markup; a rule is kept when every class, tag and id its selector mentions is
+present, which over-includes a little but never drops a rule the viewport
+uses. The result is cached per page and content version/stylesheet build.
+"""
+
+import os
+import re
+
+from django.conf import settings
+from django.utils.html import escape
+
+from .asset_manifest import asset_path, asset_url
+from .cache_utils import get_or_rebuild
+from .invalidation import current_content_version
+
+
+SITE_CSS = 'css/site'
+CRITICAL_CSS_TIMEOUT = 24 * 3600
+
+CLASS_ATTR_RE = re.compile(r'class\s*=\s*"([^"]*)"|class\s*=\s*\'([^\']*)\'')
+ID_ATTR_RE = re.compile(r'\bid\s*=\s*["\']([^"\']+)["\']')
+TAG_RE = re.compile(r'<([a-zA-Z][a-zA-Z0-9-]*)')
+SELECTOR_CLASS_RE = re.compile(r'\.((?:\\.|[\w-])+)')
+SELECTOR_ID_RE = re.compile(r'#((?:\\.|[\w-])+)')
+SELECTOR_ATTR_RE = re.compile(r'\[[^\]]*\]')
+SELECTOR_PSEUDO_RE = re.compile(r'::?[\w-]+(?:\([^()]*\))?')
+SELECTOR_TAG_RE = re.compile(r'[a-zA-Z][\w-]*')
+ANIMATION_RE = re.compile(r'animation(?:-name)?\s*:\s*([^;}]+)')
+ESCAPE_RE = re.compile(r'\\(.)')
+
+
+def parse_css(css):
+    """
+    Split a stylesheet into top-level statements.
+
+    Returns:
+        list of (prelude, body) tuples; body is None for statements without a block
+    """
+    statements = []
+    i, length, start = 0, len(css), 0
+    while i < length:
+        char = css[i]
+        if char in '"\'':
+            i = _skip_string(css, i)
+            continue
+        if css.startswith('/*', i):
+            end = css.find('*/', i + 2)
+            i = length if end == -1 else end + 2
+            start = i
+            continue
+        if char == ';':
+            prelude = css[start:i].strip()
+            if prelude:
+                statements.append((prelude, None))
+            start = i + 1
+        elif char == '{':
+            end = _matching_brace(css, i)
+            statements.append((css[start:i].strip(), css[i + 1:end]))
+            i = start = end + 1
+            continue
+        i += 1
+    return statements
+
+
+def _skip_string(css, i):
+    quote, i = css[i], i + 1
+    while i < len(css) and css[i] != quote:
+        i += 2 if css[i] == '\\' else 1
+    return i + 1
+
+
+def _matching_brace(css, i):
+    depth = 0
+    while i < len(css):
+        char = css[i]
+        if char in '"\'':
+            i = _skip_string(css, i)
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return len(css)
+
+
+def markup_tokens(html):
+    """Class names, tags and ids used in a piece of markup."""
+    classes = set()
+    for match in CLASS_ATTR_RE.finditer(html):
+        classes.update((match.group(1) or match.group(2) or '').split())
+    tags = {tag.lower() for tag in TAG_RE.findall(html)} | {'html', 'body'}
+    return classes, tags, set(ID_ATTR_RE.findall(html))
+
+
+def selector_matches(selector, classes, tags, ids):
+    selector_classes = {ESCAPE_RE.sub(r'\1', c) for c in SELECTOR_CLASS_RE.findall(selector)}
+    selector_ids = {ESCAPE_RE.sub(r'\1', i) for i in SELECTOR_ID_RE.findall(selector)}
+    rest = SELECTOR_CLASS_RE.sub(' ', selector)
+    rest = SELECTOR_ID_RE.sub(' ', rest)
+    rest = SELECTOR_ATTR_RE.sub(' ', rest)
+    # Twice, for pseudo-classes nested one level (:not(:first-child))
+    rest = SELECTOR_PSEUDO_RE.sub(' ', SELECTOR_PSEUDO_RE.sub(' ', rest))
+    selector_tags = {t.lower() for t in SELECTOR_TAG_RE.findall(rest)}
+    return selector_classes <= classes and selector_ids <= ids and selector_tags <= tags
+
+
+def _filter(statements, classes, tags, ids, keyframes):
+    rules, animations = [], set()
+    for prelude, body in statements:
+        if body is None:
+            continue
+        if prelude.startswith('@'):
+            at_rule = prelude.split()[0].lower()
+            if at_rule in ('@media', '@supports', '@layer'):
+                inner, inner_animations = _filter(parse_css(body), classes, tags, ids, keyframes)
+                if inner:
+                    rules.append(f'{prelude}{{{inner}}}')
+                    animations |= inner_animations
+            elif at_rule.endswith('keyframes'):
+                keyframes[prelude.split()[-1]] = f'{prelude}{{{body}}}'
+            continue
+        selectors = [s.strip() for s in prelude.split(',') if selector_matches(s.strip(), classes, tags, ids)]
+        if selectors:
+            rules.append(f'{",".join(selectors)}{{{body}}}')
+            for match in ANIMATION_RE.finditer(body):
+                animations.update(match.group(1).replace(',', ' ').split())
+    return ''.join(rules), animations
+
+
+def critical_css(html, css):
+    """CSS rules from `css` needed to render the initial viewport of `html`."""
+    main = html.find('<main')
+    fold_end = html.find('</section>', main if main != -1 else 0)
+    fold = html if fold_end == -1 else html[:fold_end]
+    body = fold.find('<body')
+    classes, tags, ids = markup_tokens(fold[body:] if body != -1 else fold)
+    keyframes = {}
+    rules, animations = _filter(parse_css(css), classes, tags, ids, keyframes)
+    # Keyframes only for animations the kept rules use
+    return rules + ''.join(keyframes[name] for name in sorted(animations) if name in keyframes)
+
+
+def page_critical_css(request, html):
+    """Critical CSS for a rendered page, cached per page and content version/stylesheet build."""
+    path = asset_path(SITE_CSS)
+
+    def build():
+        with open(os.path.join(settings.STATIC_ROOT, path), encoding='utf-8') as f:
+            return critical_css(html, f.read())
+
+    match = request.resolver_match
+    name = match.view_name if match else request.path
+    return get_or_rebuild(
+        f'critical-css:{name}', build, timeout=CRITICAL_CSS_TIMEOUT,
+        version=f'{current_content_version()}:{path}',
+    )
+
+
+def inline_critical_css(request, html):
+    """
+    Page post-processor: inline the critical rules of the compiled site
+    stylesheet and load the full file asynchronously.
+    """
+    url = asset_url(SITE_CSS)
+    link = f'<link rel="stylesheet" href="{url}">'
+    if not url or link not in html:
+        return html
+
+    css = page_critical_css(request, html)
+    href = escape(url)
+    return html.replace(link, (
+        f'<style>{css}</style>'
+        f'<link rel="preload" href="{href}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+        f'<noscript><link rel="stylesheet" href="{href}"></noscript>'
+    ), 1)
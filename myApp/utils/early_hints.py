@@ -0,0 +1,192 @@
+"""
+Preload hints for the critical resources of public pages.
+
+For each page the browser is told up front about the resources it would
+otherwise only discover after parsing the HTML and the blocking CSS: the
+compiled stylesheets, the preloaded font files and the hero (largest
+contentful paint) image at the right srcset width. The hero image comes from
+the section data the page's template renders its first image from (the home
+Hero), and is preloaded in the format of the first <source> that
+{% media_img %} emits for it, so the browser reuses the preloaded file.
+Pages whose templates hard-code their images get no image preload.
+
+Hints are sent as ``Link: rel=preload`` response headers, and as a
+``103 Early Hints`` response before the view runs when the ASGI server
+supports the ``http.response.early_hint`` extension (e.g. Hypercorn).
+Both are cached per page and content version.
+"""
+
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.apps import apps
+from django.templatetags.static import static
+from django.urls import Resolver404, resolve
+
+from ..db_routers import published_content
+from .asset_manifest import asset_path, asset_url
+from .cache_utils import aget_or_rebuild, get_or_rebuild
+from .font_subset import preload_fonts
+from .invalidation import acurrent_content_version, current_content_version
+from .media_index import aresolve_media, picture_sources, resolve_media, srcset
+
+
+# Page (URL name) -> (model, image field, sizes attribute of the template's
+# <img>), for pages whose template renders its hero from content.hero_image.
+# Rows are looked up by their `page` field.
+HERO_SECTIONS = {
+    'home': ('Hero', 'background_image_url', '(min-width: 1024px) 50vw, 100vw'),
+}
+
+STYLESHEETS = ('css/site', 'css/icons', 'css/fonts')
+LINKS_TIMEOUT = 3600
+
+
+def hero_image(page):
+    """
+    The hero image of a page, as a dict with src and sizes, or None.
+
+    Uses the section's image when it resolves to a local or mirrored image;
+    for unusable values (unmirrored remote URLs, non-image links) and pages
+    without a section row the template shows its own default, not preloaded.
+    Read from the published content, like the page itself.
+    """
+    if page not in HERO_SECTIONS:
+        return None
+    model_name, field, sizes = HERO_SECTIONS[page]
+    with published_content():
+        value = (
+            apps.get_model('myApp', model_name).objects
+            .filter(page=page).values_list(field, flat=True).first()
+        )
+        entry = resolve_media(value) if value else None
+    return {'src': entry['src'], 'sizes': sizes} if entry else None
+
+
+async def ahero_image(page):
+    """Async hero_image()."""
+    if page not in HERO_SECTIONS:
+        return None
+    model_name, field, sizes = HERO_SECTIONS[page]
+    with published_content():
+        value = await (
+            apps.get_model('myApp', model_name).objects
+            .filter(page=page).values_list(field, flat=True).afirst()
+        )
+        entry = await aresolve_media(value) if value else None
+    return {'src': entry['src'], 'sizes': sizes} if entry else None
+
+
+def _image_link(image):
+    entry = resolve_media(image['src'])
+    if entry is None:
+        return f'<{image["src"]}>; rel=preload; as=image; fetchpriority=high'
+    sources = picture_sources(entry)
+    if sources:
+        # The browser takes the first <source> whose type it supports; preload
+        # that one (browsers without the type skip the hint rather than fetch
+        # a file the page will not use)
+        mime, candidates = sources[0]
+        type_param = f'; type="{mime}"'
+    else:
+        candidates, type_param = entry.get('fallback'), ''
+    if not candidates:
+        return f'<{entry["src"]}>; rel=preload; as=image; fetchpriority=high'
+    # Same srcset/sizes as the template's markup, so the preload is reused
+    return (
+        f'<{candidates[-1][1]}>; rel=preload; as=image; fetchpriority=high{type_param}; '
+        f'imagesrcset="{srcset(candidates)}"; imagesizes="{image["sizes"]}"'
+    )
+
+
+def _build_links(page):
+    links = [f'<{asset_url(name)}>; rel=preload; as=style' for name in STYLESHEETS if asset_path(name)]
+    links += [
+        f'<{static(font["path"])}>; rel=preload; as=font; type="{font["type"]}"; crossorigin'
+        for font in preload_fonts()
+    ]
+    with published_content():
+        image = hero_image(page)
+        if image:
+            links.append(_image_link(image))
+    return links
+
+
+def _builds():
+    return ':'.join(asset_path(name) or '-' for name in STYLESHEETS)
+
+
+def page_links(page):
+    """Link header values for a page, cached per content version and asset build."""
+    return get_or_rebuild(
+        f'preload-links:{page}', lambda: _build_links(page), timeout=LINKS_TIMEOUT,
+        version=f'{current_content_version()}:{_builds()}',
+    )
+
+
+async def apage_links(page):
+    """Async page_links(); same cache entries."""
+    return await aget_or_rebuild(
+        f'preload-links:{page}', lambda: _build_links(page), timeout=LINKS_TIMEOUT,
+        version=f'{await acurrent_content_version()}:{_builds()}',
+    )
+
+
+def preload_hints(view_func):
+    """Add Link: rel=preload headers for the page's critical resources."""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            response = await view_func(request, *args, **kwargs)
+            match = request.resolver_match
+            if response.status_code == 200 and match is not None:
+                links = await apage_links(match.url_name)
+                if links:
+                    response['Link'] = ', '.join(links)
+            return response
+    else:
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = view_func(request, *args, **kwargs)
+            match = request.resolver_match
+            if response.status_code == 200 and match is not None:
+                links = page_links(match.url_name)
+                if links:
+                    response['Link'] = ', '.join(links)
+            return response
+    wrapper.preload_hints = True
+    return wrapper
+
+
+def links_for_path(path):
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return []
+    if not getattr(match.func, 'preload_hints', False):
+        return []
+    return page_links(match.url_name)
+
+
+class EarlyHintsMiddleware:
+    """
+    ASGI middleware sending 103 Early Hints for pages decorated with
+    @preload_hints, on servers that support the early hint extension.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope['type'] == 'http'
+            and scope.get('method') in ('GET', 'HEAD')
+            and 'http.response.early_hint' in scope.get('extensions', {})
+        ):
+            links = await sync_to_async(links_for_path)(scope['path'])
+            if links:
+                await send({
+                    'type': 'http.response.early_hint',
+                    'links': [link.encode('latin-1', 'ignore') for link in links],
+                })
+        await self.app(scope, receive, send)
@@ -0,0 +1,167 @@
+"""
+Self-hosted, subsetted web fonts.
+
+Takes the vendored Inter files from settings.FONT_SOURCE_DIR, subsets them to
+Basic Latin + Latin-1 plus every character our templates and content use,
+and writes content-hashed font files with a matching ``@font-face``
+stylesheet (``font-display: swap``) into STATIC_ROOT. The critical weights
+(settings.FONT_PRELOAD_WEIGHTS) are recorded for ``<link rel=preload>``.
+
+Subsetting needs fontTools (``pip install fonttools brotli``); without it the
+vendored files are used as-is, which still removes the two third-party
+origins from the critical path.
+"""
+
+import os
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+
+from .asset_manifest import asset_meta, write_asset
+
+try:
+    from fontTools import subset as font_subset
+except ImportError:
+    font_subset = None
+
+try:
+    import brotli  # noqa: F401 - needed by fontTools for WOFF2
+    SUBSET_FLAVOR = 'woff2'
+except ImportError:
+    SUBSET_FLAVOR = 'woff'
+
+
+ASSET_NAME = 'css/fonts'
+FONT_FAMILY = 'Inter'
+SOURCE_EXTENSIONS = ('.woff2', '.woff', '.ttf', '.otf')
+
+# Vendored file name (without extension) for each weight
+WEIGHT_FILES = {
+    300: 'Inter-Light',
+    400: 'Inter-Regular',
+    500: 'Inter-Medium',
+    600: 'Inter-SemiBold',
+    700: 'Inter-Bold',
+}
+
+# Always included so editors can type common punctuation and accents
+BASE_CODEPOINTS = set(range(0x20, 0x7F)) | set(range(0xA0, 0x100)) | {
+    0x2013, 0x2014, 0x2018, 0x2019, 0x201C, 0x201D, 0x2022, 0x2026, 0x20AC, 0x2122,
+}
+
+TEMPLATES_DIR = os.path.join(settings.BASE_DIR, 'myApp', 'templates', 'myApp')
+
+
+def text_codepoints():
+    """Code points used by the public templates and by content text fields."""
+    codepoints = set()
+    for filename in os.listdir(TEMPLATES_DIR):
+        if filename.endswith('.html'):
+            with open(os.path.join(TEMPLATES_DIR, filename), encoding='utf-8') as f:
+                codepoints |= {ord(c) for c in f.read()}
+
+    for model in apps.get_app_config('myApp').get_models():
+        fields = [
+            f.name for f in model._meta.get_fields()
+            if isinstance(f, (models.CharField, models.TextField))
+            and not isinstance(f, (models.URLField, models.EmailField))
+        ]
+        if not fields:
+            continue
+        for row in model.objects.values_list(*fields):
+            for value in row:
+                if value:
+                    codepoints |= {ord(c) for c in value}
+    return {cp for cp in codepoints if cp >= 0x20}
+
+
+def unicode_range(codepoints):
+    """Compact CSS unicode-range for a set of code points."""
+    ranges = []
+    for cp in sorted(codepoints):
+        if ranges and cp == ranges[-1][1] + 1:
+            ranges[-1][1] = cp
+        else:
+            ranges.append([cp, cp])
+    return ','.join(
+        f'U+{start:X}' if start == end else f'U+{start:X}-{end:X}'
+        for start, end in ranges
+    )
+
+
+def _source_file(weight):
+    base = os.path.join(settings.FONT_SOURCE_DIR, WEIGHT_FILES[weight])
+    for extension in SOURCE_EXTENSIONS:
+        if os.path.exists(base + extension):
+            return base + extension
+    return None
+
+
+def _subset(path, codepoints):
+    options = font_subset.Options()
+    options.flavor = SUBSET_FLAVOR
+    options.layout_features = ['kern', 'liga', 'calt', 'tnum']
+    options.name_IDs = []
+    options.notdef_outline = True
+    font = font_subset.load_font(path, options)
+    subsetter = font_subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+    output = BytesIO()
+    font_subset.save_font(font, output, options)
+    return output.getvalue()
+
+
+def build_fonts(weights, preload_weights, codepoints):
+    """
+    Write subsetted font files and their @font-face stylesheet.
+
+    Returns:
+        dict with path (stylesheet), fonts (weight -> path), subsetted, missing
+    """
+    codepoints = set(codepoints) | BASE_CODEPOINTS
+    fonts, missing, rules = {}, [], []
+    for weight in sorted(weights):
+        source = _source_file(weight)
+        if source is None:
+            missing.append(weight)
+            continue
+        if font_subset is not None:
+            data, extension = _subset(source, codepoints), SUBSET_FLAVOR
+        else:
+            with open(source, 'rb') as f:
+                data = f.read()
+            extension = os.path.splitext(source)[1][1:]
+        path = write_asset(f'fonts/inter-{weight}', data, extension)
+        fonts[weight] = path
+        rules.append(
+            '@font-face{'
+            f"font-family:'{FONT_FAMILY}';font-style:normal;font-weight:{weight};"
+            'font-display:swap;'
+            f"src:url('../{path}') format('{_format(extension)}')"
+            + (f';unicode-range:{unicode_range(codepoints)}' if font_subset is not None else '')
+            + '}'
+        )
+
+    preload = [
+        {'path': fonts[weight], 'type': f'font/{os.path.splitext(fonts[weight])[1][1:]}'}
+        for weight in sorted(preload_weights) if weight in fonts
+    ]
+    path = write_asset(ASSET_NAME, '\n'.join(rules).encode('utf-8'), 'css', meta={'preload': preload})
+    return {
+        'path': path,
+        'fonts': fonts,
+        'subsetted': font_subset is not None,
+        'missing': missing,
+    }
+
+
+def preload_fonts():
+    """Font files to preload for the current build, as dicts with path and type."""
+    return asset_meta(ASSET_NAME).get('preload', [])
+
+
+def _format(extension):
+    return {'ttf': 'truetype', 'otf': 'opentype'}.get(extension, extension)
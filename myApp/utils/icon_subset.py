@@ -0,0 +1,190 @@
+"""
+Self-hosted Font Awesome subset.
+
+Instead of the full Font Awesome stylesheet and webfonts from cdnjs, only the
+icons actually referenced by the templates and by the ``icon`` fields of
+content models are bundled. Each icon becomes a CSS mask with the SVG
+inlined as a data URI, so existing ``<i class="fas fa-heart">`` markup keeps
+working unchanged, icons inherit ``color`` and scale with ``font-size``, and
+the whole set is one small, content-hashed CSS file.
+
+The SVGs come from the Font Awesome Free package (npm
+``@fortawesome/fontawesome-free`` 6.x), pointed to by settings.FONTAWESOME_DIR.
+"""
+
+import json
+import os
+import re
+from urllib.parse import quote
+
+from django.apps import apps
+from django.conf import settings
+
+from .asset_manifest import asset_meta, write_asset
+
+
+ASSET_NAME = 'css/icons'
+
+# Models whose `icon` field holds Font Awesome classes
+ICON_MODELS = ('Stat', 'Program', 'Testimonial', 'ImpactStory', 'ContactInfo', 'SocialLink')
+
+STYLE_CLASSES = {
+    'fa': 'solid', 'fas': 'solid', 'fa-solid': 'solid',
+    'far': 'regular', 'fa-regular': 'regular',
+    'fab': 'brands', 'fa-brands': 'brands',
+}
+
+# Modifier classes that are not icons; emitted only when used
+MODIFIERS = {
+    'fa-fw': 'width:1.25em!important',
+    'fa-xs': 'font-size:.75em',
+    'fa-sm': 'font-size:.875em',
+    'fa-lg': 'font-size:1.25em;vertical-align:-.2em',
+    'fa-xl': 'font-size:1.5em',
+    'fa-2x': 'font-size:2em',
+    'fa-3x': 'font-size:3em',
+    'fa-4x': 'font-size:4em',
+    'fa-5x': 'font-size:5em',
+    'fa-spin': 'animation:fa-spin 2s linear infinite',
+}
+
+CLASS_ATTR_RE = re.compile(r'class\s*=\s*"([^"]*)"|class\s*=\s*\'([^\']*)\'')
+VIEWBOX_RE = re.compile(r'viewBox="0 0 (\d+) (\d+)"')
+TEMPLATES_DIR = os.path.join(settings.BASE_DIR, 'myApp', 'templates')
+
+
+def parse_icon_classes(value):
+    """
+    Icons referenced by a class string, as (style, name) pairs, plus modifiers.
+
+        parse_icon_classes('fab fa-facebook text-xl') -> ({('brands', 'facebook')}, set())
+    """
+    classes = value.split()
+    style = next((STYLE_CLASSES[c] for c in classes if c in STYLE_CLASSES), None)
+    icons, modifiers = set(), set()
+    for cls in classes:
+        if cls in MODIFIERS:
+            modifiers.add(cls)
+        elif cls.startswith('fa-') and cls not in STYLE_CLASSES and style:
+            icons.add((style, cls[3:]))
+    return icons, modifiers
+
+
+def icons_from_templates():
+    icons, modifiers = set(), set()
+    for root, _dirs, files in os.walk(TEMPLATES_DIR):
+        for filename in files:
+            if not filename.endswith('.html'):
+                continue
+            with open(os.path.join(root, filename), encoding='utf-8') as f:
+                source = f.read()
+            for match in CLASS_ATTR_RE.finditer(source):
+                found, mods = parse_icon_classes(match.group(1) or match.group(2) or '')
+                icons |= found
+                modifiers |= mods
+    return icons, modifiers
+
+
+def icons_from_db():
+    icons = set()
+    for name in ICON_MODELS:
+        model = apps.get_model('myApp', name)
+        for value in model.objects.exclude(icon='').values_list('icon', flat=True).distinct():
+            icons |= parse_icon_classes(value)[0]
+    return icons
+
+
+def built_icons():
+    """Icons in the current build, as a set of (style, name) pairs, and modifiers."""
+    meta = asset_meta(ASSET_NAME)
+    return {tuple(icon) for icon in meta.get('icons', [])}, set(meta.get('modifiers', []))
+
+
+def _aliases():
+    # Font Awesome 6 renamed many v5 icons (sync-alt -> arrows-rotate, ...);
+    # the package metadata maps the old names to the new SVG files.
+    path = os.path.join(settings.FONTAWESOME_DIR, 'metadata', 'icons.json')
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        metadata = json.load(f)
+    aliases = {}
+    for name, data in metadata.items():
+        for alias in (data.get('aliases') or {}).get('names', []):
+            aliases[alias] = name
+    return aliases
+
+
+def _load_svg(style, name, aliases):
+    svg_dir = os.path.join(settings.FONTAWESOME_DIR, 'svgs', style)
+    for candidate in (name, aliases.get(name)):
+        if candidate and os.path.exists(os.path.join(svg_dir, f'{candidate}.svg')):
+            with open(os.path.join(svg_dir, f'{candidate}.svg'), encoding='utf-8') as f:
+                return f.read()
+    return None
+
+
+def _data_uri(svg):
+    svg = re.sub(r'<!--.*?-->', '', svg, flags=re.S).strip()
+    return 'data:image/svg+xml,' + quote(svg, safe=' =:/<>')
+
+
+def build_icon_css(icons, modifiers=()):
+    """
+    Write the icon subset CSS for the given icons into STATIC_ROOT.
+
+    Returns:
+        dict with path, icons (written) and missing (not found in the package)
+    """
+    if not os.path.isdir(os.path.join(settings.FONTAWESOME_DIR, 'svgs')):
+        raise Exception(f"Font Awesome SVGs not found in {settings.FONTAWESOME_DIR}")
+
+    aliases = _aliases()
+    selectors = ','.join(f'.{c}' for c in STYLE_CLASSES)
+    rules = [
+        f'{selectors}{{display:inline-block;height:1em;width:1em;vertical-align:-.125em;'
+        'font-style:normal;line-height:1}',
+        f'{",".join(f".{c}::before" for c in STYLE_CLASSES)}{{content:"";display:block;'
+        'width:100%;height:100%;background-color:currentColor;'
+        '-webkit-mask:var(--fa-icon) no-repeat center/contain;'
+        'mask:var(--fa-icon) no-repeat center/contain}',
+    ]
+    written, missing = [], []
+    for style, name in sorted(icons):
+        svg = _load_svg(style, name, aliases)
+        if svg is None:
+            missing.append((style, name))
+            continue
+        match = VIEWBOX_RE.search(svg)
+        width = round(int(match.group(1)) / int(match.group(2)), 4) if match else 1
+        style_selectors = ','.join(
+            f'.{cls}.fa-{name}' for cls, cls_style in STYLE_CLASSES.items() if cls_style == style
+        )
+        rules.append(f'{style_selectors}{{width:{width}em;--fa-icon:url("{_data_uri(svg)}")}}')
+        written.append([style, name])
+
+    modifiers = sorted(set(modifiers))
+    for modifier in modifiers:
+        rules.append(f'.{modifier}{{{MODIFIERS[modifier]}}}')
+    if 'fa-spin' in modifiers:
+        rules.append('@keyframes fa-spin{to{transform:rotate(360deg)}}')
+
+    path = write_asset(
+        ASSET_NAME, '\n'.join(rules).encode('utf-8'), 'css',
+        meta={'icons': written, 'missing': [list(icon) for icon in missing], 'modifiers': modifiers},
+    )
+    return {'path': path, 'icons': written, 'missing': missing}
+
+
+def ensure_icons(icons):
+    """
+    Incremental rebuild: add icons to the existing build if any are new.
+
+    Called when content is saved from the dashboard; a no-op when the icon is
+    already bundled or no build exists yet (run `manage.py build_icons`).
+    """
+    current, modifiers = built_icons()
+    known = current | {tuple(icon) for icon in asset_meta(ASSET_NAME).get('missing', [])}
+    if not current or set(icons) <= known:
+        return None
+    return build_icon_css(known | set(icons), modifiers)
@@ -0,0 +1,154 @@
+"""
+Responsive image variants for local MediaAssets.
+
+Each local image gets resized copies at the standard srcset widths in WebP
+(and AVIF when Pillow can encode it), stored under MEDIA_ROOT/variants/ and
+recorded in ``MediaAsset.variants``. Cloudinary assets need no files: their
+variants are Cloudinary URL transformations.
+
+Uploads get their variants on a background thread
+(build_variants_in_background); until they exist {% media_img %} serves the
+original. `manage.py build_image_variants` fills in any that failed.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, connections
+from PIL import Image, ImageOps
+
+try:
+    import pillow_avif  # noqa: F401 - registers the AVIF plugin on older Pillow
+except ImportError:
+    pass
+
+
+logger = logging.getLogger(__name__)
+# Variants of new uploads are encoded here, off the request thread
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-variants')
+
+VARIANT_WIDTHS = (320, 640, 960, 1280, 1920)
+VARIANT_QUALITY = {'avif': 55, 'webp': 80}
+VARIANTS_DIR = 'variants'
+
+MIME_TYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+}
+
+
+def variant_formats():
+    """Modern formats this Pillow build can encode, best first."""
+    Image.init()
+    return [fmt for fmt in ('avif', 'webp') if fmt.upper() in Image.SAVE]
+
+
+def variant_widths(width):
+    """srcset widths for an image of the given width (never upscaled)."""
+    return sorted({w for w in VARIANT_WIDTHS if w < width} | {width})
+
+
+def prepare_image(img):
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'P') else 'RGB')
+    return img
+
+
+def build_variants(asset):
+    """
+    Write resized WebP/AVIF copies of a local MediaAsset.
+
+    Args:
+        asset: MediaAsset with a local image_file
+
+    Returns:
+        dict of format -> {width (str): path relative to MEDIA_ROOT}
+    """
+    if asset.storage_type != 'local' or not asset.image_file:
+        return {}
+    written = []
+    try:
+        stem, ext = os.path.splitext(asset.image_file.name)
+        directory = os.path.join(VARIANTS_DIR, os.path.dirname(stem))
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, directory), exist_ok=True)
+
+        with Image.open(asset.image_file.path) as source:
+            img = prepare_image(source)
+            width, height = img.size
+            variants = {}
+            for fmt in variant_formats():
+                if fmt == ext[1:].lower():
+                    # The original already serves this format at full width
+                    widths = [w for w in variant_widths(width) if w < width]
+                else:
+                    widths = variant_widths(width)
+                variants[fmt] = {}
+                for w in widths:
+                    path = os.path.join(directory, f'{os.path.basename(stem)}-{w}.{fmt}')
+                    resized = img if w == width else img.resize(
+                        (w, max(1, round(height * w / width))), Image.LANCZOS
+                    )
+                    written.append(os.path.join(settings.MEDIA_ROOT, path))
+                    resized.save(written[-1], format=fmt.upper(), quality=VARIANT_QUALITY[fmt])
+                    variants[fmt][str(w)] = path
+        return variants
+    except Exception as e:
+        # No half-built set is left behind
+        for path in written:
+            if os.path.exists(path):
+                os.remove(path)
+        raise Exception(f"Error building image variants: {str(e)}")
+
+
+def delete_variants(asset):
+    """Remove the variant files of a MediaAsset."""
+    for paths in (asset.variants or {}).values():
+        for path in paths.values():
+            full_path = os.path.join(settings.MEDIA_ROOT, path)
+            if os.path.exists(full_path):
+                os.remove(full_path)
+
+
+def build_and_store_variants(asset):
+    """
+    Build an asset's variants and save them; returns False if none were
+    stored, in which case pages keep serving the original.
+    """
+    try:
+        asset.variants = build_variants(asset)
+    except Exception as e:
+        logger.warning('Variants of %s were not built: %s', asset.image_file.name, e)
+        return False
+    try:
+        asset.save(update_fields=['variants'])
+    except DatabaseError:
+        # Deleted while its variants were being built
+        delete_variants(asset)
+        return False
+    return True
+
+
+def _build_in_thread(asset_id):
+    try:
+        asset = apps.get_model('myApp', 'MediaAsset').objects.filter(pk=asset_id).first()
+        if asset is not None:
+            build_and_store_variants(asset)
+    finally:
+        connections.close_all()
+
+
+def build_variants_in_background(asset):
+    """Build an uploaded asset's variants on a worker thread; returns a Future."""
+    return _executor.submit(_build_in_thread, asset.pk)
+
+
+def cloudinary_variant_url(url, fmt, width):
+    return url.replace('/upload/', f'/upload/f_{fmt},q_auto,w_{width}/', 1)
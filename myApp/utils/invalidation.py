@@ -0,0 +1,75 @@
+"""
+Cross-process content invalidation.
+
+The current content version lives in a single ContentVersion row. Any
+process that publishes content (or edits it, while public pages still read
+the live database) bumps it; every process re-reads it at most
+once per CONTENT_VERSION_POLL_INTERVAL seconds. Content and page cache keys
+are versioned with it, so a bump makes every replica miss on its next check,
+and the local (in-process) cache tier is dropped at the same moment.
+"""
+
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from ..models import ContentVersion
+
+
+_state = {'version': None, 'next_check': 0.0}
+_state_lock = threading.Lock()
+
+
+def _read_version():
+    version = (
+        ContentVersion.objects.using('default')
+        .filter(pk=1).values_list('version', flat=True).first()
+    )
+    return version or 1
+
+
+def _drop_local_cache():
+    clear_local = getattr(cache, 'clear_local', None)
+    if clear_local:
+        clear_local()
+
+
+def current_content_version():
+    """Content version as last seen by this process (polled, not queried per call)."""
+    now = time.monotonic()
+    if now < _state['next_check'] and _state['version'] is not None:
+        return _state['version']
+    with _state_lock:
+        if now >= _state['next_check'] or _state['version'] is None:
+            version = _read_version()
+            if _state['version'] is not None and version != _state['version']:
+                _drop_local_cache()
+            _state['version'] = version
+            _state['next_check'] = now + settings.CONTENT_VERSION_POLL_INTERVAL
+        return _state['version']
+
+
+async def acurrent_content_version():
+    """Async current_content_version(); between polls it never leaves the event loop."""
+    if time.monotonic() < _state['next_check'] and _state['version'] is not None:
+        return _state['version']
+    return await sync_to_async(current_content_version)()
+
+
+def bump_content_version():
+    """Advance the content version once the current transaction commits."""
+    transaction.on_commit(_bump, using='default')
+
+
+def _bump():
+    updated = ContentVersion.objects.using('default').filter(pk=1).update(version=F('version') + 1)
+    if not updated:
+        ContentVersion.objects.using('default').get_or_create(pk=1, defaults={'version': 2})
+    with _state_lock:
+        # See our own edit immediately rather than after the next poll
+        _state['next_check'] = 0.0
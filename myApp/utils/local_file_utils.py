@@ -1,3 +1,4 @@
+import logging
 import os
 from PIL import Image
 from io import BytesIO
@@ -6,6 +7,11 @@ from django.core.files.base import ContentFile
 from django.conf import settings
 import sys
 
+from . import metrics
+from .image_placeholders import placeholder_from_file
+
+logger = logging.getLogger(__name__)
+
 # Maximum file size (10MB)
 MAX_BYTES = 10 * 1024 * 1024
 TARGET_BYTES = int(MAX_BYTES * 0.93)  # 9.3MB target after compression
@@ -36,6 +42,7 @@ def smart_compress_image(image_file, target_bytes=TARGET_BYTES, max_quality=85,
         # If image is already small enough, return as-is
         output = BytesIO()
         img.save(output, format=original_format, quality=max_quality, optimize=True)
+        metrics.inc('image_compression_passes_total', function='smart_compress_image')
         if len(output.getvalue()) <= target_bytes:
             output.seek(0)
             return output, original_format
@@ -52,6 +59,7 @@ def smart_compress_image(image_file, target_bytes=TARGET_BYTES, max_quality=85,
             
             try:
                 img.save(output, format=original_format, quality=mid_quality, optimize=True)
+                metrics.inc('image_compression_passes_total', function='smart_compress_image')
                 size = len(output.getvalue())
                 
                 if size <= target_bytes:
@@ -69,6 +77,7 @@ def smart_compress_image(image_file, target_bytes=TARGET_BYTES, max_quality=85,
         # If we couldn't compress enough, return minimum quality
         output = BytesIO()
         img.save(output, format=original_format, quality=min_quality, optimize=True)
+        metrics.inc('image_compression_passes_total', function='smart_compress_image')
         return output, original_format
         
     except Exception as e:
@@ -84,7 +93,7 @@ def process_local_image(image_file, folder='iriseup'):
         folder: Optional folder name for organization
     
     Returns:
-        dict with image_file, width, height, format, file_size
+        dict with image_file, width, height, format, file_size, placeholder, dominant_color
     """
     try:
         # Check file size
@@ -108,6 +117,15 @@ def process_local_image(image_file, folder='iriseup'):
         width, height = img.size
         image_file.seek(0)
         
+        # Inline placeholder and dominant color shown while the image loads;
+        # an image Pillow can size but not decode fully is stored without one
+        try:
+            placeholder = placeholder_from_file(image_file)
+        except Exception as e:
+            logger.warning('No placeholder for %s: %s', image_file.name, e)
+            placeholder = {'placeholder': '', 'dominant_color': ''}
+            image_file.seek(0)
+        
         # Get final file size
         if hasattr(image_file, 'size'):
             final_size = image_file.size
@@ -122,6 +140,8 @@ def process_local_image(image_file, folder='iriseup'):
             'height': height,
             'format': format_type,
             'file_size': final_size,
+            'placeholder': placeholder['placeholder'],
+            'dominant_color': placeholder['dominant_color'],
         }
         
     except Exception as e:
@@ -138,7 +158,8 @@ def delete_local_image(image_path):
     try:
         full_path = os.path.join(settings.MEDIA_ROOT, image_path)
         if os.path.exists(full_path):
-            os.remove(full_path)
+            with metrics.timer('storage_call_duration_seconds', backend='local', operation='delete'):
+                os.remove(full_path)
             return True
         return False
     except Exception as e:
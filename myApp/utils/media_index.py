@@ -0,0 +1,173 @@
+"""
+Path -> MediaAsset lookups for templates.
+
+Templates reference images by path (``/media/uploads/2025/12/05/01.webp``).
+Each local path, Cloudinary URL or mirrored remote URL resolves to the
+metadata the ``{% media_img %}`` tag needs (intrinsic size, srcset
+candidates per format). Lookups go through the cache one path at a time,
+keyed by content version, and are kept in process memory between versions,
+so rendering a cached page costs no MediaAsset query and no request ever
+loads the whole media library.
+"""
+
+import hashlib
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Q
+
+from .cache_utils import aget_or_rebuild, get_or_rebuild
+from .image_variants import MIME_TYPES, VARIANT_WIDTHS, cloudinary_variant_url, variant_widths
+from .invalidation import acurrent_content_version, current_content_version
+
+
+ENTRY_CACHE_KEY = 'media:path:{}'
+ENTRY_TIMEOUT = 3600
+
+_memo = {'version': None, 'entries': {}}  # entries: path -> entry or None
+
+
+def asset_entry(asset):
+    """
+    Template metadata for a MediaAsset.
+
+    Returns:
+        dict with src, width, height, format, placeholder, dominant_color,
+        sources (mime type -> list of [width, url], narrowest first) and
+        fallback (the [width, url] candidates in the original's own format,
+        for the <img> that browsers without AVIF/WebP load)
+    """
+    local = asset.storage_type == 'local' and asset.image_file
+    src = asset.image_file.url if local else asset.original_url
+    fmt = (os.path.splitext(asset.image_file.name)[1][1:] if local else asset.format).lower()
+    sources = {}
+
+    if local:
+        for variant_format, paths in (asset.variants or {}).items():
+            sources[variant_format] = [[int(w), default_storage.url(path)] for w, path in paths.items()]
+    elif src and '/upload/' in src and asset.width:
+        for variant_format in ('avif', 'webp'):
+            sources[variant_format] = [
+                [w, cloudinary_variant_url(src, variant_format, w)]
+                for w in VARIANT_WIDTHS if w < asset.width
+            ] + [[asset.width, cloudinary_variant_url(src, variant_format, asset.width)]]
+
+    # The original is the widest candidate of its own format
+    if fmt in sources and asset.width and all(w != asset.width for w, _url in sources[fmt]):
+        sources[fmt].append([asset.width, src])
+
+    if fmt in sources:
+        fallback = sources[fmt]
+    elif src and '/upload/' in src and asset.width and not local:
+        fallback = [[w, cloudinary_variant_url(src, fmt, w)] for w in variant_widths(asset.width)]
+    else:
+        fallback = [[asset.width, src]] if src and asset.width else []
+
+    return {
+        'src': src,
+        'width': asset.width,
+        'height': asset.height,
+        'format': fmt,
+        'placeholder': asset.placeholder,
+        'dominant_color': asset.dominant_color,
+        'sources': {
+            MIME_TYPES[f]: sorted(candidates)
+            for f, candidates in sources.items() if candidates and f in MIME_TYPES
+        },
+        'fallback': sorted(fallback),
+    }
+
+
+def picture_sources(entry):
+    """(mime type, candidates) in the order {% media_img %} emits its <source> elements."""
+    return sorted(entry['sources'].items())
+
+
+def srcset(candidates):
+    return ', '.join(f'{url} {w}w' for w, url in candidates)
+
+
+def _candidates(value):
+    """URLs a path may be stored under: as given, and under MEDIA_URL."""
+    urls = {value}
+    if '://' not in value:
+        urls.add(settings.MEDIA_URL + value.lstrip('/'))
+    names = {url[len(settings.MEDIA_URL):] for url in urls if url.startswith(settings.MEDIA_URL)}
+    return urls, names
+
+
+def find_media(value):
+    """Index entry for a media path or URL, looked up in the database; None if unknown."""
+    MediaAsset = apps.get_model('myApp', 'MediaAsset')
+    urls, names = _candidates(value)
+    # Always the live database: remote images mirrored on first request must
+    # show up without waiting for the next publish.
+    # Oldest first so the original upload wins over later duplicates; a
+    # local asset's original_url is the remote image it mirrors.
+    assets = (
+        MediaAsset.objects.using('default')
+        .filter(Q(storage_type='local', image_file__in=names) | Q(original_url__in=urls))
+        .order_by('created_at', 'id')
+    )
+    for asset in assets:
+        entry = asset_entry(asset)
+        if entry['src']:
+            return entry
+    return None
+
+
+def _memoized(version):
+    if _memo['version'] != version:
+        _memo['version'], _memo['entries'] = version, {}
+    return _memo['entries']
+
+
+def _entry_key(value):
+    # Hashed: paths and URLs may be longer than cache backends accept
+    return ENTRY_CACHE_KEY.format(hashlib.md5(value.encode('utf-8')).hexdigest())
+
+
+def _cached_entry(value):
+    version = current_content_version()
+    entries = _memoized(version)
+    if value not in entries:
+        entries[value] = get_or_rebuild(
+            _entry_key(value), lambda: find_media(value), timeout=ENTRY_TIMEOUT, version=version,
+        )
+    return entries[value]
+
+
+async def _acached_entry(value):
+    version = await acurrent_content_version()
+    entries = _memoized(version)
+    if value not in entries:
+        entries[value] = await aget_or_rebuild(
+            _entry_key(value), lambda: find_media(value), timeout=ENTRY_TIMEOUT, version=version,
+        )
+    return entries[value]
+
+
+def resolve_media(value):
+    """
+    Index entry for a MediaAsset, a media path or URL; None if unknown.
+
+        resolve_media('/media/uploads/2025/12/05/01.webp')
+        resolve_media('uploads/2025/12/05/01.webp')
+    """
+    if value is None or value == '':
+        return None
+    if not isinstance(value, str):
+        return asset_entry(value)
+    return _cached_entry(value)
+
+
+async def aresolve_media(value):
+    """Async resolve_media()."""
+    if value is None or value == '':
+        return None
+    if not isinstance(value, str):
+        return asset_entry(value)
+    return await _acached_entry(value)
+
@@ -0,0 +1,101 @@
+"""
+Accept-header negotiation for media images.
+
+When a browser advertises AVIF or WebP support, a request for
+``/media/uploads/.../Leadership.png`` is answered with a same-size AVIF/WebP
+sibling instead of the PNG, with ``Vary: Accept`` so shared caches keep the
+variants apart. Siblings are generated lazily on first request and cached on
+disk under MEDIA_ROOT/negotiated/; a sibling that would not be smaller than
+the original is never served.
+"""
+
+import os
+import threading
+
+from django.conf import settings
+from django.utils._os import safe_join
+from PIL import Image
+
+from .image_variants import MIME_TYPES, VARIANT_QUALITY, prepare_image, variant_formats
+
+
+NEGOTIATED_DIR = 'negotiated'
+
+# Originals worth converting; GIFs may be animated and are left alone
+NEGOTIABLE_EXTENSIONS = ('png', 'jpg', 'jpeg', 'webp')
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def is_negotiable(path):
+    return (
+        os.path.splitext(path)[1][1:].lower() in NEGOTIABLE_EXTENSIONS
+        and not path.startswith(NEGOTIATED_DIR + '/')
+    )
+
+
+def accepted_types(accept):
+    """Media types in an Accept header, excluding ones refused with q=0."""
+    types = set()
+    for item in accept.split(','):
+        media_type, *params = [part.strip() for part in item.split(';')]
+        if any(p.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000') for p in params):
+            continue
+        types.add(media_type.lower())
+    return types
+
+
+def negotiated_format(accept, path):
+    """Best format for this client, or None to serve the original."""
+    if not is_negotiable(path):
+        return None
+    original = os.path.splitext(path)[1][1:].lower()
+    accepted = accepted_types(accept)
+    for fmt in variant_formats():
+        if fmt == original:
+            return None
+        if MIME_TYPES[fmt] in accepted:
+            return fmt
+    return None
+
+
+def _lock(path):
+    with _locks_lock:
+        return _locks.setdefault(path, threading.Lock())
+
+
+def sibling(path, fmt):
+    """
+    Path (relative to MEDIA_ROOT) of the fmt sibling of a media file, creating
+    it if missing or older than the original. None when the original does not
+    exist or the sibling is not smaller.
+    """
+    original = safe_join(settings.MEDIA_ROOT, path)
+    relative = f'{NEGOTIATED_DIR}/{path}.{fmt}'
+    target = safe_join(settings.MEDIA_ROOT, relative)
+    try:
+        original_stat = os.stat(original)
+    except OSError:
+        return None
+
+    with _lock(relative):
+        try:
+            fresh = os.stat(target).st_mtime >= original_stat.st_mtime
+        except OSError:
+            fresh = False
+        if not fresh:
+            try:
+                _convert(original, target, fmt)
+            except Exception:
+                return None
+
+    return relative if os.path.getsize(target) < original_stat.st_size else None
+
+
+def _convert(original, target, fmt):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = f'{target}.tmp-{os.getpid()}-{threading.get_ident()}'
+    with Image.open(original) as source:
+        prepare_image(source).save(tmp_path, format=fmt.upper(), quality=VARIANT_QUALITY[fmt])
+    os.replace(tmp_path, target)
@@ -0,0 +1,339 @@
+"""
+Process-aggregated Prometheus metrics.
+
+Counters and histograms are kept in memory per process and written to
+settings.METRICS_DIR as ``<pid>.json`` at most every METRICS_FLUSH_INTERVAL
+seconds (and at exit). The /metrics view merges every process's snapshot
+and renders the Prometheus text exposition format, so whichever worker
+answers the scrape reports totals for the whole host.
+
+Snapshots of processes that have exited are folded into ``dead.json`` on
+the next scrape, keeping counters monotonic across worker restarts.
+
+Histograms also keep per-minute windows for the last WINDOW_MINUTES, which
+the dashboard's Performance page reads through collect_recent().
+
+prometheus_client is not a dependency; the text format is simple enough
+to produce directly.
+
+Metrics:
+    http_request_duration_seconds  Histogram by view and method
+    db_queries_total               SQL queries by view
+    db_query_seconds_total         SQL time by view
+    cache_events_total             get_or_rebuild events by key section
+    upload_bytes_total             Uploaded image bytes by storage type
+    image_compression_passes_total Encoder passes by compress function
+    storage_call_duration_seconds  Histogram by storage backend and operation
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, dead snapshots are kept as-is
+    fcntl = None
+
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEAD_FILE = 'dead.json'
+WINDOW_MINUTES = 60  # per-minute histograms kept for the dashboard's recent views
+
+METRICS = {
+    'http_request_duration_seconds': ('histogram', 'Request latency by view'),
+    'db_queries_total': ('counter', 'SQL queries executed by view'),
+    'db_query_seconds_total': ('counter', 'Time spent in SQL by view'),
+    'cache_events_total': ('counter', 'Stale-while-revalidate cache events by key section'),
+    'upload_bytes_total': ('counter', 'Bytes of uploaded images by storage type'),
+    'image_compression_passes_total': ('counter', 'Image encoder passes while compressing uploads'),
+    'storage_call_duration_seconds': ('histogram', 'Storage backend call latency'),
+}
+
+_values = {}  # (name, labels) -> float, or [bucket counts..., sum, count] for histograms
+_recent = {}  # (name, labels, minute) -> [bucket counts..., sum, count, max]
+_lock = threading.Lock()
+_last_flush = 0.0
+
+
+def _key(name, labels):
+    if name not in METRICS:
+        raise KeyError(f'Unknown metric {name!r}')
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _bucket(value):
+    for index, bound in enumerate(BUCKETS):
+        if value <= bound:
+            return index
+    return len(BUCKETS)  # +Inf, only counted in the total
+
+
+def inc(name, amount=1, **labels):
+    """Add amount to a counter."""
+    key = _key(name, labels)
+    with _lock:
+        _values[key] = _values.get(key, 0) + amount
+
+
+def observe(name, value, **labels):
+    """Record one observation in a histogram (and in the current minute's window)."""
+    key = _key(name, labels)
+    index = _bucket(value)
+    minute = int(time.time() // 60)
+    with _lock:
+        histogram = _values.get(key)
+        if histogram is None:
+            histogram = _values[key] = [0] * (len(BUCKETS) + 2)
+        window = _recent.get(key + (minute,))
+        if window is None:
+            window = _recent[key + (minute,)] = [0] * (len(BUCKETS) + 3)
+        if index < len(BUCKETS):
+            histogram[index] += 1
+            window[index] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+        window[-3] += value
+        window[-2] += 1
+        window[-1] = max(window[-1], value)
+
+
+@contextmanager
+def timer(name, **labels):
+    """Observe the duration of the block in a histogram."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def metrics_dir():
+    path = str(settings.METRICS_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _oldest_minute():
+    return int(time.time() // 60) - WINDOW_MINUTES
+
+
+def _snapshot():
+    oldest = _oldest_minute()
+    with _lock:
+        for key in [key for key in _recent if key[2] < oldest]:
+            del _recent[key]
+        return {
+            'values': [
+                [name, dict(labels), list(value) if isinstance(value, list) else value]
+                for (name, labels), value in _values.items()
+            ],
+            'recent': [
+                [name, dict(labels), minute, list(window)]
+                for (name, labels, minute), window in _recent.items()
+            ],
+        }
+
+
+def _write(path, snapshot):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(path + '.tmp', path)
+
+
+def flush(force=False):
+    """Write this process's snapshot if METRICS_FLUSH_INTERVAL has passed."""
+    global _last_flush
+    now = time.monotonic()
+    if not force and now - _last_flush < settings.METRICS_FLUSH_INTERVAL:
+        return
+    _last_flush = now
+    if not _values:
+        return
+    _write(os.path.join(metrics_dir(), f'{os.getpid()}.json'), _snapshot())
+
+
+def _flush_at_exit():
+    try:
+        flush(force=True)
+    except Exception:
+        pass
+
+
+atexit.register(_flush_at_exit)
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        snapshot = None
+    if not isinstance(snapshot, dict):
+        # Unreadable, or written before snapshots kept per-minute windows
+        return {'values': snapshot if isinstance(snapshot, list) else [], 'recent': []}
+    return snapshot
+
+
+def _merge(totals, recent, snapshot):
+    for name, labels, value in snapshot['values']:
+        key = (name, tuple(sorted(labels.items())))
+        current = totals.get(key)
+        if current is None:
+            totals[key] = list(value) if isinstance(value, list) else value
+        elif isinstance(value, list):
+            totals[key] = [a + b for a, b in zip(current, value)]
+        else:
+            totals[key] = current + value
+    oldest = _oldest_minute()
+    for name, labels, minute, window in snapshot['recent']:
+        if minute < oldest:
+            continue
+        key = (name, tuple(sorted(labels.items())), minute)
+        current = recent.get(key)
+        if current is None:
+            recent[key] = list(window)
+        else:
+            recent[key] = [a + b for a, b in zip(current[:-1], window[:-1])] + [max(current[-1], window[-1])]
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _fold_dead(directory):
+    """Merge snapshots of exited processes into dead.json."""
+    dead_path = os.path.join(directory, DEAD_FILE)
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        dead = [n for n in os.listdir(directory)
+                if n.endswith('.json') and n[:-5].isdigit() and not _alive(int(n[:-5]))]
+        if not dead:
+            return
+        totals, recent = {}, {}
+        _merge(totals, recent, _read(dead_path))
+        for name in dead:
+            _merge(totals, recent, _read(os.path.join(directory, name)))
+        _write(dead_path, {
+            'values': [[name, dict(labels), value] for (name, labels), value in totals.items()],
+            'recent': [[name, dict(labels), minute, window] for (name, labels, minute), window in recent.items()],
+        })
+        for name in dead:
+            os.remove(os.path.join(directory, name))
+
+
+def _load():
+    directory = metrics_dir()
+    if fcntl is not None:
+        _fold_dead(directory)
+    own = f'{os.getpid()}.json'
+    totals, recent = {}, {}
+    for name in os.listdir(directory):
+        # This process contributes its live values rather than its last flush
+        if name.endswith('.json') and name != own:
+            _merge(totals, recent, _read(os.path.join(directory, name)))
+    _merge(totals, recent, _snapshot())
+    return totals, recent
+
+
+def collect():
+    """
+    Totals across every process on this host.
+
+    Returns:
+        dict mapping (name, labels) to a counter value or a histogram list
+        ([per-bucket counts..., sum, count]); labels is a sorted tuple of pairs
+    """
+    return _load()[0]
+
+
+def collect_recent(name, minutes=WINDOW_MINUTES):
+    """
+    A histogram's observations over the last minutes, across every process.
+
+    Returns:
+        dict mapping labels (sorted tuple of pairs) to
+        [per-bucket counts..., sum, count, max]
+    """
+    oldest = int(time.time() // 60) - minutes
+    windows = {}
+    for (metric, labels, minute), window in _load()[1].items():
+        if metric != name or minute < oldest:
+            continue
+        current = windows.get(labels)
+        if current is None:
+            windows[labels] = list(window)
+        else:
+            windows[labels] = [a + b for a, b in zip(current[:-1], window[:-1])] + [max(current[-1], window[-1])]
+    return windows
+
+
+def quantile(histogram, q):
+    """
+    Estimate a quantile from per-bucket counts, interpolating within the
+    bucket like Prometheus' histogram_quantile.
+
+    Args:
+        histogram: [per-bucket counts..., sum, count] (a trailing max is ignored)
+        q: Quantile between 0 and 1
+    """
+    counts = histogram[:len(BUCKETS)]
+    total = histogram[len(BUCKETS) + 1]
+    if not total:
+        return 0.0
+    rank = q * total
+    cumulative = 0
+    lower = 0.0
+    for bound, count in zip(BUCKETS, counts):
+        if count and cumulative + count >= rank:
+            return lower + (bound - lower) * (rank - cumulative) / count
+        cumulative += count
+        lower = bound
+    return BUCKETS[-1]  # in the +Inf bucket
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Prometheus text exposition (format 0.0.4) of collect()."""
+    totals = collect()
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        series = sorted((labels, value) for (n, labels), value in totals.items() if n == name)
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in series:
+            if kind == 'counter':
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS, value):
+                cumulative += bucket
+                lines.append(f'{name}_bucket{_labels(labels + (("le", str(bound)),))} {cumulative}')
+            lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {value[-1]}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(value[-2])}')
+            lines.append(f'{name}_count{_labels(labels)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
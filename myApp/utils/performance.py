@@ -0,0 +1,166 @@
+"""
+Figures for the dashboard's Performance page.
+
+Everything here is read from data the app already keeps: the metrics
+snapshots (utils/metrics.py) for cache events and recent request latency,
+the in-process rebuild and mirror locks for work in flight, and a media
+summary built once per content version (every MediaAsset save bumps it),
+so opening the page costs no queries in the steady state.
+"""
+
+from django.apps import apps
+
+from . import metrics
+from .cache_utils import get_or_rebuild, rebuilds_in_progress
+from .invalidation import current_content_version
+from .remote_mirror import mirrors_in_progress
+
+
+SUMMARY_CACHE_KEY = 'perf:media-summary'
+SUMMARY_TIMEOUT = 3600
+LARGEST_LIMIT = 10
+
+_memo = (None, None)  # (content version, summary)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile (0-100) of raw samples, 0.0 for none; used by the benchmarks."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def cache_hit_ratios():
+    """
+    get_or_rebuild results per cache key section, across processes.
+
+    Returns:
+        list of dicts with section, hits, stale, misses, rebuilds, errors and
+        hit_ratio (percent, stale serves count as hits), busiest first
+    """
+    sections = {}
+    for (name, labels), value in metrics.collect().items():
+        if name != 'cache_events_total':
+            continue
+        labels = dict(labels)
+        counts = sections.setdefault(labels['section'], {})
+        counts[labels['event']] = counts.get(labels['event'], 0) + value
+
+    rows = []
+    for section, counts in sections.items():
+        fresh = counts.get('fresh_hits', 0)
+        stale = counts.get('stale_serves', 0)
+        misses = counts.get('misses', 0)
+        lookups = fresh + stale + misses
+        rows.append({
+            'section': section,
+            'hits': fresh,
+            'stale': stale,
+            'misses': misses,
+            'rebuilds': counts.get('rebuilds', 0),
+            'errors': counts.get('rebuild_errors', 0) + counts.get('wait_timeouts', 0),
+            'hit_ratio': round((fresh + stale) * 100 / lookups, 1) if lookups else None,
+        })
+    rows.sort(key=lambda row: row['hits'] + row['stale'] + row['misses'], reverse=True)
+    return rows
+
+
+def slowest_views(minutes=metrics.WINDOW_MINUTES, limit=10):
+    """
+    Views by p95 latency over the last minutes, across processes.
+
+    Returns:
+        list of dicts with view, requests, avg_ms, p95_ms and max_ms
+    """
+    views = {}
+    for labels, window in metrics.collect_recent('http_request_duration_seconds', minutes).items():
+        view = dict(labels)['view']
+        current = views.get(view)
+        if current is None:
+            views[view] = list(window)
+        else:
+            views[view] = [a + b for a, b in zip(current[:-1], window[:-1])] + [max(current[-1], window[-1])]
+
+    rows = []
+    for view, window in views.items():
+        requests = window[-2]
+        rows.append({
+            'view': view,
+            'requests': requests,
+            'avg_ms': round(window[-3] * 1000 / requests, 1) if requests else 0.0,
+            # Interpolating within a bucket can overshoot the slowest request
+            'p95_ms': round(min(metrics.quantile(window, 0.95), window[-1]) * 1000, 1),
+            'max_ms': round(window[-1] * 1000, 1),
+        })
+    rows.sort(key=lambda row: row['p95_ms'], reverse=True)
+    return rows[:limit]
+
+
+def build_media_summary():
+    MediaAsset = apps.get_model('myApp', 'MediaAsset')
+    folders = {}
+    lacking = []
+    without_placeholder = 0
+    for asset in MediaAsset.objects.using('default').values(
+        'id', 'title', 'folder', 'storage_type', 'file_size', 'width', 'height',
+        'image_file', 'variants', 'placeholder',
+    ).order_by():
+        key = (asset['folder'], asset['storage_type'])
+        folder = folders.setdefault(key, {
+            'folder': asset['folder'], 'storage_type': asset['storage_type'], 'images': 0, 'bytes': 0,
+        })
+        folder['images'] += 1
+        folder['bytes'] += asset['file_size'] or 0
+        # Cloudinary derives its variants on the fly
+        if asset['storage_type'] == 'local' and not asset['variants']:
+            lacking.append(asset)
+        if not asset['placeholder']:
+            without_placeholder += 1
+
+    lacking.sort(key=lambda asset: asset['file_size'] or 0, reverse=True)
+    return {
+        'folders': sorted(folders.values(), key=lambda folder: folder['bytes'], reverse=True),
+        'total_bytes': sum(folder['bytes'] for folder in folders.values()),
+        'largest_without_variants': [
+            {key: asset[key] for key in ('id', 'title', 'folder', 'file_size', 'width', 'height', 'image_file')}
+            for asset in lacking[:LARGEST_LIMIT]
+        ],
+        'without_variants': len(lacking),
+        'without_placeholder': without_placeholder,
+    }
+
+
+def media_summary():
+    """Media totals and backlog for the current content version."""
+    global _memo
+    version = current_content_version()
+    memo_version, summary = _memo
+    if memo_version != version:
+        summary = get_or_rebuild(SUMMARY_CACHE_KEY, build_media_summary, timeout=SUMMARY_TIMEOUT, version=version)
+        _memo = (version, summary)
+    return summary
+
+
+def pending_jobs(summary):
+    """
+    Background work that has not finished yet.
+
+    The app has no job queue: its background work is single-flight cache
+    rebuilds and remote image mirroring (in flight in this process), plus the
+    variant and placeholder backlog the management commands work through.
+
+    Returns:
+        list of dicts with job, pending and detail
+    """
+    rebuilds = rebuilds_in_progress()
+    mirrors = mirrors_in_progress()
+    return [
+        {'job': 'Cache rebuilds (this process)', 'pending': len(rebuilds), 'detail': ', '.join(rebuilds)},
+        {'job': 'Remote image mirroring (this process)', 'pending': len(mirrors), 'detail': ', '.join(mirrors)},
+        {'job': 'Image variants', 'pending': summary['without_variants'],
+         'detail': 'python manage.py build_image_variants'},
+        {'job': 'Image placeholders', 'pending': summary['without_placeholder'],
+         'detail': 'python manage.py build_placeholders'},
+    ]
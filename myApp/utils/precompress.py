@@ -0,0 +1,68 @@
+"""
+Precompressed page encodings.
+
+Cached pages are stored with gzip (and brotli, when the ``brotli`` package is
+installed) encodings next to the identity body, so compression happens once
+per page and content version instead of on every request. The response
+carries the best encoding the client accepts, with ``Vary: Accept-Encoding``.
+"""
+
+import gzip
+
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+# Below this, compression overhead outweighs the savings
+MIN_SIZE = 200
+
+
+def encode_content(content):
+    """
+    Compressed encodings of a body, keyed by Content-Encoding.
+
+    Only encodings smaller than the identity body are kept.
+    """
+    if len(content) < MIN_SIZE:
+        return {}
+    encodings = {'gzip': gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        encodings['br'] = brotli.compress(content, quality=BROTLI_QUALITY)
+    return {name: data for name, data in encodings.items() if len(data) < len(content)}
+
+
+def accepted_encodings(header):
+    """Codings in an Accept-Encoding header, excluding ones refused with q=0."""
+    accepted = set()
+    for item in header.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if any(p.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000') for p in params):
+            continue
+        if coding:
+            accepted.add(coding.lower())
+    return accepted
+
+
+def choose_encoding(request, encodings):
+    accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    for name in ('br', 'gzip'):
+        if name in encodings and (name in accepted or '*' in accepted):
+            return name
+    return None
+
+
+def apply_encoding(request, response, encodings):
+    """Swap in the best stored encoding for this client."""
+    if encodings:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    name = choose_encoding(request, encodings)
+    if name:
+        response.content = encodings[name]
+        response['Content-Encoding'] = name
+    return response
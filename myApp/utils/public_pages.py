@@ -0,0 +1,36 @@
+"""
+The public pages: named, argument-free routes decorated with @preload_hints
+(utils/early_hints.py), i.e. the pages anonymous visitors browse.
+
+Used to precompute critical CSS and to load-test every page, and by the lean
+middleware path (myApp.middleware.SkipOnPublicPages), which serves these
+paths without session, auth or messages work.
+"""
+
+from functools import lru_cache
+
+from django.urls import get_resolver
+
+
+def public_pages(resolver=None):
+    """Paths of the public pages, in URLconf order."""
+    for pattern in (resolver or get_resolver()).url_patterns:
+        callback = getattr(pattern, 'callback', None)
+        if (
+            callback is not None
+            and pattern.name
+            and getattr(callback, 'preload_hints', False)
+            and not pattern.pattern.converters
+        ):
+            yield '/' + str(pattern.pattern)
+
+
+@lru_cache(maxsize=None)
+def _paths(resolver):
+    return frozenset(public_pages(resolver))
+
+
+def is_public_page(path):
+    """True if path (request.path_info) is one of the public pages."""
+    # get_resolver() is itself cached and replaced when the URLconf changes
+    return path in _paths(get_resolver())
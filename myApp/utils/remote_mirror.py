@@ -0,0 +1,301 @@
+"""
+Local mirrors of remote images (avatars, hero backgrounds, story images).
+
+Content fields such as ``Testimonial.avatar_url`` hold arbitrary third-party
+URLs, so every visitor paid that host's DNS/TLS handshake and latency. Remote
+images are fetched once — when the content is saved, or lazily on the first
+request through the signed ``/media-mirror/<token>/`` proxy — and stored as a
+local MediaAsset under MEDIA_ROOT/mirror/. From then on they go through the
+same pipeline as uploads (placeholder, srcset variants, AVIF/WebP negotiation)
+and are served from our own origin.
+
+Fetching goes through settings.REMOTE_IMAGE_FETCHER, a callable taking a URL
+and returning the image bytes; ``standin_fetcher`` works offline. The default
+fetcher only connects to public addresses, since the URLs come from content
+editors and the proxy fetches them on behalf of anonymous visitors. A failed
+fetch is not retried for FAILURE_BACKOFF seconds.
+"""
+
+import hashlib
+import http.client
+import ipaddress
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+from urllib.request import HTTPHandler, HTTPSHandler, ProxyHandler, Request, build_opener
+
+from django.apps import apps
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import connections
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils.module_loading import import_string
+from PIL import Image
+
+from . import metrics
+from .image_variants import build_variants
+from .local_file_utils import process_local_image
+from .media_index import resolve_media
+
+
+# Content fields that may hold remote image URLs
+REMOTE_IMAGE_FIELDS = {
+    'SEO': ('og_image',),
+    'Hero': ('background_image_url',),
+    'About': ('image_url',),
+    'FeaturedStory': ('image_url',),
+    'Retreat': ('background_image_url',),
+    'Testimonial': ('avatar_url',),
+    'ImpactStory': ('image_url',),
+    'Event': ('image_url',),
+}
+
+MIRROR_DIR = 'mirror'
+MIRROR_FOLDER = 'mirror'
+SIGNING_SALT = 'myApp.remote_mirror'
+# Our own image CDN; already fast and cache-friendly
+SKIP_HOSTS = ('res.cloudinary.com',)
+MAX_BYTES = 10 * 1024 * 1024
+FETCH_TIMEOUT = 10
+FAILURE_BACKOFF = 300  # seconds before a failed URL is fetched again
+FAILURE_CACHE_KEY = 'mirror-failed:{}'
+
+logger = logging.getLogger(__name__)
+
+# url -> [lock, callers holding or waiting for it]; removed when the last one
+# finishes, so a long-running worker does not keep a lock per URL ever seen
+_locks = {}
+_locks_lock = threading.Lock()
+# Mirrors requested by content saves run here, off the request thread
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-mirror')
+
+
+def is_remote(url):
+    if not isinstance(url, str) or not url.startswith(('http://', 'https://')):
+        return False
+    host = url.split('/', 3)[2].split(':')[0].lower()
+    return host not in SKIP_HOSTS
+
+
+def is_public_address(address):
+    """False for private, loopback, link-local, reserved and multicast addresses."""
+    ip = ipaddress.ip_address(address.split('%', 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def check_public_host(host, port=None):
+    """Raise unless every address the host resolves to is public."""
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise Exception(f"Cannot resolve {host}: {e}")
+    for *_rest, sockaddr in infos:
+        if not is_public_address(sockaddr[0]):
+            raise Exception(f"Refusing to fetch from non-public address {sockaddr[0]} ({host})")
+
+
+def _public_connection(address, *args, **kwargs):
+    # Checked again on the connected socket: DNS may answer differently than
+    # it did for check_public_host() (rebinding), and redirects reach here too
+    sock = socket.create_connection(address, *args, **kwargs)
+    peer = sock.getpeername()[0]
+    if not is_public_address(peer):
+        sock.close()
+        raise Exception(f"Refusing to fetch from non-public address {peer} ({address[0]})")
+    return sock
+
+
+class _PublicHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _public_connection
+
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _public_connection
+
+
+class _PublicHTTPHandler(HTTPHandler):
+    def do_open(self, http_class, req, **kwargs):
+        return super().do_open(_PublicHTTPConnection, req, **kwargs)
+
+
+class _PublicHTTPSHandler(HTTPSHandler):
+    def do_open(self, http_class, req, **kwargs):
+        return super().do_open(_PublicHTTPSConnection, req, **kwargs)
+
+
+# No proxies: the address checks apply to the connection actually made
+_public_opener = build_opener(ProxyHandler({}), _PublicHTTPHandler, _PublicHTTPSHandler)
+
+
+def urlopen_fetcher(url):
+    """Fetch image bytes over HTTP(S) from a public address."""
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise Exception(f"Not an http(s) URL: {url}")
+    check_public_host(parts.hostname, parts.port)
+    request = Request(url, headers={'User-Agent': 'iRiseUp-image-mirror/1.0'})
+    with _public_opener.open(request, timeout=FETCH_TIMEOUT) as response:
+        data = response.read(MAX_BYTES + 1)
+    if len(data) > MAX_BYTES:
+        raise Exception(f"Remote image larger than {MAX_BYTES // (1024 * 1024)}MB")
+    return data
+
+
+def standin_fetcher(url):
+    """
+    Offline stand-in: a flat image in a color derived from the URL, so pages
+    and the mirror pipeline can be exercised without network access.
+    """
+    digest = hashlib.sha256(url.encode('utf-8')).digest()
+    output = BytesIO()
+    Image.new('RGB', (300, 300), tuple(digest[:3])).save(output, format='PNG')
+    return output.getvalue()
+
+
+def get_fetcher():
+    return import_string(settings.REMOTE_IMAGE_FETCHER)
+
+
+def mirrored_asset(url):
+    MediaAsset = apps.get_model('myApp', 'MediaAsset')
+    return (
+        MediaAsset.objects.using('default')
+        .filter(storage_type='local', folder=MIRROR_FOLDER, original_url=url)
+        .exclude(image_file='')
+        .order_by('id')
+        .first()
+    )
+
+
+def mirrors_in_progress():
+    """Remote URLs this process is mirroring right now."""
+    with _locks_lock:
+        return sorted(url for url, (lock, _callers) in _locks.items() if lock.locked())
+
+
+def mirror_remote_image(url, fetcher=None):
+    """
+    Mirror a remote image as a local MediaAsset (no-op if already mirrored).
+
+    Args:
+        url: Remote image URL
+        fetcher: Callable url -> bytes (default: settings.REMOTE_IMAGE_FETCHER)
+
+    Returns:
+        MediaAsset
+    """
+    with _locks_lock:
+        entry = _locks.setdefault(url, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            return _mirror(url, fetcher)
+    finally:
+        with _locks_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _locks[url]
+
+
+def _mirror(url, fetcher):
+    """mirror_remote_image() under the URL's lock."""
+    asset = mirrored_asset(url)
+    if asset is not None:
+        return asset
+    failure_key = FAILURE_CACHE_KEY.format(hashlib.sha256(url.encode('utf-8')).hexdigest())
+    failure = cache.get(failure_key)
+    if failure is not None:
+        raise Exception(f"Error mirroring remote image {url}: {failure} (not retried yet)")
+    try:
+        data = (fetcher or get_fetcher())(url)
+        with Image.open(BytesIO(data)) as img:
+            extension = {'JPEG': 'jpg'}.get(img.format, (img.format or 'jpg').lower())
+
+        name = f'{hashlib.sha256(url.encode("utf-8")).hexdigest()[:20]}.{extension}'
+        processed = process_local_image(ContentFile(data, name=name))
+        processed['image_file'].seek(0)
+        # Saved under mirror/ directly rather than the dated uploads/ path
+        with metrics.timer('storage_call_duration_seconds', backend='local', operation='save'):
+            stored_name = default_storage.save(
+                f'{MIRROR_DIR}/{os.path.basename(processed["image_file"].name)}', processed['image_file']
+            )
+
+        MediaAsset = apps.get_model('myApp', 'MediaAsset')
+        asset = MediaAsset.objects.create(
+            title=url[:200],
+            original_url=url,
+            image_file=stored_name,
+            folder=MIRROR_FOLDER,
+            width=processed['width'],
+            height=processed['height'],
+            format=processed['format'],
+            file_size=processed['file_size'],
+            placeholder=processed['placeholder'],
+            dominant_color=processed['dominant_color'],
+            storage_type='local',
+        )
+        asset.variants = build_variants(asset)
+        asset.save(update_fields=['variants'])
+        return asset
+    except Exception as e:
+        # Unreachable or broken URLs would otherwise be refetched on every page view
+        cache.set(failure_key, str(e), FAILURE_BACKOFF)
+        raise Exception(f"Error mirroring remote image {url}: {str(e)}")
+
+
+def _mirror_all(urls):
+    try:
+        for url in urls:
+            try:
+                mirror_remote_image(url)
+            except Exception as e:
+                # Pages fall back to the lazy mirror proxy
+                logger.warning('Remote image mirroring failed: %s', e)
+    finally:
+        connections.close_all()
+
+
+def mirror_in_background(urls):
+    """Mirror remote images on a worker thread; returns a Future."""
+    return _executor.submit(_mirror_all, list(urls))
+
+
+def mirror_proxy_url(url):
+    """Signed same-origin URL that mirrors `url` on first request."""
+    # Unlike signing.dumps, a plain Signer is deterministic, so the proxy URL is cacheable
+    return reverse('mirror_image', args=[signing.Signer(salt=SIGNING_SALT).sign_object(url, compress=True)])
+
+
+def local_image_url(url):
+    """
+    Same-origin URL for an image field value: the mirrored copy when there is
+    one, the lazy mirror proxy for other remote URLs, otherwise `url` itself.
+    """
+    if not is_remote(url):
+        return url
+    entry = resolve_media(url)
+    return entry['src'] if entry else mirror_proxy_url(url)
+
+
+def unsign_proxy_token(token):
+    """Remote URL for a proxy token; raises signing.BadSignature if forged."""
+    return signing.Signer(salt=SIGNING_SALT).unsign_object(token)
+
+
+def remote_image_urls(instance):
+    """Remote URLs held by the image fields of a content instance."""
+    fields = REMOTE_IMAGE_FIELDS.get(type(instance).__name__, ())
+    return [getattr(instance, field) for field in fields if is_remote(getattr(instance, field))]
@@ -0,0 +1,212 @@
+"""
+Opt-in per-request profiling for staff.
+
+A staff user adds ``?_profile=1`` to a URL (or sends ``X-Profile: 1``) and
+the request runs under cProfile (see myApp.middleware.ProfilerMiddleware).
+Each profile is stored under settings.REQUEST_PROFILE_DIR as a pstats dump
+plus a JSON metadata file; only the newest REQUEST_PROFILE_LIMIT are kept.
+
+The dashboard lists captured profiles with hot-function tables and offers
+the raw .prof file and collapsed stacks (``frame;frame;frame value`` lines,
+for flamegraph.pl / speedscope) for download. cProfile records caller/callee
+edges rather than full stacks, so the collapsed stacks are reconstructed
+from the call graph: time is attributed to each path in proportion to the
+edge's share of the callee's cumulative time.
+"""
+
+import json
+import os
+import pstats
+import re
+import time
+import uuid
+
+from django.conf import settings
+
+
+QUERY_FLAG = '_profile'
+HEADER = 'X-Profile'
+SORT_KEYS = ('cumtime', 'tottime', 'ncalls', 'percall')
+MAX_STACK_DEPTH = 64
+PROFILE_ID_RE = re.compile(r'^[0-9]{13}-[0-9a-f]{8}$')
+
+
+def profiling_flagged(request):
+    """True if the request asks to be profiled (the user is not checked)."""
+    return request.GET.get(QUERY_FLAG) == '1' or request.headers.get(HEADER) == '1'
+
+
+def profiling_requested(request):
+    """True for staff requests carrying the profile flag."""
+    if not profiling_flagged(request):
+        return False
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_staff)
+
+
+async def aprofiling_requested(request):
+    """Async profiling_requested(); unflagged requests never load the user."""
+    if not profiling_flagged(request) or not hasattr(request, 'auser'):
+        return False
+    user = await request.auser()
+    return bool(user and user.is_staff)
+
+
+def profile_dir():
+    path = str(settings.REQUEST_PROFILE_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _paths(profile_id):
+    if not PROFILE_ID_RE.match(profile_id):
+        raise FileNotFoundError(profile_id)
+    base = os.path.join(profile_dir(), profile_id)
+    return base + '.prof', base + '.json'
+
+
+def save_profile(profiler, request, response, duration, username=None):
+    """
+    Store a finished profile and drop the oldest beyond the limit; returns its id.
+
+    username defaults to request.user's (pass it when the user was loaded
+    with request.auser()).
+    """
+    # Millisecond timestamp first, so names sort oldest to newest
+    profile_id = f'{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}'
+    prof_path, meta_path = _paths(profile_id)
+    stats = pstats.Stats(profiler)
+    match = request.resolver_match
+    meta = {
+        'id': profile_id,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'view': match.view_name if match else None,
+        'status': response.status_code,
+        'duration_ms': round(duration * 1000, 2),
+        'created': time.time(),
+        'user': username if username is not None else request.user.get_username(),
+        'calls': stats.total_calls,
+    }
+    stats.dump_stats(prof_path + '.tmp')
+    os.replace(prof_path + '.tmp', prof_path)
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.replace(meta_path + '.tmp', meta_path)
+    _trim()
+    return profile_id
+
+
+def _trim():
+    names = sorted(n[:-5] for n in os.listdir(profile_dir()) if n.endswith('.json'))
+    for profile_id in names[:-settings.REQUEST_PROFILE_LIMIT or None]:
+        for path in _paths(profile_id):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles():
+    """Metadata of the stored profiles, newest first."""
+    profiles = []
+    for name in sorted(os.listdir(profile_dir()), reverse=True):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(profile_dir(), name)) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def profile_meta(profile_id):
+    with open(_paths(profile_id)[1]) as f:
+        return json.load(f)
+
+
+def profile_file(profile_id):
+    """Path of the raw pstats dump."""
+    path = _paths(profile_id)[0]
+    if not os.path.exists(path):
+        raise FileNotFoundError(profile_id)
+    return path
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name  # built-in
+    return f'{name} ({os.path.basename(filename)}:{line})'
+
+
+def hot_functions(profile_id, sort='cumtime', limit=50):
+    """
+    Function table of a profile.
+
+    Args:
+        profile_id: Stored profile id
+        sort: One of SORT_KEYS
+        limit: Maximum rows
+
+    Returns:
+        list of dicts with function, file, line, ncalls, primitive_calls,
+        tottime_ms, cumtime_ms and percall_ms
+    """
+    stats = pstats.Stats(profile_file(profile_id)).stats
+    rows = []
+    for (filename, line, name), (primitive, ncalls, tottime, cumtime, _) in stats.items():
+        rows.append({
+            'function': name,
+            'file': filename,
+            'line': line,
+            'ncalls': ncalls,
+            'primitive_calls': primitive,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3),
+            'percall_ms': round(cumtime * 1000 / ncalls, 3) if ncalls else 0.0,
+        })
+    key = {'cumtime': 'cumtime_ms', 'tottime': 'tottime_ms', 'ncalls': 'ncalls', 'percall': 'percall_ms'}
+    rows.sort(key=lambda row: row[key.get(sort, 'cumtime_ms')], reverse=True)
+    return rows[:limit]
+
+
+def collapsed_stacks(profile_id):
+    """Collapsed stack lines (values in microseconds) reconstructed from the call graph."""
+    stats = pstats.Stats(profile_file(profile_id)).stats
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, (_, _, _, edge_cumtime) in callers.items():
+            callees.setdefault(caller, []).append((func, edge_cumtime))
+    # Entry points: calls made from frames that were already running when
+    # profiling began have no recorded caller
+    roots = []
+    for func, (primitive, ncalls, _, cumtime, callers) in stats.items():
+        recorded = sum(edge[0] for caller, edge in callers.items() if caller in stats)
+        if recorded < ncalls:
+            roots.append((func, min(cumtime, cumtime * (ncalls - recorded) / max(primitive, 1))))
+
+    totals = {}
+
+    def walk(func, share, path):
+        _, _, tottime, cumtime, _ = stats[func]
+        path = path + (func,)
+        scale = share / cumtime if cumtime else 0.0
+        self_time = tottime * scale
+        if self_time > 0:
+            key = ';'.join(_label(f) for f in path)
+            totals[key] = totals.get(key, 0.0) + self_time
+        if len(path) >= MAX_STACK_DEPTH:
+            return
+        for callee, edge_cumtime in callees.get(func, ()):
+            # Recursion is folded into the first frame of the cycle
+            if callee not in path and edge_cumtime * scale > 1e-6:
+                walk(callee, edge_cumtime * scale, path)
+
+    for root, share in roots:
+        walk(root, share, ())
+    return '\n'.join(
+        f'{stack} {round(seconds * 1_000_000)}'
+        for stack, seconds in sorted(totals.items()) if seconds >= 1e-6
+    ) + '\n'
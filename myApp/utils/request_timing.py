@@ -0,0 +1,125 @@
+"""
+Per-request timing and query accounting.
+
+A RequestTiming is active for the duration of a request (see
+myApp.middleware.ServerTimingMiddleware). Code anywhere in the request adds
+to it through timed() and count(); outside a request (management commands,
+tests) both are no-ops costing one context variable lookup.
+
+Metrics collected:
+    db        SQL time and query count (execute wrapper, see myApp.signals)
+    template  Template render time (TimedDjangoTemplates backend)
+    cache     get_or_rebuild hits and misses
+    image     Image processing time (uploads)
+"""
+
+import contextvars
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.template.backends.django import DjangoTemplates
+
+
+_current = contextvars.ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.durations = defaultdict(float)  # metric -> seconds
+        self.counts = defaultdict(int)
+        self.view = None  # URL name, set once the view is resolved
+        self.statements = {}  # SQL -> executions tally, for the slow query log
+
+    def add(self, name, seconds):
+        self.durations[name] += seconds
+        self.counts[name] += 1
+
+    def header(self, total, view=None):
+        """Server-Timing header value (durations in milliseconds)."""
+        metrics = [f'total;dur={total * 1000:.1f}']
+        if view is not None:
+            metrics.append(f'view;dur={view * 1000:.1f}')
+        for name in ('db', 'template', 'image'):
+            if self.counts[name]:
+                metrics.append(
+                    f'{name};dur={self.durations[name] * 1000:.1f};desc="{self.counts[name]}x"'
+                )
+        if self.counts['cache_hit'] or self.counts['cache_miss']:
+            metrics.append(
+                f'cache;desc="{self.counts["cache_hit"]} hit, {self.counts["cache_miss"]} miss"'
+            )
+        return ', '.join(metrics)
+
+    def as_dict(self):
+        """Flat metrics for the structured log."""
+        record = {}
+        for name in ('db', 'template', 'image'):
+            record[f'{name}_ms'] = round(self.durations[name] * 1000, 2)
+        record['db_queries'] = self.counts['db']
+        record['cache_hits'] = self.counts['cache_hit']
+        record['cache_misses'] = self.counts['cache_miss']
+        return record
+
+
+def start():
+    """Start accounting for the current request; returns a token for finish()."""
+    timing = RequestTiming()
+    return timing, _current.set(timing)
+
+
+def finish(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def timed(name):
+    """Add the duration of the block to the current request's metric."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - started)
+
+
+def count(name):
+    """Count an event (no duration) for the current request."""
+    timing = _current.get()
+    if timing is not None:
+        timing.counts[name] += 1
+
+
+def db_execute_wrapper(execute, sql, params, many, context):
+    """connection.execute_wrapper callback timing every query."""
+    with timed('db'):
+        return execute(sql, params, many, context)
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return self.template.render(context, request)
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Django template backend recording top-level render time per request."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
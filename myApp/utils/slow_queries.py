@@ -0,0 +1,393 @@
+"""
+Slow SQL log.
+
+Every database connection gets an execute wrapper (connected on
+connection_created in myApp.signals). A statement taking longer than
+settings.SLOW_QUERY_THRESHOLD_MS is recorded under its fingerprint: the
+SQL with literals and placeholders replaced by ``?`` and IN lists
+collapsed, so the same statement with different parameters is one entry.
+
+Fast statements repeated within one request (an N+1 loop) are caught too:
+during a request every statement's executions are tallied, and at the end
+of the request (finish_request(), called by ServerTimingMiddleware) a
+statement run at least SLOW_QUERY_REPEAT_COUNT times, or whose executions
+add up to SLOW_QUERY_THRESHOLD_MS, is recorded as well. Its entry counts the
+requests it was flagged in and its most executions in one request.
+
+The first time a fingerprint is seen in a process its query plan
+(``EXPLAIN QUERY PLAN`` on SQLite), the view name and a summary of the
+app's frames on the stack are captured and logged on the
+``myApp.slow_queries`` logger; later occurrences only add to the entry's
+count and time. Entries are written to settings.SLOW_QUERY_DIR as
+``<pid>-<start>.json``, so a later process reusing a pid gets its own file;
+files of exited processes are folded into ``dead.json`` (as in
+utils/metrics.py) when ``manage.py slow_queries`` merges them.
+"""
+
+import atexit
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.db import connections
+
+from . import request_timing
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, exited processes' files are kept
+    fcntl = None
+
+
+logger = logging.getLogger('myApp.slow_queries')
+
+MAX_FINGERPRINTS = 500  # per process; new statements beyond this are not recorded
+STACK_DEPTH = 6
+FLUSH_INTERVAL = 5.0
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+WRAPPER_MODULES = ('slow_queries.py', 'request_timing.py')  # left out of stack summaries
+DEAD_FILE = 'dead.json'
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_RE = re.compile(r'%s|\?')
+IN_LIST_RE = re.compile(r'\bIN \(\?(?:, ?\?)*\)', re.IGNORECASE)
+SPACE_RE = re.compile(r'\s+')
+
+_entries = {}  # fingerprint -> entry dict
+_lock = threading.Lock()
+_explaining = contextvars.ContextVar('slow_query_explaining', default=False)
+_last_flush = 0.0
+_file_name = (None, None)  # (pid, file name), renamed in a forked child
+
+
+def normalize(sql):
+    """SQL with literals and placeholders replaced by ?, IN lists collapsed."""
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = PLACEHOLDER_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode('utf-8')).hexdigest()[:12]
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """
+    connection.execute_wrapper callback recording statements over the
+    threshold, and tallying every statement of the current request.
+    """
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if not threshold or threshold <= 0 or _explaining.get():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    slow = elapsed_ms >= threshold
+    if slow:
+        try:
+            record(sql, params, many, context['connection'], elapsed_ms)
+        except Exception:
+            logger.exception('Recording a slow query failed')
+    timing = request_timing.current()
+    if timing is not None:
+        _tally(timing.statements, sql, params, many, context['connection'], elapsed_ms, slow)
+    return result
+
+
+def _tally(statements, sql, params, many, connection, elapsed_ms, slow):
+    # Keyed by the raw SQL: fingerprinting every statement would cost more than
+    # running most of them. Executions already recorded as slow are not re-added.
+    tally = statements.get(sql)
+    if tally is None:
+        tally = statements[sql] = {
+            'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'recorded': 0, 'recorded_ms': 0.0,
+            'params': params, 'many': many, 'database': connection.alias, 'stack': None,
+        }
+    tally['count'] += 1
+    tally['total_ms'] += elapsed_ms
+    if slow:
+        tally['recorded'] += 1
+        tally['recorded_ms'] += elapsed_ms
+    else:
+        tally['max_ms'] = max(tally['max_ms'], elapsed_ms)
+    if tally['count'] == settings.SLOW_QUERY_REPEAT_COUNT:
+        # Where the loop is: only known while it runs
+        tally['stack'] = _stack_summary()
+
+
+def repeated(timing):
+    """(sql, tally) for the request's statements that repeated or added up past the limits."""
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    return [
+        (sql, tally) for sql, tally in timing.statements.items()
+        if tally['count'] > 1 and (
+            tally['count'] >= settings.SLOW_QUERY_REPEAT_COUNT or tally['total_ms'] >= threshold
+        )
+    ]
+
+
+def finish_request(timing):
+    """Record the statements repeated() finds (the plan query needs a sync context)."""
+    for sql, tally in repeated(timing):
+        try:
+            record(
+                sql, tally['params'], tally['many'], connections[tally['database']],
+                tally['total_ms'] - tally['recorded_ms'], count=tally['count'] - tally['recorded'],
+                max_ms=tally['max_ms'], per_request=tally['count'], stack=tally['stack'], view=timing.view,
+            )
+        except Exception:
+            logger.exception('Recording a repeated query failed')
+
+
+def _explain(connection, sql, params, many):
+    if many or not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return []
+    prefix = connection.ops.explain_query_prefix()
+    token = _explaining.set(True)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            rows = cursor.fetchall()
+    except Exception as e:
+        return [f'(no plan: {e})']
+    finally:
+        _explaining.reset(token)
+    if connection.vendor != 'sqlite':
+        return [str(row[-1]) for row in rows]
+    # SQLite rows are (id, parent, notused, detail); indent children under parents
+    depth = {0: -1}
+    plan = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        plan.append('  ' * depth[node_id] + detail)
+    return plan
+
+
+def _stack_summary():
+    """The innermost app frames (outside site-packages and the execute wrappers)."""
+    base = str(settings.BASE_DIR)
+    frames = []
+    for frame in traceback.extract_stack():
+        filename = frame.filename
+        if (filename.startswith(base) and 'site-packages' not in filename
+                and os.path.basename(filename) not in WRAPPER_MODULES):
+            frames.append(f'{os.path.relpath(filename, base)}:{frame.lineno} in {frame.name}')
+    return frames[-STACK_DEPTH:]
+
+
+def _view_name():
+    timing = request_timing.current()
+    return getattr(timing, 'view', None) or '-'
+
+
+def record(sql, params, many, connection, elapsed_ms, count=1, max_ms=None, per_request=None,
+           stack=None, view=None):
+    """
+    Add executions to their fingerprint's entry.
+
+    Args:
+        elapsed_ms: Their total time
+        count: Number of executions
+        max_ms: The slowest of them (default: elapsed_ms)
+        per_request: Executions of the statement in the request, when it is
+            recorded for repeating (see finish_request)
+        stack: Stack summary to store if the entry is new (default: the current one)
+        view: View name (default: the current request's)
+    """
+    key = fingerprint(sql)
+    view = view or _view_name()
+    now = time.time()
+    flagged = 1 if per_request is not None else 0
+    if max_ms is None:
+        max_ms = elapsed_ms
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            entry['count'] += count
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], max_ms)
+            entry['views'][view] = entry['views'].get(view, 0) + count
+            entry['last_seen'] = now
+            entry['flagged_requests'] = entry.get('flagged_requests', 0) + flagged
+            entry['max_per_request'] = max(entry.get('max_per_request', 0), per_request or 0)
+            new = False
+        elif len(_entries) < MAX_FINGERPRINTS:
+            entry = _entries[key] = {
+                'fingerprint': key,
+                'sql': normalize(sql),
+                'database': connection.alias,
+                'count': count,
+                'total_ms': elapsed_ms,
+                'max_ms': max_ms,
+                'views': {view: count},
+                'flagged_requests': flagged,
+                'max_per_request': per_request or 0,
+                'first_seen': now,
+                'last_seen': now,
+                'plan': None,
+                'stack': stack or _stack_summary(),
+            }
+            new = True
+        else:
+            return
+
+    if new:
+        # Outside the lock: the plan is one more query on the same connection
+        entry['plan'] = _explain(connection, sql, params, many)
+        logger.warning(json.dumps({
+            'fingerprint': key,
+            'duration_ms': round(elapsed_ms, 2),
+            'executions': count,
+            'per_request': per_request,
+            'view': view,
+            'database': connection.alias,
+            'sql': entry['sql'],
+            'plan': entry['plan'],
+            'stack': entry['stack'],
+        }))
+    flush()
+
+
+def slow_query_dir():
+    path = str(settings.SLOW_QUERY_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _own_file():
+    """This process's file name: pid plus start time, so a reused pid cannot overwrite it."""
+    global _file_name
+    pid = os.getpid()
+    if _file_name[0] != pid:
+        _file_name = (pid, f'{pid}-{int(time.time() * 1000)}.json')
+    return _file_name[1]
+
+
+def flush(force=False):
+    """Write this process's entries if FLUSH_INTERVAL has passed."""
+    global _last_flush
+    now = time.monotonic()
+    if not _entries or (not force and now - _last_flush < FLUSH_INTERVAL):
+        return
+    _last_flush = now
+    with _lock:
+        snapshot = json.dumps(list(_entries.values()))
+    path = os.path.join(slow_query_dir(), _own_file())
+    with open(path + '.tmp', 'w') as f:
+        f.write(snapshot)
+    os.replace(path + '.tmp', path)
+
+
+def _flush_at_exit():
+    try:
+        flush(force=True)
+    except Exception:
+        pass
+
+
+atexit.register(_flush_at_exit)
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return entries if isinstance(entries, list) else []
+
+
+def _merge(merged, entries):
+    for entry in entries:
+        current = merged.get(entry['fingerprint'])
+        if current is None:
+            merged[entry['fingerprint']] = entry
+            continue
+        # Plan and stack come from the earliest sighting
+        if entry['first_seen'] < current['first_seen']:
+            entry, current = current, entry
+            merged[current['fingerprint']] = current
+        current['count'] += entry['count']
+        current['total_ms'] += entry['total_ms']
+        current['max_ms'] = max(current['max_ms'], entry['max_ms'])
+        current['last_seen'] = max(current['last_seen'], entry['last_seen'])
+        current['flagged_requests'] = current.get('flagged_requests', 0) + entry.get('flagged_requests', 0)
+        current['max_per_request'] = max(current.get('max_per_request', 0), entry.get('max_per_request', 0))
+        for view, count in entry['views'].items():
+            current['views'][view] = current['views'].get(view, 0) + count
+
+
+def _pid(name):
+    """Process id of a '<pid>-<start>.json' (or older '<pid>.json') file, else None."""
+    stem = name[:-5].split('-', 1)[0]
+    return int(stem) if name.endswith('.json') and stem.isdigit() else None
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _fold_dead(directory):
+    """Merge the files of exited processes into dead.json."""
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        dead = [name for name in os.listdir(directory)
+                if _pid(name) is not None and name != _own_file() and not _alive(_pid(name))]
+        if not dead:
+            return
+        dead_path = os.path.join(directory, DEAD_FILE)
+        merged = {}
+        _merge(merged, _read(dead_path))
+        for name in dead:
+            _merge(merged, _read(os.path.join(directory, name)))
+        with open(dead_path + '.tmp', 'w') as f:
+            json.dump(list(merged.values()), f)
+        os.replace(dead_path + '.tmp', dead_path)
+        for name in dead:
+            os.remove(os.path.join(directory, name))
+
+
+def collect():
+    """
+    Entries from every process, merged by fingerprint.
+
+    Returns:
+        list of entry dicts (fingerprint, sql, database, count, total_ms,
+        max_ms, views, flagged_requests, max_per_request, first_seen,
+        last_seen, plan, stack)
+    """
+    flush(force=True)
+    directory = slow_query_dir()
+    if fcntl is not None:
+        _fold_dead(directory)
+    merged = {}
+    for name in os.listdir(directory):
+        if name.endswith('.json'):
+            _merge(merged, _read(os.path.join(directory, name)))
+    return list(merged.values())
+
+
+def clear():
+    """Forget every recorded entry, in this process and on disk."""
+    with _lock:
+        _entries.clear()
+    directory = slow_query_dir()
+    for name in os.listdir(directory):
+        if name.endswith('.json'):
+            os.remove(os.path.join(directory, name))
@@ -0,0 +1,328 @@
+"""
+Two-tier cache backend: a small in-process LRU in front of a shared cache.
+
+Reads are served from process memory when possible and fall through to the
+shared backend (file-based locally, Redis in production) on a local miss.
+The local tier is bounded by the pickled size of its entries, not by entry
+count, so one large page cannot silently push memory use up.
+
+Cross-process coherence comes from two keys kept in the shared backend, which
+every process re-reads at most once per VERSION_CHECK_INTERVAL seconds:
+
+- a deletion log: delete(), delete_many() and incr() append the keys they
+  touch, and other processes drop just those keys from their local tier;
+- a "generation" token, replaced by clear() and bump_generation(), on which
+  every process drops its whole local tier. Tokens are random, so a cleared
+  shared backend can never hand out a generation a process already has.
+
+A plain set() overwrites the local and shared copies but other processes may
+keep their local copy for up to LOCAL_TIMEOUT seconds, so code replacing live
+data should delete() first.
+
+The local tier lives at module level, keyed by LOCATION (like LocMemCache):
+Django creates a backend instance per thread and per async context, and
+every one of them must see the same process-wide tier.
+
+Configured in settings.CACHES, e.g.:
+
+    'default': {
+        'BACKEND': 'myApp.utils.tiered_cache.TieredCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'SHARED_ALIAS': 'shared',
+            'MAX_BYTES': 8 * 1024 * 1024,
+            'LOCAL_TIMEOUT': 60,
+            'VERSION_CHECK_INTERVAL': 1.0,
+        },
+    }
+"""
+
+import pickle
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+GENERATION_KEY = 'tiered-cache:generation'
+DELETION_SEQ_KEY = 'tiered-cache:deletions'
+DELETION_KEY = 'tiered-cache:deleted:{}'
+# A process further behind the deletion log than this drops its whole local tier
+MAX_DELETIONS_PER_CHECK = 256
+
+_tiers = {}  # LOCATION -> _LocalTier
+_tiers_lock = Lock()
+
+
+class _LocalTier:
+    """One process's local entries, generation and counters for a LOCATION."""
+
+    def __init__(self):
+        self.entries = OrderedDict()  # key -> (pickled, expires_at)
+        self.bytes = 0
+        self.lock = Lock()
+        self.generation = None
+        self.deletion_seq = None  # last deletion log entry applied
+        self.next_check = 0.0
+        self.stats = {
+            'local_hits': 0, 'shared_hits': 0, 'misses': 0,
+            'evictions': 0, 'invalidations': 0,
+        }
+
+
+def _tier(name):
+    with _tiers_lock:
+        tier = _tiers.get(name)
+        if tier is None:
+            tier = _tiers[name] = _LocalTier()
+        return tier
+
+
+class TieredCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED_ALIAS', 'shared')
+        self._max_bytes = int(options.get('MAX_BYTES', 8 * 1024 * 1024))
+        # Items bigger than this never enter the local tier
+        self._max_item_bytes = int(options.get('MAX_ITEM_BYTES', self._max_bytes // 8))
+        self._local_timeout = float(options.get('LOCAL_TIMEOUT', 60))
+        self._check_interval = float(options.get('VERSION_CHECK_INTERVAL', 1.0))
+
+        self._tier = _tier(location)
+        self._lock = self._tier.lock
+        self._stats = self._tier.stats
+
+    @property
+    def shared(self):
+        from django.core.cache import caches
+        return caches[self._shared_alias]
+
+    # Local tier
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._tier.entries.get(key)
+            if entry is None:
+                return None
+            pickled, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._local_delete(key)
+                return None
+            self._tier.entries.move_to_end(key)
+            return pickled
+
+    def _local_set(self, key, value, timeout):
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        size = len(pickled)
+        with self._lock:
+            self._local_delete(key)
+            if size > self._max_item_bytes:
+                return
+            ttl = self._local_timeout
+            backend_timeout = self.get_backend_timeout(timeout)
+            if backend_timeout is not None:
+                ttl = min(ttl, backend_timeout - time.time())
+            if ttl <= 0:
+                return
+            self._tier.entries[key] = (pickled, time.monotonic() + ttl)
+            self._tier.bytes += size
+            while self._tier.bytes > self._max_bytes and self._tier.entries:
+                _key, (evicted, _expires) = self._tier.entries.popitem(last=False)
+                self._tier.bytes -= len(evicted)
+                self._stats['evictions'] += 1
+
+    def _local_delete(self, key):
+        entry = self._tier.entries.pop(key, None)
+        if entry is not None:
+            self._tier.bytes -= len(entry[0])
+
+    def clear_local(self):
+        """Drop every entry held in this process."""
+        with self._lock:
+            self._tier.entries.clear()
+            self._tier.bytes = 0
+
+    # Coherence
+
+    def _check_generation(self):
+        now = time.monotonic()
+        if now < self._tier.next_check:
+            return
+        self._tier.next_check = now + self._check_interval
+        state = self.shared.get_many([GENERATION_KEY, DELETION_SEQ_KEY])
+        self._apply_generation(state.get(GENERATION_KEY))
+        log_keys = self._unapplied_deletions(state.get(DELETION_SEQ_KEY, 0))
+        self._apply_deletions(log_keys, self.shared.get_many(log_keys) if log_keys else {})
+
+    async def _acheck_generation(self):
+        now = time.monotonic()
+        if now < self._tier.next_check:
+            return
+        self._tier.next_check = now + self._check_interval
+        state = await self.shared.aget_many([GENERATION_KEY, DELETION_SEQ_KEY])
+        self._apply_generation(state.get(GENERATION_KEY))
+        log_keys = self._unapplied_deletions(state.get(DELETION_SEQ_KEY, 0))
+        self._apply_deletions(log_keys, await self.shared.aget_many(log_keys) if log_keys else {})
+
+    def _apply_generation(self, generation):
+        if generation != self._tier.generation:
+            if self._tier.generation is not None or self._tier.entries:
+                self.clear_local()
+                self._stats['invalidations'] += 1
+            self._tier.generation = generation
+
+    def _unapplied_deletions(self, seq):
+        """Deletion log keys not applied yet; None when too far behind to replay."""
+        seen, self._tier.deletion_seq = self._tier.deletion_seq, seq
+        # First check (the generation check covers it), or a log reset by clear()
+        if seen is None or seq <= seen:
+            return []
+        if seq - seen > MAX_DELETIONS_PER_CHECK:
+            return None
+        return [DELETION_KEY.format(n) for n in range(seen + 1, seq + 1)]
+
+    def _apply_deletions(self, log_keys, logged):
+        if log_keys is None or len(logged) < len(log_keys):
+            # Too far behind, or entries not written yet / expired: start over
+            self.clear_local()
+            self._stats['invalidations'] += 1
+            return
+        with self._lock:
+            for local_key in logged.values():
+                self._local_delete(local_key)
+
+    def _log_deletions(self, local_keys):
+        """Tell other processes to drop these keys from their local tier."""
+        if not local_keys:
+            return
+        try:
+            last = self.shared.incr(DELETION_SEQ_KEY, len(local_keys))
+        except ValueError:
+            self.shared.add(DELETION_SEQ_KEY, 0, timeout=None)
+            last = self.shared.incr(DELETION_SEQ_KEY, len(local_keys))
+        first = last - len(local_keys) + 1
+        # Kept until every local entry the deletion could affect has expired
+        self.shared.set_many(
+            {DELETION_KEY.format(first + i): key for i, key in enumerate(local_keys)},
+            timeout=2 * self._local_timeout + self._check_interval,
+        )
+
+    def bump_generation(self):
+        """Invalidate the whole local tier of every process within one version check."""
+        generation = uuid.uuid4().hex
+        self.shared.set(GENERATION_KEY, generation, timeout=None)
+        self.clear_local()
+        self._tier.generation = generation
+        self._tier.next_check = time.monotonic() + self._check_interval
+        return generation
+
+    # Cache API
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self._check_generation()
+        pickled = self._local_get(local_key)
+        if pickled is not None:
+            self._stats['local_hits'] += 1
+            return pickle.loads(pickled)
+        sentinel = object()
+        value = self.shared.get(key, sentinel, version=version)
+        if value is sentinel:
+            self._stats['misses'] += 1
+            return default
+        self._stats['shared_hits'] += 1
+        self._local_set(local_key, value, DEFAULT_TIMEOUT)
+        return value
+
+    async def aget(self, key, default=None, version=None):
+        # Local hits are answered on the event loop; only the shared tier is awaited
+        local_key = self.make_and_validate_key(key, version=version)
+        await self._acheck_generation()
+        pickled = self._local_get(local_key)
+        if pickled is not None:
+            self._stats['local_hits'] += 1
+            return pickle.loads(pickled)
+        sentinel = object()
+        value = await self.shared.aget(key, sentinel, version=version)
+        if value is sentinel:
+            self._stats['misses'] += 1
+            return default
+        self._stats['shared_hits'] += 1
+        self._local_set(local_key, value, DEFAULT_TIMEOUT)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self.shared.set(key, value, timeout=self._shared_timeout(timeout), version=version)
+        self._local_set(local_key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        added = self.shared.add(key, value, timeout=self._shared_timeout(timeout), version=version)
+        if added:
+            self._local_set(local_key, value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout=self._shared_timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            self._local_delete(local_key)
+        deleted = self.shared.delete(key, version=version)
+        self._log_deletions([local_key])
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        local_keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        with self._lock:
+            for local_key in local_keys:
+                self._local_delete(local_key)
+        self.shared.delete_many(keys, version=version)
+        self._log_deletions(local_keys)
+
+    def has_key(self, key, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self._check_generation()
+        if self._local_get(local_key) is not None:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            self._local_delete(local_key)
+        value = self.shared.incr(key, delta, version=version)
+        self._log_deletions([local_key])
+        return value
+
+    def clear(self):
+        self.shared.clear()
+        # A fresh random token, so no process can already hold it
+        self.bump_generation()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+    def _shared_timeout(self, timeout):
+        # Resolve our own default so the shared alias honours this cache's TIMEOUT
+        if timeout is DEFAULT_TIMEOUT:
+            return self.default_timeout
+        return timeout
+
+    def stats(self):
+        """Counters and local-tier size for this process."""
+        with self._lock:
+            return dict(
+                self._stats,
+                local_entries=len(self._tier.entries),
+                local_bytes=self._tier.bytes,
+                max_bytes=self._max_bytes,
+            )
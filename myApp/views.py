@@ -1,31 +1,134 @@
+import os
+
+from django.conf import settings
+from django.core import signing
+from django.http import Http404, HttpResponse, HttpResponseForbidden, HttpResponseRedirect
 from django.shortcuts import render
+from django.utils.cache import patch_vary_headers
+from django.views.static import serve
+
+from .content_helpers import content_version
+from .db_routers import use_published_content
+from .utils import metrics as app_metrics
+from .utils.cache_utils import cached_page
+from .utils.early_hints import hero_image, preload_hints
+from .utils.image_variants import MIME_TYPES
+from .utils.media_negotiation import is_negotiable, negotiated_format, sibling
+from .utils.remote_mirror import MIRROR_DIR, mirror_remote_image, unsign_proxy_token
 
+
+@preload_hints
+@cached_page(version=content_version)
+@use_published_content
 def home(request):
-    return render(request, 'myApp/home.html')
+    # The template only reads the hero image; the rest of the page is static
+    return render(request, 'myApp/home.html', {'content': {'hero_image': hero_image('home')}})
 
+@preload_hints
+@cached_page(version=content_version)
 def about(request):
     return render(request, 'myApp/about.html')
 
+@preload_hints
+@cached_page(version=content_version)
 def core_beliefs(request):
     return render(request, 'myApp/core_beliefs.html')
 
+@preload_hints
+@cached_page(version=content_version)
 def what_we_do(request):
     return render(request, 'myApp/what_we_do.html')
 
+@preload_hints
+@cached_page(version=content_version)
 def events(request):
     return render(request, 'myApp/events.html')
 
+@preload_hints
+@cached_page(version=content_version)
 def mission_accomplished(request):
     return render(request, 'myApp/mission_accomplished.html')
 
+@preload_hints
+@cached_page(version=content_version)
 def donate(request):
     return render(request, 'myApp/donate.html')
 
+@preload_hints
+@cached_page(version=content_version)
 def contact(request):
     return render(request, 'myApp/contact.html')
 
+@preload_hints
+@cached_page(version=content_version)
 def faqs(request):
     return render(request, 'myApp/faqs.html')
 
+@preload_hints
+@cached_page(version=content_version)
 def privacy(request):
-    return render(request, 'myApp/privacy.html')
\ No newline at end of file
+    return render(request, 'myApp/privacy.html')
+
+
+def built_asset(request, path):
+    """
+    Serve a content-hashed build output written after startup (e.g. the icon
+    subset rebuilt on dashboard save), which WhiteNoise has not indexed yet.
+    """
+    response = serve(request, path, document_root=settings.STATIC_ROOT)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+def media(request, path):
+    """
+    Serve an uploaded file, answering image requests with a smaller AVIF/WebP
+    sibling when the browser's Accept header allows it.
+    """
+    fmt = negotiated_format(request.headers.get('Accept', ''), path)
+    served_path = (sibling(path, fmt) if fmt else None) or path
+    response = serve(request, served_path, document_root=settings.MEDIA_ROOT)
+    extension = os.path.splitext(served_path)[1][1:].lower()
+    if response.status_code == 200 and extension in MIME_TYPES:
+        # mimetypes does not know AVIF on older Pythons
+        response['Content-Type'] = MIME_TYPES[extension]
+    if is_negotiable(path):
+        patch_vary_headers(response, ['Accept'])
+    if response.status_code == 200 and path.startswith(MIRROR_DIR + '/'):
+        # Mirrors are fetched once and never rewritten
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+def mirror_image(request, token):
+    """
+    Serve a remote image from our own origin, mirroring it on first request.
+    Falls back to redirecting to the remote URL if it cannot be fetched.
+    """
+    try:
+        url = unsign_proxy_token(token)
+    except signing.BadSignature:
+        raise Http404('Unknown image')
+    try:
+        asset = mirror_remote_image(url)
+    except Exception:
+        response = HttpResponseRedirect(url)
+        response['Cache-Control'] = 'no-cache'
+        return response
+    return media(request, asset.image_file.name)
+
+
+LOCALHOST_ADDRS = ('127.0.0.1', '::1')
+
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint, aggregated across this host's workers.
+    Open to staff, and to localhost when METRICS_ALLOW_LOCALHOST is set.
+    """
+    local = settings.METRICS_ALLOW_LOCALHOST and request.META.get('REMOTE_ADDR') in LOCALHOST_ADDRS
+    if not local and not request.user.is_staff:
+        return HttpResponseForbidden('Forbidden')
+    response = HttpResponse(app_metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    response['Cache-Control'] = 'no-store'
+    return response
@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myProject.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from myApp.utils.early_hints import EarlyHintsMiddleware  # noqa: E402 (needs the app registry)
+
+# 103 Early Hints for public pages on servers that support them (e.g. Hypercorn)
+application = EarlyHintsMiddleware(django_application)
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import re
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -53,11 +54,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'myApp.middleware.AsyncWhiteNoiseMiddleware',
+    'myApp.middleware.ServerTimingMiddleware',
+    # Session, auth and messages are skipped for public pages (myApp/utils/public_pages.py)
+    'myApp.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'myApp.middleware.AuthenticationMiddleware',
+    'myApp.middleware.ProfilerMiddleware',
+    'myApp.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -65,7 +70,7 @@ ROOT_URLCONF = 'myProject.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'myApp.utils.request_timing.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -85,14 +90,104 @@ WSGI_APPLICATION = 'myProject.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# SQLite tuning applied to every new connection. WAL lets public readers keep
+# reading while the dashboard writes; the rest trades a little durability on
+# power loss (NORMAL) for far fewer fsyncs and keeps hot pages in memory.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,  # 128MB memory-mapped I/O
+    'cache_size': -20000,  # negative = KiB, so ~20MB page cache
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,  # milliseconds
+}
+
+# Serve public pages with myApp/async_views.py. Opt-in, also under ASGI
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+
+CONTENT_DB_PATH = Path(os.getenv('CONTENT_DB_PATH', BASE_DIR / 'content.sqlite3'))
+# Read public content from CONTENT_DB_PATH once it has been published.
+# The test runner (myApp/test_runner.py) turns this off.
+USE_PUBLISHED_CONTENT = os.getenv('USE_PUBLISHED_CONTENT', 'True') == 'True'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': Path(os.getenv('DATABASE_PATH', BASE_DIR / 'db.sqlite3')),
+        # Keep connections open between requests; health checks discard
+        # connections that went bad while idle instead of failing a request.
+        # Under ASGI each request's sync code runs in a fresh thread, so a
+        # kept connection would never be reused: close them instead.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '0' if ASYNC_VIEWS else '600')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Lock waits are bounded by the busy_timeout PRAGMA alone.
+            # Take the write lock at BEGIN so busy_timeout applies to writers
+            # instead of failing with "database is locked" on lock upgrade.
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ';'.join(
+                f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()
+            ),
+        },
+    },
+    # Published copy of the content tables (see `manage.py publish_content`).
+    # Opened read-only and immutable so public reads skip SQLite locking and
+    # change detection entirely; republishing swaps the file atomically.
+    'content': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{CONTENT_DB_PATH}?mode=ro&immutable=1',
+        'CONN_MAX_AGE': 0,
+    },
+}
+
+DATABASE_ROUTERS = ['myApp.db_routers.PublishedContentRouter']
+
+TEST_RUNNER = 'myApp.test_runner.ContentTestRunner'
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+#
+# Two tiers: a bounded in-process LRU (default) in front of a cache shared by
+# every worker on the node. Set REDIS_URL to share the second tier across
+# replicas as well; otherwise it is a file-based cache under CACHE_DIR.
+
+REDIS_URL = os.getenv('REDIS_URL', '')
+
+if REDIS_URL:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_DIR', str(BASE_DIR / '.cache')),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
     }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'myApp.utils.tiered_cache.TieredCache',
+        # Names the process-wide local tier (shared by every thread)
+        'LOCATION': 'default',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'SHARED_ALIAS': 'shared',
+            'MAX_BYTES': 8 * 1024 * 1024,
+            'LOCAL_TIMEOUT': 60,
+            'VERSION_CHECK_INTERVAL': 1.0,
+        },
+    },
+    'shared': dict(SHARED_CACHE, TIMEOUT=300),
 }
 
 
+# Seconds between checks of the content version stored in the database. A
+# dashboard edit on one replica reaches the others within this delay.
+CONTENT_VERSION_POLL_INTERVAL = float(os.getenv('CONTENT_VERSION_POLL_INTERVAL', '1.0'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -130,9 +225,92 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Built assets (manage.py build_css etc.) carry a content hash in their name,
+# e.g. css/site.3f9a0c1b2d4e.css, so they can be cached forever.
+_HASHED_ASSET_RE = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+
+
+def WHITENOISE_IMMUTABLE_FILE_TEST(path, url):
+    return bool(_HASHED_ASSET_RE.search(url))
+
+
+# Applied once to each public page as it enters the page cache (myApp/utils/cache_utils.py)
+PAGE_POSTPROCESSORS = [
+    'myApp.utils.critical_css.inline_critical_css',
+    'myApp.utils.html_minify.minify_page',
+]
+
+# Tailwind v3 CLI used by `manage.py build_css` (standalone binary or npx)
+TAILWIND_CLI = os.getenv('TAILWIND_CLI', 'tailwindcss')
+
+# Font Awesome Free 6.x package (svgs/ + metadata/) used by `manage.py build_icons`
+FONTAWESOME_DIR = os.getenv('FONTAWESOME_DIR', str(BASE_DIR / 'vendor' / 'fontawesome-free'))
+
+# Inter font files (Inter-Regular.woff2, Inter-Bold.ttf, ...) used by `manage.py build_fonts`
+FONT_SOURCE_DIR = os.getenv('FONT_SOURCE_DIR', str(BASE_DIR / 'vendor' / 'fonts'))
+# Weights the site uses (font-light is not used) and the ones above the fold to preload
+FONT_WEIGHTS = [400, 500, 600, 700]
+FONT_PRELOAD_WEIGHTS = [400, 700]
+
+# Fraction of requests reported by ServerTimingMiddleware (Server-Timing header + log line).
+# Kept low: the header shows anyone how long each part of a request took, and
+# every sampled request writes an INFO line. Set to 1.0 while profiling.
+SERVER_TIMING_SAMPLE_RATE = float(os.getenv('SERVER_TIMING_SAMPLE_RATE', '0.01'))
+
+# Prometheus metrics (myApp/utils/metrics.py): per-process snapshots shared
+# by every worker on the host, merged on each scrape of /metrics
+METRICS_DIR = os.getenv('METRICS_DIR', str(BASE_DIR / '.metrics'))
+METRICS_FLUSH_INTERVAL = 5.0
+# Let unauthenticated scrapes from 127.0.0.1/::1 through; otherwise staff only.
+# Off by default: behind a reverse proxy on the same host every request
+# arrives from localhost. Enable only where the scraper connects directly.
+METRICS_ALLOW_LOCALHOST = os.getenv('METRICS_ALLOW_LOCALHOST', 'False') == 'True'
+
+# Statements slower than this are logged with their query plan and summed
+# per fingerprint in SLOW_QUERY_DIR (`manage.py slow_queries`); 0 disables.
+# So are statements run SLOW_QUERY_REPEAT_COUNT times in one request (N+1
+# loops), or whose executions in one request add up to the threshold.
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '100'))
+SLOW_QUERY_REPEAT_COUNT = int(os.getenv('SLOW_QUERY_REPEAT_COUNT', '20'))
+SLOW_QUERY_DIR = os.getenv('SLOW_QUERY_DIR', str(BASE_DIR / '.slow_queries'))
+
+# Staff request profiles (?_profile=1), newest REQUEST_PROFILE_LIMIT kept
+REQUEST_PROFILE_DIR = os.getenv('REQUEST_PROFILE_DIR', str(BASE_DIR / '.profiles'))
+REQUEST_PROFILE_LIMIT = 50
+
+# One JSON line per measured request on the myApp.timing logger, one per
+# newly seen slow statement on myApp.slow_queries
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'timing': {'class': 'logging.StreamHandler', 'formatter': 'message'},
+    },
+    'loggers': {
+        'myApp.timing': {
+            'handlers': ['timing'],
+            'level': os.getenv('TIMING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        # First sighting of each slow statement (utils/slow_queries.py)
+        'myApp.slow_queries': {
+            'handlers': ['timing'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 # Media files (user uploads)
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
+MEDIA_ROOT = Path(os.getenv('MEDIA_ROOT', BASE_DIR / 'media'))
+
+# Fetches remote images for local mirroring (myApp/utils/remote_mirror.py);
+# set to 'myApp.utils.remote_mirror.standin_fetcher' to work offline
+REMOTE_IMAGE_FETCHER = os.getenv('REMOTE_IMAGE_FETCHER', 'myApp.utils.remote_mirror.urlopen_fetcher')
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
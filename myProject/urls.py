@@ -1,24 +1,33 @@
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
-from myApp import views
+from myApp import async_views, views
+
+# Public pages: async views under ASGI (see myApp/async_views.py)
+pages = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('dashboard/', include('myApp.dashboard_urls')),
-    path('', views.home, name='home'),
-    path('about/', views.about, name='about'),
-    path('core-beliefs/', views.core_beliefs, name='core_beliefs'),
-    path('what-we-do/', views.what_we_do, name='what_we_do'),
-    path('events/', views.events, name='events'),
-    path('mission-accomplished/', views.mission_accomplished, name='mission_accomplished'),
-    path('donate/', views.donate, name='donate'),
-    path('contact/', views.contact, name='contact'),
-    path('faqs/', views.faqs, name='faqs'),
-    path('privacy/', views.privacy, name='privacy'),
+    path('', pages.home, name='home'),
+    path('about/', pages.about, name='about'),
+    path('core-beliefs/', pages.core_beliefs, name='core_beliefs'),
+    path('what-we-do/', pages.what_we_do, name='what_we_do'),
+    path('events/', pages.events, name='events'),
+    path('mission-accomplished/', pages.mission_accomplished, name='mission_accomplished'),
+    path('donate/', pages.donate, name='donate'),
+    path('contact/', pages.contact, name='contact'),
+    path('faqs/', pages.faqs, name='faqs'),
+    path('privacy/', pages.privacy, name='privacy'),
+    # Prometheus scrape target (see utils/metrics.py)
+    path('metrics', views.metrics, name='metrics'),
+    # Remote images mirrored to our origin on first request (see utils/remote_mirror.py)
+    path('media-mirror/<str:token>/', views.mirror_image, name='mirror_image'),
+    # Content-hashed build outputs created while running (see views.built_asset)
+    re_path(r'^static/(?P<path>.+\.[0-9a-f]{12}\.\w+)$', views.built_asset),
+    # Uploaded media, in every environment: images are negotiated to AVIF/WebP
+    # by the Accept header (see views.media), which a plain file server cannot do
+    re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), views.media),
 ]
-
-# Serve media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)